@@ -0,0 +1,58 @@
+"""
+Benchmark of the assignment engines on generated instances.
+
+    python benchmarks/assignment.py [seed]
+
+For each size, both engines of AssignmentProtocol solve the same instance, the table
+shows their solve time, cost, and the gap of the heuristic to its Lagrangian bound.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_app', 'ortools_packages'))
+from assignment import AssignmentProtocol
+
+SIZES = [(50, 10), (100, 20), (200, 40), (400, 80)]
+
+
+def generate(num_orders, num_trips, rng):
+    """
+    Random instance where the trips can hold 30% more than the orders.
+    """
+    costs = rng.randint(10, 100, (num_orders, num_trips))
+    order_weights = rng.randint(1, 10, num_orders)
+    order_cbms = rng.uniform(0.1, 1., num_orders)
+    max_weights = np.full(num_trips, order_weights.sum() * 1.3 / num_trips)
+    max_cbms = np.full(num_trips, order_cbms.sum() * 1.3 / num_trips)
+    return [costs.tolist(), order_weights.tolist(), order_cbms.tolist(), max_weights.tolist(), max_cbms.tolist()]
+
+
+def run(instance, engine):
+    started = time.time()
+    result = AssignmentProtocol(*instance, engine = engine).Assign()
+    elapsed = time.time() - started
+    costs = instance[0]
+    total = sum(costs[a['order']][a['trip']] for a in result['assignment'])
+    return elapsed, total, result
+
+
+def main():
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    rng = np.random.RandomState(seed)
+    print('%8s %6s %10s %10s %10s %10s %8s' % ('orders', 'trips', 'cbc s', 'cbc cost', 'heur s', 'heur cost', 'gap'))
+    for num_orders, num_trips in SIZES:
+        instance = generate(num_orders, num_trips, rng)
+        cbc_time, cbc_total, _ = run(instance, 'cbc')
+        heuristic_time, heuristic_total, result = run(instance, 'heuristic')
+        # No gap without a finite bound, or with orders left unassigned.
+        gap = '%7.2f%%' % (100 * result['gap']) if result['gap'] is not None else '-'
+        print('%8d %6d %10.3f %10d %10.3f %10d %8s' % (
+            num_orders, num_trips, cbc_time, cbc_total, heuristic_time, heuristic_total, gap))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Packing every item with the /bpp knapsack, called again on the remaining items until
+they are all packed (one round trip per bin), against one 'mode': 'binpacking' call.
+
+    python benchmarks/bpp.py [num_items] [dimensions]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+import numpy as np
+from ortools.algorithms import pywrapknapsack_solver
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_app', 'ortools_packages'))
+from bin_packing import pack
+
+
+def knapsack_rounds(weights, capacities):
+    """
+    The client loop: fill one bin with the knapsack, the profit being the first weight,
+    and send the items left. Return the number of round trips.
+    """
+    remaining = np.arange(weights.shape[1])
+    rounds = 0
+    while len(remaining):
+        solver = pywrapknapsack_solver.KnapsackSolver(
+            pywrapknapsack_solver.KnapsackSolver.KNAPSACK_MULTIDIMENSION_BRANCH_AND_BOUND_SOLVER, 'bpp_solver')
+        items = weights[:, remaining]
+        solver.Init(items[0].tolist(), items.tolist(), capacities.tolist())
+        solver.Solve()
+        packed = [i for i in range(len(remaining)) if solver.BestSolutionContains(i)]
+        remaining = np.delete(remaining, packed)
+        rounds += 1
+    return rounds
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    dimensions = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    rng = np.random.RandomState(0)
+    weights = rng.randint(5, 60, (dimensions, num_items))
+    capacities = np.full(dimensions, 100)
+
+    started = time.time()
+    rounds = knapsack_rounds(weights, capacities)
+    loop_seconds = time.time() - started
+
+    started = time.time()
+    result = pack(weights, capacities)
+    pack_seconds = time.time() - started
+
+    print('%-22s %8s %8s %10s' % ('', 'calls', 'bins', 'seconds'))
+    print('%-22s %8d %8d %10.3f' % ('knapsack per bin', rounds, rounds, loop_seconds))
+    print('%-22s %8d %8d %10.3f' % ('binpacking (%s)' % result['method'], 1, result['num_bins'], pack_seconds))
+    print('lower bound %d, optimal %s' % (result['lower_bound'], result['optimal']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+rectpack against the NumPy engines of /bpp2d on a large batch of random rectangles:
+solve time, bins used and rectangles left out.
+
+    python benchmarks/bpp2d.py [--rectangles 10000] [--bin 1000 1000] [--engines rectpack maxrects skyline]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from rectpack import newPacker
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_app', 'ortools_packages'))
+from rect_packing import pack_rectangles
+
+
+def rectpack_bins(widths, heights, bin_widths, bin_heights):
+    """
+    The rectpack path of Bpp2dSolver. Return the bin of every packed rectangle.
+    """
+    packer = newPacker()
+    for i, (width, height) in enumerate(zip(widths, heights)):
+        packer.add_rect(width, height, i)
+    for width, height in zip(bin_widths, bin_heights):
+        packer.add_bin(width, height)
+    packer.pack()
+    return np.array([rect[0] for rect in packer.rect_list()])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the /bpp2d engines.')
+    parser.add_argument('--rectangles', type=int, default=10000)
+    parser.add_argument('--bin', type=int, nargs=2, default=[1000, 1000])
+    parser.add_argument('--engines', nargs='*', default=['rectpack', 'maxrects', 'skyline'])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(args.seed)
+    widths = rng.randint(5, 100, args.rectangles).tolist()
+    heights = rng.randint(5, 100, args.rectangles).tolist()
+    # As many bins as rectangles, none is left out for lack of bins.
+    bin_widths = [args.bin[0]] * args.rectangles
+    bin_heights = [args.bin[1]] * args.rectangles
+
+    print('%-10s %10s %8s %10s' % ('engine', 'seconds', 'bins', 'left out'))
+    for engine in args.engines:
+        started = time.time()
+        if engine == 'rectpack':
+            bins = rectpack_bins(widths, heights, bin_widths, bin_heights)
+        else:
+            bins = pack_rectangles(widths, heights, bin_widths, bin_heights, engine)[0]
+        elapsed = time.time() - started
+        print('%-10s %10.2f %8d %10d' % (engine, elapsed, len(np.unique(bins)), args.rectangles - len(bins)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""
+Replay recorded traffic (see flask_app/recorder.py) against the app and report the
+throughput, the latency percentiles and the error rates per endpoint.
+
+    python benchmarks/replay.py run traffic.jsonl [--url http://localhost:4000]
+        [--concurrency 8] [--rate 5] [--duration 60] [--output report.json]
+    python benchmarks/replay.py diff before.json after.json
+
+Without --url the app is driven in-process with its test client. With --rate the
+requests arrive as a Poisson process of that many requests per second and their
+latency includes the time waiting for a free client, otherwise every client sends its
+next request as soon as it gets a response. Compare two builds by running the same
+recording against each and diffing the reports.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import numpy as np
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    from urllib.request import Request, urlopen
+    from urllib.error import HTTPError
+except ImportError:
+    from urllib2 import Request, urlopen, HTTPError
+
+PERCENTILES = [50, 95, 99]
+
+
+def load_records(path, endpoints=None):
+    """
+    Recorded requests which have their body, optionally only some endpoints.
+    """
+    records = []
+    with open(path) as lines:
+        for line in lines:
+            record = json.loads(line)
+            if record.get('body') is None:
+                continue
+            if endpoints and record['endpoint'] not in endpoints:
+                continue
+            records.append(record)
+    return records
+
+
+class HttpClient(object):
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def post(self, record):
+        path = record['endpoint'] + ('?' + record['query'] if record.get('query') else '')
+        request = Request(self.url + path, data=record['body'].encode('utf-8'),
+                          headers={'Content-Type': 'application/json'})
+        try:
+            response = urlopen(request)
+            response.read()
+            return response.getcode()
+        except HTTPError as e:
+            return e.code
+
+
+class InProcessClient(object):
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def post(self, record):
+        response = self.client.post(record['endpoint'], data=record['body'], content_type='application/json',
+                                    query_string=record.get('query') or None)
+        response.get_data()
+        return response.status_code
+
+
+def in_process_app():
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_app'))
+    from app import app
+    return app
+
+
+def replay(records, make_client, concurrency=8, rate=0., duration=60., max_requests=None, seed=0):
+    """
+    Send the records in a loop for `duration` seconds or `max_requests` requests.
+    Return the results as (endpoint, status, latency seconds), status None on exceptions,
+    and the elapsed seconds.
+    """
+    rng = random.Random(seed)
+    arrivals = queue.Queue(maxsize=0 if rate > 0 else concurrency)
+    results = []
+    lock = threading.Lock()
+    started = time.time()
+    deadline = started + duration
+
+    def send():
+        client = make_client()
+        while True:
+            item = arrivals.get()
+            if item is None:
+                return
+            record, arrived = item
+            # Closed loop: the latency starts when a client takes the request.
+            arrived = arrived or time.time()
+            try:
+                status = client.post(record)
+            except Exception:
+                status = None
+            with lock:
+                results.append((record['endpoint'], status, time.time() - arrived))
+
+    clients = [threading.Thread(target=send) for _ in range(concurrency)]
+    for client in clients:
+        client.daemon = True
+        client.start()
+
+    sent = 0
+    next_arrival = started
+    while time.time() < deadline and (max_requests is None or sent < max_requests):
+        arrived = None
+        if rate > 0:
+            next_arrival += rng.expovariate(rate)
+            time.sleep(max(0., next_arrival - time.time()))
+            arrived = next_arrival
+        arrivals.put((records[sent % len(records)], arrived))
+        sent += 1
+
+    for _ in clients:
+        arrivals.put(None)
+    for client in clients:
+        client.join()
+    return results, time.time() - started
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies = np.asarray(latencies)
+    errors = sum(1 for status in statuses if status is None or status >= 400)
+    summary = {
+        'requests': len(statuses),
+        'throughput': len(statuses) / elapsed if elapsed > 0 else 0.,
+        'error_rate': errors / float(len(statuses)) if statuses else 0.,
+        'statuses': {},
+        'max': float(latencies.max()) if len(latencies) else None
+    }
+    for status in statuses:
+        key = str(status)
+        summary['statuses'][key] = summary['statuses'].get(key, 0) + 1
+    for percentile in PERCENTILES:
+        summary['p%d' % percentile] = float(np.percentile(latencies, percentile)) if len(latencies) else None
+    return summary
+
+
+def report(results, elapsed):
+    """
+    Summary of all the requests and of every endpoint.
+    """
+    by_endpoint = {}
+    for endpoint, status, latency in results:
+        by_endpoint.setdefault(endpoint, ([], []))
+        by_endpoint[endpoint][0].append(latency)
+        by_endpoint[endpoint][1].append(status)
+    return {
+        'elapsed': elapsed,
+        'total': summarize([r[2] for r in results], [r[1] for r in results], elapsed),
+        'endpoints': dict((endpoint, summarize(latencies, statuses, elapsed))
+                          for endpoint, (latencies, statuses) in by_endpoint.items())
+    }
+
+
+def _ms(seconds):
+    return '%9.1f' % (1000 * seconds) if seconds is not None else '%9s' % '-'
+
+
+def print_report(result):
+    print('%-16s %8s %9s %7s %9s %9s %9s %9s' % ('endpoint', 'requests', 'req/s', 'errors',
+                                                 'p50 ms', 'p95 ms', 'p99 ms', 'max ms'))
+    rows = sorted(result['endpoints'].items()) + [('total', result['total'])]
+    for endpoint, summary in rows:
+        print('%-16s %8d %9.2f %6.1f%% %s %s %s %s' % (
+            endpoint, summary['requests'], summary['throughput'], 100 * summary['error_rate'],
+            _ms(summary['p50']), _ms(summary['p95']), _ms(summary['p99']), _ms(summary['max'])))
+
+
+def _change(before, after):
+    if before is None or after is None or before == 0:
+        return '%8s' % '-'
+    return '%+7.1f%%' % (100. * (after - before) / before)
+
+
+def print_diff(before, after):
+    """
+    Relative change of the throughput, the error rate and the percentiles of every endpoint.
+    """
+    print('%-16s %9s %9s %9s %9s %9s' % ('endpoint', 'req/s', 'errors', 'p50', 'p95', 'p99'))
+    endpoints = sorted(set(before['endpoints']) | set(after['endpoints']))
+    for endpoint in endpoints + ['total']:
+        old = before['total'] if endpoint == 'total' else before['endpoints'].get(endpoint)
+        new = after['total'] if endpoint == 'total' else after['endpoints'].get(endpoint)
+        if old is None or new is None:
+            print('%-16s %s' % (endpoint, 'only in ' + ('after' if old is None else 'before')))
+            continue
+        print('%-16s %s %+8.1fpt %s %s %s' % (
+            endpoint, _change(old['throughput'], new['throughput']),
+            100 * (new['error_rate'] - old['error_rate']),
+            _change(old['p50'], new['p50']), _change(old['p95'], new['p95']), _change(old['p99'], new['p99'])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded traffic and compare the reports.')
+    commands = parser.add_subparsers(dest='command')
+    run = commands.add_parser('run')
+    run.add_argument('records')
+    run.add_argument('--url', help='base url of the app, in-process when left out')
+    run.add_argument('--concurrency', type=int, default=8)
+    run.add_argument('--rate', type=float, default=0., help='arrivals per second, 0 for a closed loop')
+    run.add_argument('--duration', type=float, default=60.)
+    run.add_argument('--requests', type=int, default=None)
+    run.add_argument('--endpoints', nargs='*')
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--output')
+    diff = commands.add_parser('diff')
+    diff.add_argument('before')
+    diff.add_argument('after')
+    args = parser.parse_args()
+
+    if args.command == 'diff':
+        with open(args.before) as before, open(args.after) as after:
+            print_diff(json.load(before), json.load(after))
+        return
+
+    records = load_records(args.records, args.endpoints)
+    if not records:
+        sys.exit('No replayable records in %s' % args.records)
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        app = in_process_app()
+        make_client = lambda: InProcessClient(app)
+
+    results, elapsed = replay(records, make_client, args.concurrency, args.rate, args.duration,
+                              args.requests, args.seed)
+    result = report(results, elapsed)
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(result, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Recommend /vrp time budgets from the search telemetry log (SEARCH_TELEMETRY_PATH).
+
+    python benchmarks/telemetry_report.py telemetry.jsonl [--within 1%] [--quantile 90]
+        [--margin 1.2] [--edges 25 50 100 200 400 800]
+
+Searches are grouped by number of locations. In each bucket, the budget is the given
+quantile of the time the searches took to get within `within` of their final objective,
+times `margin`. Buckets where many searches were still improving in the last tenth of
+their time limit are flagged: their budget can't be read from the log and the limit
+should rather be raised.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import math
+import numpy as np
+
+# A search improving after this fraction of its time limit was cut short.
+LATE_FRACTION = 0.9
+# Buckets with more late improving searches than this get no recommendation.
+MAX_LATE = 0.25
+
+
+def load(path):
+    with open(path) as lines:
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+def bucket_of(locations, edges):
+    for low, high in zip([0] + edges, edges + [None]):
+        if high is None or locations < high:
+            return low, high
+
+
+def bucket_name(low, high):
+    return '%d+' % low if high is None else '%d-%d' % (low, high - 1)
+
+
+def recommend(records, within='1%', quantile=90, margin=1.2, edges=(25, 50, 100, 200, 400, 800)):
+    """
+    Statistics and recommended time limit (ms) of every bucket of locations.
+    """
+    buckets = {}
+    for record in records:
+        buckets.setdefault(bucket_of(record['locations'], list(edges)), []).append(record)
+
+    rows = []
+    for (low, high), runs in sorted(buckets.items()):
+        reached = [run['ms_to_within'].get(within) for run in runs]
+        reached = [ms for ms in reached if ms is not None]
+        first = [run['first_solution_ms'] for run in runs if run['first_solution_ms'] is not None]
+        late = [run for run in runs if run['last_improvement_ms'] is not None
+                and run['last_improvement_ms'] >= LATE_FRACTION * run['time_limit_ms']]
+        limit = max(run['time_limit_ms'] for run in runs)
+        row = {
+            'bucket': bucket_name(low, high),
+            'runs': len(runs),
+            'first_solution_ms': float(np.median(first)) if first else None,
+            'p50_to_within_ms': float(np.percentile(reached, 50)) if reached else None,
+            'quantile_to_within_ms': float(np.percentile(reached, quantile)) if reached else None,
+            'late_improving': len(late) / float(len(runs)),
+            'time_limit_ms': limit,
+            'recommended_ms': None
+        }
+        if reached:
+            # Rounded up to the second.
+            row['recommended_ms'] = min(limit, int(1000 * math.ceil(row['quantile_to_within_ms'] * margin / 1000.)))
+        if row['late_improving'] > MAX_LATE:
+            row['recommended_ms'] = None
+        rows.append(row)
+    return rows
+
+
+def _value(value, pattern='%10.0f'):
+    return pattern % value if value is not None else '%10s' % '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recommend /vrp time budgets from the search telemetry.')
+    parser.add_argument('log')
+    parser.add_argument('--within', default='1%', help='gap to the final objective, one of the logged ones')
+    parser.add_argument('--quantile', type=float, default=90)
+    parser.add_argument('--margin', type=float, default=1.2)
+    parser.add_argument('--edges', type=int, nargs='*', default=[25, 50, 100, 200, 400, 800],
+                        help='upper bounds of the buckets of locations')
+    parser.add_argument('--output', help='write the rows as json')
+    args = parser.parse_args()
+
+    rows = recommend(load(args.log), args.within, args.quantile, args.margin, args.edges)
+    print('%-10s %6s %10s %10s %10s %8s %10s %12s' % ('locations', 'runs', 'first ms', 'p50 ms',
+                                                      'p%g ms' % args.quantile, 'late', 'limit ms', 'recommended'))
+    for row in rows:
+        recommended = _value(row['recommended_ms'], '%12d') if row['recommended_ms'] is not None else (
+            '%12s' % ('raise limit' if row['late_improving'] > MAX_LATE else '-'))
+        print('%-10s %6d %s %s %s %7.0f%% %10d %s' % (
+            row['bucket'], row['runs'], _value(row['first_solution_ms']), _value(row['p50_to_within_ms']),
+            _value(row['quantile_to_within_ms']), 100 * row['late_improving'], row['time_limit_ms'], recommended))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(rows, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Time and cost of the /tsp engines on random euclidean instances, by number of nodes.
+
+    python benchmarks/tsp.py [--sizes 5 8 10 12 20 50 100 200 300 500] [--runs 5]
+        [--time-limit-ms 10000] [--open]
+
+Every engine runs in its size band and the one above: the exact engine up to
+HELD_KARP_MAX nodes, the local search up to LOCAL_SEARCH_MAX and OR-tools on all of
+them. The gap is to the best total found on the instance.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_app', 'ortools_packages'))
+from tsp_adaptive import HELD_KARP_MAX, LOCAL_SEARCH_MAX, engine_for, solve_tsp
+
+
+def engines(n):
+    names = ['ortools']
+    if n <= LOCAL_SEARCH_MAX * 2:
+        names.insert(0, 'local_search')
+    if n <= HELD_KARP_MAX:
+        names.insert(0, 'exact')
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the /tsp engines by size band.')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[5, 8, 10, 12, 20, 50, 100, 200, 300, 500])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--time-limit-ms', type=int, default=10000)
+    parser.add_argument('--open', action='store_true', help='paths from the first to the last node')
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    print('%6s %-13s %4s %10s %10s %8s' % ('nodes', 'engine', 'auto', 'mean ms', 'max ms', 'gap'))
+    for n in args.sizes:
+        timings, totals = {}, {}
+        for _ in range(args.runs):
+            points = rng.rand(n, 2) * 100
+            matrix = np.sqrt(((points[:, None] - points[None, :]) ** 2).sum(axis=2))
+            ends = [n - 1] if args.open else None
+            for engine in engines(n):
+                started = time.time()
+                result = solve_tsp(matrix, 0, ends, engine, args.time_limit_ms)
+                timings.setdefault(engine, []).append(1000 * (time.time() - started))
+                totals.setdefault(engine, []).append(result['total'] if result else np.inf)
+        best = np.min([totals[engine] for engine in totals], axis=0)
+        for engine in engines(n):
+            gap = np.mean(np.array(totals[engine]) / best - 1)
+            print('%6d %-13s %4s %10.2f %10.2f %7.2f%%' % (
+                n, engine, '*' if engine == engine_for(n) else '', np.mean(timings[engine]),
+                np.max(timings[engine]), 100 * gap))
+
+
+if __name__ == '__main__':
+    main()
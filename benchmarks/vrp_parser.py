@@ -0,0 +1,74 @@
+"""
+Peak memory of parsing a large /vrp body, with json and with the streaming parser.
+
+    python benchmarks/vrp_parser.py [num_locations]
+
+Each parser runs in a fresh process; the peak RSS growth during the parse is compared
+with the size of the typed arrays.
+"""
+from __future__ import print_function
+
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_app'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_app', 'ortools_packages'))
+from vrp_stream import parse_vrp
+
+
+def write_body(path, num_locations, rng):
+    """
+    /vrp body with a 0/1 arc matrix, the fields besides the large arrays are left out.
+    """
+    with open(path, 'w') as body:
+        body.write('{"lats": %s, ' % json.dumps(rng.uniform(10, 11, num_locations).tolist()))
+        body.write('"lons": %s, ' % json.dumps(rng.uniform(106, 107, num_locations).tolist()))
+        body.write('"demands": %s, ' % json.dumps(rng.randint(0, 5000, num_locations).tolist()))
+        body.write('"matrix": [')
+        for i in range(num_locations):
+            if i > 0:
+                body.write(', ')
+            body.write(json.dumps((rng.uniform(size=num_locations) > 0.1).astype(int).tolist()))
+        body.write(']}')
+
+
+def peak_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(method, path, results):
+    before = peak_kb()
+    with io.open(path, 'rb') as body:
+        if method == 'json':
+            data = json.loads(body.read().decode('utf-8'))
+        else:
+            data = parse_vrp(body)
+    results.put((method, peak_kb() - before))
+
+
+def main():
+    num_locations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    path = os.path.join(tempfile.gettempdir(), 'vrp_parser_body.json')
+    write_body(path, num_locations, np.random.RandomState(0))
+    typed_kb = (num_locations * num_locations * 4 + 3 * num_locations * 8) // 1024
+    print('locations: %d, body: %d KB, typed arrays: %d KB' % (
+        num_locations, os.path.getsize(path) // 1024, typed_kb))
+
+    results = multiprocessing.Queue()
+    for method in ['json', 'stream']:
+        process = multiprocessing.Process(target=measure, args=(method, path, results))
+        process.start()
+        process.join()
+        name, growth_kb = results.get()
+        print('%-8s peak RSS growth: %d KB (%.1fx the typed arrays)' % (name, growth_kb, float(growth_kb) / typed_kb))
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Routing search of generated /vrp instances with and without the arc presolve: arcs
+pruned, first solution, best objective and the time each search took to reach the
+final objective of the search without presolve.
+
+    python benchmarks/vrp_presolve.py [--sizes 50 100 200] [--time-limit-ms 30000] [--seed 0]
+
+The instances have a depot and customers with time windows of 1 to 3 hours over the
+day, so many customer pairs can't follow each other.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_app'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_app', 'ortools_packages'))
+from search_telemetry import SearchTelemetry
+from vrp import Evaluator, solve_vrp
+from vrp_presolve import impossible_arcs
+
+
+def generate(num_locations, rng):
+    """
+    /vrp request data with the depot at node 0 and a vehicle per 8 customers.
+    """
+    num_vehicles = max(1, num_locations // 8)
+    start_times = np.concatenate([[0.], rng.uniform(7, 17, num_locations - 1)])
+    end_times = np.concatenate([[24.], start_times[1:] + rng.uniform(1, 3, num_locations - 1)])
+    return {
+        'allow_drop': 0,
+        'departure_times': [6.] * num_vehicles,
+        'return_times': [23.] * num_vehicles,
+        'vehicle_capacities': [8000] * num_vehicles,
+        'vehicle_costs': [0] * num_vehicles,
+        'lats': rng.uniform(10.7, 10.9, num_locations).tolist(),
+        'lons': rng.uniform(106.6, 106.8, num_locations).tolist(),
+        'departure_depots': [0] * num_vehicles,
+        'return_depots': [0] * num_vehicles,
+        'start_times': start_times.tolist(),
+        'end_times': end_times.tolist(),
+        'demands': [0] + rng.randint(100, 3000, num_locations - 1).tolist(),
+        'matrix': np.ones((num_locations, num_locations), dtype=int).tolist(),
+        'groups': [],
+        'velocities': [40.] * num_vehicles,
+        'horizon': 24 * 3600,
+        'loadings': [0] + [300] * (num_locations - 1),
+        'unloadings': [0] + [300] * (num_locations - 1),
+        'min_weights': [0] * num_vehicles,
+        'first_vendor_index': num_vehicles
+    }
+
+
+def search(data, presolve, time_limit_ms):
+    telemetry = SearchTelemetry(time_limit_ms)
+    started = time.time()
+    solution = solve_vrp(dict(data, presolve=presolve), Evaluator(), time_limit_ms=time_limit_ms,
+                         monitors=[telemetry])
+    return solution, telemetry, 1000 * (time.time() - started)
+
+
+def reached_ms(telemetry, objective):
+    reached = [ms for ms, value in telemetry.trajectory if value <= objective]
+    return reached[0] if reached else None
+
+
+def _value(value):
+    return '%10d' % value if value is not None else '%10s' % '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the /vrp arc presolve.')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[50, 100, 200])
+    parser.add_argument('--time-limit-ms', type=int, default=30000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(args.seed)
+    print('%9s %8s %10s %9s %10s %12s %10s %10s' % ('locations', 'presolve', 'pruned', 'build ms', 'first ms',
+                                                   'objective', 'to base ms', 'wall ms'))
+    for num_locations in args.sizes:
+        data = generate(num_locations, rng)
+        started = time.time()
+        _, counts = impossible_arcs(data, Evaluator())
+        presolve_ms = 1000 * (time.time() - started)
+
+        runs = [(presolve, search(data, presolve, args.time_limit_ms)) for presolve in (False, True)]
+        baseline = runs[0][1][0]
+        for presolve, (solution, telemetry, wall_ms) in runs:
+            pruned = '%d/%d' % (counts['pruned'], counts['arcs']) if presolve else '-'
+            objective = solution[0] if solution else None
+            to_baseline = reached_ms(telemetry, baseline[0]) if baseline else None
+            print('%9d %8s %10s %9.0f %s %s %s %10.0f' % (
+                num_locations, 'on' if presolve else 'off', pruned, wall_ms - telemetry.wall_ms,
+                _value(telemetry.trajectory[0][0] if telemetry.trajectory else None), '%12s' % objective,
+                _value(to_baseline), wall_ms))
+        print('%9s presolve itself: %.1f ms' % ('', presolve_ms))
+
+
+if __name__ == '__main__':
+    main()
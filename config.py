@@ -0,0 +1,62 @@
+import os
+
+# JSON encoder used by every view: 'auto' (fastest installed), 'orjson' or 'json'.
+JSON_ENCODER = 'auto'
+
+# Admission control, per endpoint: largest number of solves in flight and largest
+# estimated solve time (seconds) served here. The estimate is coefficient * size ^ exponent,
+# with the size taken from the instance dimensions (see admission.SIZE_FUNCTIONS),
+# and is re-calibrated from the recorded timings.
+ADMISSION_LIMITS = {
+    'vrp': {'max_concurrency': 2, 'max_seconds': 120., 'coefficient': 2e-3, 'exponent': 1.0},
+    'vrp_insert': {'max_concurrency': 8, 'max_seconds': 10., 'coefficient': 1e-5, 'exponent': 1.0},
+    'distances': {'max_concurrency': 4, 'max_seconds': 30., 'coefficient': 2e-5, 'exponent': 1.0},
+    'tsp': {'max_concurrency': 4, 'max_seconds': 30., 'coefficient': 1e-6, 'exponent': 1.0},
+    'mip': {'max_concurrency': 4, 'max_seconds': 30., 'coefficient': 1e-2, 'exponent': 1.0},
+    'bpp': {'max_concurrency': 4, 'max_seconds': 30., 'coefficient': 1e-4, 'exponent': 1.5},
+    'bpp2d': {'max_concurrency': 4, 'max_seconds': 30., 'coefficient': 1e-5, 'exponent': 1.2},
+    'min_cost': {'max_concurrency': 4, 'max_seconds': 30., 'coefficient': 1e-5, 'exponent': 1.0},
+    'ntf_assignment': {'max_concurrency': 4, 'max_seconds': 30., 'coefficient': 1e-6, 'exponent': 1.0}
+}
+# Base url of the slow lane taking the jobs above max_seconds, None rejects them with 503.
+ADMISSION_SLOW_LANE_URL = None
+# Json lines file of the recorded timings, None keeps them in memory only.
+ADMISSION_TIMINGS_PATH = None
+
+# Result cache of /vrp, /tsp, /mip, /bpp and /distances keyed by the request content.
+RESULT_CACHE_ENABLED = False
+RESULT_CACHE_MAX_ENTRIES = 256
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+RESULT_CACHE_TTL = 600.
+# /vrp runs a time limited search, identical requests may get different plans.
+# Cache it anyway when True.
+RESULT_CACHE_NONDETERMINISTIC = False
+
+# Directory of the road graph files selected with 'graph' by /distances and /vrp
+# when they use the road network distances.
+ROAD_GRAPH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'graphs')
+
+# Queue of the jobs posted to /jobs and solved by worker.py processes, on this host or
+# on hosts sharing the queue. Other backends are added with jobqueue.register_backend.
+# JOB_QUEUE_PATH in the environment overrides the SQLite file.
+JOB_QUEUE_BACKEND = 'sqlite'
+JOB_QUEUE_OPTIONS = {
+    'path': os.environ.get('JOB_QUEUE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs.sqlite')),
+    'max_attempts': 3
+}
+# Workers extend their lease every third of it, a job is queued again when it expires.
+JOB_LEASE_SECONDS = 60.
+
+# Sample of the production requests recorded for benchmarks/replay.py, off by default.
+RECORDER_ENABLED = False
+RECORDER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traffic.jsonl')
+RECORDER_SAMPLE_RATE = 0.01
+# Paths recorded, None records every POST.
+RECORDER_ENDPOINTS = ['/vrp', '/distances', '/bpp2d', '/min_cost']
+# Larger bodies are recorded without their content, as are those /vrp parses as a stream
+# (vrp_stream.STREAMING_THRESHOLD).
+RECORDER_MAX_BODY_BYTES = 1024 * 1024
+
+# Json lines log of the /vrp search trajectories for benchmarks/telemetry_report.py,
+# None only records them for the requests with 'telemetry': true.
+SEARCH_TELEMETRY_PATH = None
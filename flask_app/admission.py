@@ -0,0 +1,274 @@
+from collections import deque
+from functools import wraps
+from flask import current_app, redirect, request
+
+import json
+import math
+import os
+import threading
+import time
+
+from errors import ErrorHandler
+
+# Fewest timings a cost model is calibrated on.
+MIN_CALIBRATION_SAMPLES = 10
+# Range of the fitted exponent, a few timings of similar sizes can give any slope.
+MIN_EXPONENT = 0.5
+MAX_EXPONENT = 3.0
+
+
+def vrp_size(data):
+    """
+    Locations x vehicles of a /vrp request.
+    """
+    return len(data['lats']) * len(data['vehicle_capacities'])
+
+
+def vrp_insert_size(data):
+    """
+    New orders x locations of a /vrp/insert request, the locations bound the planned stops.
+    """
+    return len(data['orders']) * len(data['lats'])
+
+
+def distances_size(data):
+    """
+    Number of cells of a /distances matrix.
+    """
+    return len(data['locations']) ** 2
+
+
+def tsp_size(data):
+    """
+    Number of cells of the /tsp distance matrix.
+    """
+    return len(data['matrix'] if 'matrix' in data else data['lats']) ** 2
+
+
+def mip_size(data):
+    """
+    Truck types over all the sub problems of a /mip request.
+    """
+    return sum(len(obj['list_weights']) for obj in data['array'])
+
+
+def bpp_size(data):
+    """
+    Items x dimensions of a /bpp request.
+    """
+    return len(data['weights']) * len(data['weights'][0])
+
+
+def bpp2d_size(data):
+    """
+    Rectangles x bins of a /bpp2d request.
+    """
+    return len(data['rectangles']) * len(data['bins'])
+
+
+def min_cost_size(data):
+    """
+    Number of arcs of a /min_cost request.
+    """
+    return len(data['starts'])
+
+
+def assignment_size(data):
+    """
+    Rows x columns of the costs of an assignment: orders x trips of an
+    AssignmentProtocol input, vendors x orders of a /ntf_assignment request.
+    """
+    return len(data['costs']) * len(data['costs'][0])
+
+
+SIZE_FUNCTIONS = {
+    'vrp': vrp_size,
+    'vrp_insert': vrp_insert_size,
+    'distances': distances_size,
+    'tsp': tsp_size,
+    'mip': mip_size,
+    'bpp': bpp_size,
+    'bpp2d': bpp2d_size,
+    'min_cost': min_cost_size,
+    'assignment': assignment_size,
+    'ntf_assignment': assignment_size
+}
+
+
+class CostModel(object):
+    """
+    Estimated solve time in seconds as coefficient * size ^ exponent.
+
+    Methods:
+        - estimate: seconds expected for an instance size
+        - calibrate: fit the coefficient and the exponent on recorded (size, seconds) timings
+    """
+    def __init__(self, coefficient = 1e-4, exponent = 1.0):
+        self.coefficient = coefficient
+        self.exponent = exponent
+
+    def estimate(self, size):
+        if size <= 0:
+            return 0.
+        return self.coefficient * size ** self.exponent
+
+    def calibrate(self, samples):
+        """
+        Least squares fit of log(seconds) = log(coefficient) + exponent * log(size), the
+        exponent is kept within [MIN_EXPONENT, MAX_EXPONENT].
+        Return False when there are fewer than MIN_CALIBRATION_SAMPLES usable samples.
+        """
+        points = [(math.log(size), math.log(seconds)) for size, seconds in samples
+                  if size > 0 and seconds > 0]
+        if len(points) < MIN_CALIBRATION_SAMPLES:
+            return False
+
+        mean_x = sum(x for x, y in points) / len(points)
+        mean_y = sum(y for x, y in points) / len(points)
+        var_x = sum((x - mean_x) ** 2 for x, y in points)
+        if var_x > 0:
+            exponent = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+            self.exponent = min(max(exponent, MIN_EXPONENT), MAX_EXPONENT)
+        self.coefficient = math.exp(mean_y - self.exponent * mean_x)
+        return True
+
+
+class EndpointPolicy(object):
+    """
+    Admission limits of one endpoint.
+    """
+    def __init__(self, size, model, max_concurrency, max_seconds, max_samples):
+        self.size = size
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_seconds = max_seconds
+        self.samples = deque(maxlen = max_samples)
+        self.in_flight = []
+        self.new_samples = 0
+
+
+class AdmissionController(object):
+    """
+    Pre-solve admission layer. Each registered endpoint estimates the cost of a request
+    from its instance dimensions before running the view:
+        - more than max_concurrency solves in flight: 429 with Retry-After
+        - estimate above max_seconds: 307 to the slow lane when there is one,
+          otherwise 503 with Retry-After
+    Admitted solves answered with a cacheable 200 record their timings, and the cost model
+    is re-calibrated every `calibrate_every` new timings.
+    """
+    def __init__(self, slow_lane_url = None, timings_path = None, calibrate_every = 50, max_samples = 1000):
+        self.slow_lane_url = slow_lane_url
+        self.timings_path = timings_path
+        self.calibrate_every = calibrate_every
+        self.max_samples = max_samples
+        self.policies = {}
+        self.lock = threading.Lock()
+        # Appends to the timings file, apart so the admission checks never wait on the disk.
+        self.timings_lock = threading.Lock()
+        self.error_handler = ErrorHandler()
+
+    def register(self, endpoint, max_concurrency = 2, max_seconds = 60., coefficient = 1e-4, exponent = 1.0):
+        policy = EndpointPolicy(SIZE_FUNCTIONS[endpoint], CostModel(coefficient, exponent),
+                                max_concurrency, max_seconds, self.max_samples)
+        self.policies[endpoint] = policy
+        return policy
+
+    def load_timings(self, path = None):
+        """
+        Calibrate the registered endpoints from a timings file, one json record per line.
+        """
+        path = path or self.timings_path
+        if not path or not os.path.isfile(path):
+            return
+        with open(path, 'r') as timings:
+            for line in timings:
+                record = json.loads(line)
+                policy = self.policies.get(record['endpoint'])
+                if policy is not None:
+                    policy.samples.append((record['size'], record['seconds']))
+        for policy in self.policies.values():
+            policy.model.calibrate(policy.samples)
+
+    def record(self, endpoint, size, seconds):
+        policy = self.policies[endpoint]
+        with self.lock:
+            policy.samples.append((size, seconds))
+            policy.new_samples += 1
+            if policy.new_samples >= self.calibrate_every:
+                policy.model.calibrate(policy.samples)
+                policy.new_samples = 0
+        if self.timings_path:
+            line = json.dumps({'endpoint': endpoint, 'size': size, 'seconds': seconds}) + '\n'
+            with self.timings_lock:
+                with open(self.timings_path, 'a') as timings:
+                    timings.write(line)
+
+    def retry_after(self, policy):
+        """
+        Seconds until the shortest solve in flight is expected to finish.
+        """
+        now = time.time()
+        remaining = [started + estimate - now for started, estimate in policy.in_flight]
+        return max(1, int(math.ceil(min(remaining or [1]))))
+
+    def guard(self, endpoint, view, loader = None):
+        """
+        Wrap a view function with the admission checks of an endpoint.
+        `loader` returns the request data, request.get_json by default.
+        """
+        policy = self.policies.get(endpoint)
+        if policy is None:
+            return view
+        loader = loader or (lambda: request.get_json())
+
+        @wraps(view)
+        def admitted(*args, **kwargs):
+            try:
+                size = policy.size(loader())
+            except (KeyError, IndexError, TypeError):
+                # Malformed input, let the view report it.
+                size = 0
+            estimate = policy.model.estimate(size)
+
+            if estimate > policy.max_seconds:
+                if self.slow_lane_url:
+                    return redirect(self.slow_lane_url.rstrip('/') + request.full_path.rstrip('?'), code = 307)
+                return self.error_handler.service_unavailable(
+                    'Instance too large: estimated %.1f s, limit %.1f s.' % (estimate, policy.max_seconds),
+                    retry_after = math.ceil(estimate))
+
+            entry = (time.time(), estimate)
+            with self.lock:
+                if len(policy.in_flight) >= policy.max_concurrency:
+                    return self.error_handler.too_many_requests(
+                        'Too many %s requests in flight.' % endpoint, retry_after = self.retry_after(policy))
+                policy.in_flight.append(entry)
+
+            def finish():
+                with self.lock:
+                    policy.in_flight.remove(entry)
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except Exception:
+                finish()
+                raise
+
+            # Errors, "No solution found." and solves cut short by their deadline (all marked
+            # no-store) don't time a full solve of the instance.
+            succeeded = response.status_code == 200 and not response.cache_control.no_store
+
+            def solved():
+                finish()
+                if succeeded:
+                    self.record(endpoint, size, time.time() - entry[0])
+
+            # A streamed solve holds its slot until the stream is closed.
+            if getattr(response, 'is_streamed', False):
+                response.call_on_close(solved)
+            else:
+                solved()
+            return response
+
+        return admitted
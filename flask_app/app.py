@@ -1,19 +1,51 @@
-from flask import Flask, jsonify
+from flask import Flask
 from flask_cors import CORS
 from errors import ErrorHandler, ExceptionHandler
+from encoders import jsonify, use_encoder
+from admission import AdmissionController
+from cache import ResultCache
+from jobqueue import create_queue
+from jobs import JobsView
+from recorder import TrafficRecorder
 from ortools_packages.bpp2d import Bpp2dSolver
 from ortools_packages.bpp import BppSolver
 from ortools_packages.mip import MipSolver
 from ortools_packages.vrp import VrpSolver, DistanceMatrix
+from ortools_packages.vrp_stream import load_vrp_request
+from ortools_packages.vrp_insertion import VrpInsertionSolver
+from ortools_packages.tsp_endpoint import AdaptiveTspSolver
 from ortools_packages.linear import MinCostFlowsSolver
+from ortools_packages.ntf_assignment import NtfAssignmentSolver
 
 import os
 
 app = Flask(__name__)
 basedir = os.path.abspath(os.path.dirname(__file__))
+app.config.from_pyfile(os.path.join(basedir, '..', 'config.py'), silent = True)
+use_encoder(app.config.get('JSON_ENCODER', 'auto'))
 error_handler = ErrorHandler()
 CORS(app)
 
+admission = AdmissionController(slow_lane_url = app.config.get('ADMISSION_SLOW_LANE_URL'),
+                                timings_path = app.config.get('ADMISSION_TIMINGS_PATH'))
+for endpoint, limits in app.config.get('ADMISSION_LIMITS', {}).items():
+    admission.register(endpoint, **limits)
+admission.load_timings()
+
+result_cache = ResultCache(enabled = app.config.get('RESULT_CACHE_ENABLED', False),
+                           max_entries = app.config.get('RESULT_CACHE_MAX_ENTRIES', 256),
+                           max_bytes = app.config.get('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+                           ttl = app.config.get('RESULT_CACHE_TTL', 600.),
+                           include_nondeterministic = app.config.get('RESULT_CACHE_NONDETERMINISTIC', False))
+
+job_queue = create_queue(app.config.get('JOB_QUEUE_BACKEND', 'sqlite'), **app.config.get('JOB_QUEUE_OPTIONS', {}))
+
+if app.config.get('RECORDER_ENABLED', False):
+    TrafficRecorder(app.config['RECORDER_PATH'],
+                    sample_rate = app.config.get('RECORDER_SAMPLE_RATE', 0.01),
+                    endpoints = app.config.get('RECORDER_ENDPOINTS'),
+                    max_body_bytes = app.config.get('RECORDER_MAX_BODY_BYTES', 1024 * 1024)).init_app(app)
+
 #region Error handlers
 @app.errorhandler(ExceptionHandler)
 def exception_handler(error):
@@ -35,23 +67,38 @@ def not_found_error(error):
 #endregion
 
 #region APIs
-bpp2dView = Bpp2dSolver.as_view('bpp2dView')
+bpp2dView = admission.guard('bpp2d', Bpp2dSolver.as_view('bpp2dView'))
 app.add_url_rule('/bpp2d', view_func = bpp2dView, methods=['POST'])
 
-bppView = BppSolver.as_view('bppView')
+bppView = result_cache.cached('bpp', admission.guard('bpp', BppSolver.as_view('bppView')))
 app.add_url_rule('/bpp', view_func = bppView, methods = ['POST'])
 
-mipView = MipSolver.as_view('mipView')
+mipView = result_cache.cached('mip', admission.guard('mip', MipSolver.as_view('mipView')))
 app.add_url_rule('/mip', view_func = mipView, methods = ['POST'])
 
-vrpView = VrpSolver.as_view('vrpView')
+vrpView = result_cache.cached('vrp', admission.guard('vrp', VrpSolver.as_view('vrpView'), loader = load_vrp_request),
+                               deterministic = False, loader = load_vrp_request)
 app.add_url_rule('/vrp', view_func = vrpView, methods = ['POST'])
 
-distanceMatrixView = DistanceMatrix.as_view('distanceMatrixView')
+vrpInsertView = admission.guard('vrp_insert', VrpInsertionSolver.as_view('vrpInsertView'), loader = load_vrp_request)
+app.add_url_rule('/vrp/insert', view_func = vrpInsertView, methods = ['POST'])
+
+distanceMatrixView = result_cache.cached('distances', admission.guard(
+    'distances', DistanceMatrix.as_view('distanceMatrixView')))
 app.add_url_rule('/distances', view_func = distanceMatrixView, methods = ['POST'])
 
-linearView = MinCostFlowsSolver.as_view('linearView')
+tspView = result_cache.cached('tsp', admission.guard('tsp', AdaptiveTspSolver.as_view('tspView')), deterministic = False)
+app.add_url_rule('/tsp', view_func = tspView, methods = ['POST'])
+
+linearView = admission.guard('min_cost', MinCostFlowsSolver.as_view('linearView'))
 app.add_url_rule('/min_cost', view_func = linearView, methods = ['POST'])
+
+ntfAssignmentView = admission.guard('ntf_assignment', NtfAssignmentSolver.as_view('ntfAssignmentView'))
+app.add_url_rule('/ntf_assignment', view_func = ntfAssignmentView, methods = ['POST'])
+
+jobsView = JobsView.as_view('jobsView', job_queue)
+app.add_url_rule('/jobs', view_func = jobsView, methods = ['POST'])
+app.add_url_rule('/jobs/<job_id>', view_func = jobsView, methods = ['GET'])
 #endregion
 
 if __name__ == '__main__':
@@ -0,0 +1,156 @@
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, Response
+
+import hashlib
+import json
+import threading
+import time
+import numpy as np
+
+
+def _digest(obj):
+    """
+    Arrays of the streamed request bodies are keyed by the hash of their content.
+    """
+    if isinstance(obj, np.ndarray):
+        return {
+            'dtype': obj.dtype.str,
+            'shape': list(obj.shape),
+            'sha256': hashlib.sha256(np.ascontiguousarray(obj).tobytes()).hexdigest()
+        }
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError('Object of type %s is not JSON serializable' % type(obj).__name__)
+
+
+class _Flight(object):
+    """
+    A solve in progress, the requests with the same key wait for its result.
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+
+
+class ResultCache(object):
+    """
+    Content-addressed cache of the responses. The key is a hash of the endpoint, the
+    canonical json of the request body and the query parameters.
+        - Entries are evicted by LRU order, after `ttl` seconds, and when the total body
+          size exceeds `max_bytes`.
+        - Concurrent requests with the same key wait for the single solve in flight.
+        - Non-deterministic endpoints are only cached with `include_nondeterministic`.
+        - Responses marked `Cache-Control: no-store` by the view, e.g. a solve cut short
+          by its deadline, are not cached.
+    """
+    def __init__(self, enabled = True, max_entries = 256, max_bytes = 64 * 1024 * 1024, ttl = 600.,
+                 include_nondeterministic = False):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.include_nondeterministic = include_nondeterministic
+        self.entries = OrderedDict()
+        self.size = 0
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key_for(endpoint, payload, params = None):
+        canonical = json.dumps([endpoint, payload, params or {}], sort_keys = True, separators = (',', ':'),
+                               default = _digest)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        if entry['expires'] < time.time():
+            self.size -= len(entry['body'])
+            return None
+        # Re-insert as most recently used.
+        self.entries[key] = entry
+        return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self._put(key, entry)
+
+    def _put(self, key, entry):
+        if len(entry['body']) > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old['body'])
+        self.entries[key] = entry
+        self.size += len(entry['body'])
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last = False)
+            self.size -= len(evicted['body'])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    @staticmethod
+    def _response(entry, status):
+        response = Response(entry['body'], status = entry['status'], mimetype = entry['mimetype'])
+        response.headers['X-Cache'] = status
+        return response
+
+    def cached(self, endpoint, view, deterministic = True, loader = None):
+        """
+        Wrap a view function with the cache.
+        `loader` returns the request data, request.get_json by default.
+        """
+        if not self.enabled or not (deterministic or self.include_nondeterministic):
+            return view
+        loader = loader or (lambda: request.get_json(silent = True))
+
+        @wraps(view)
+        def cached_view(*args, **kwargs):
+            payload = loader()
+            if payload is None:
+                return view(*args, **kwargs)
+            key = self.key_for(endpoint, payload, request.args.to_dict())
+
+            with self.lock:
+                entry = self._get(key)
+                if entry is not None:
+                    return self._response(entry, 'HIT')
+                flight = self.in_flight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self.in_flight[key] = _Flight()
+
+            if not leader:
+                flight.done.wait()
+                if flight.entry is not None:
+                    return self._response(flight.entry, 'HIT')
+                # The leader failed or its response can't be cached, solve on our own.
+                return view(*args, **kwargs)
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed and not response.cache_control.no_store:
+                    flight.entry = {
+                        'body': response.get_data(),
+                        'status': response.status_code,
+                        'mimetype': response.mimetype,
+                        'expires': time.time() + self.ttl
+                    }
+                    self.put(key, flight.entry)
+                    response.headers['X-Cache'] = 'MISS'
+                return response
+            finally:
+                with self.lock:
+                    del self.in_flight[key]
+                flight.done.set()
+
+        return cached_view
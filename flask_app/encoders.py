@@ -0,0 +1,78 @@
+from flask import Response
+
+import json
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    """
+    Convert numpy values, which the encoders can't serialize by themselves.
+    """
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError('Object of type %s is not JSON serializable' % type(obj).__name__)
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, separators=(',', ':'), default=_default)
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+_encoders = {
+    'json': _json_dumps
+}
+if orjson is not None:
+    _encoders['orjson'] = _orjson_dumps
+
+_active = {
+    'name': 'orjson' if orjson is not None else 'json'
+}
+
+
+def register_encoder(name, dumps):
+    """
+    Register an encoder. `dumps` takes an object and returns str or bytes.
+    """
+    _encoders[name] = dumps
+
+
+def use_encoder(name):
+    """
+    Select the encoder used by `jsonify`. 'auto' picks the fastest one installed.
+    """
+    if name == 'auto':
+        name = 'orjson' if 'orjson' in _encoders else 'json'
+    if name not in _encoders:
+        raise ValueError('Unknown JSON encoder: %s' % name)
+    _active['name'] = name
+
+
+def encoder_name():
+    """
+    Name of the encoder currently in use.
+    """
+    return _active['name']
+
+
+def dumps(obj):
+    """
+    Serialize obj with the active encoder.
+    """
+    return _encoders[_active['name']](obj)
+
+
+def jsonify(obj):
+    """
+    Drop-in replacement of flask.jsonify for a single object.
+    """
+    return Response(dumps(obj), mimetype='application/json')
@@ -1,4 +1,4 @@
-from flask import jsonify
+from encoders import jsonify
 
 class ErrorHandler:
     def bad_request(self, message):
@@ -37,6 +37,32 @@ class ErrorHandler:
         response.status_code = 404
         return response
 
+    def too_many_requests(self, message, retry_after):
+        """
+        Error 429 handler
+        """
+        response = jsonify({
+            'status': 429,
+            'error': 'too many requests',
+            'message': message
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(int(retry_after))
+        return response
+
+    def service_unavailable(self, message, retry_after):
+        """
+        Error 503 handler
+        """
+        response = jsonify({
+            'status': 503,
+            'error': 'service unavailable',
+            'message': message
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(int(retry_after))
+        return response
+
 class ExceptionHandler(Exception):
     """
     Exception handler
@@ -0,0 +1,192 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobQueue(object):
+    """
+    Queue of solver jobs shared by the API and the workers of several hosts.
+    A worker leases a job for `lease_seconds` and extends the lease with heartbeats;
+    a job whose lease expires (dead worker) is queued again, up to `max_attempts` leases.
+
+    Jobs are dicts with: id, endpoint, payload, state, worker, attempts, status_code,
+    result, error, created, updated.
+
+    Methods:
+        - submit: add a job, return its id
+        - lease: next queued job for a worker, or None
+        - heartbeat: extend the lease of a running job, False when the worker lost it
+        - complete, fail: report the outcome of a leased job
+        - get: a job by id, or None
+        - requeue_expired: queue again the jobs with an expired lease
+    """
+    def __init__(self, max_attempts = 3):
+        self.max_attempts = max_attempts
+
+    def submit(self, endpoint, payload):
+        raise NotImplementedError
+
+    def lease(self, worker, lease_seconds):
+        raise NotImplementedError
+
+    def heartbeat(self, job_id, worker, lease_seconds):
+        raise NotImplementedError
+
+    def complete(self, job_id, worker, status_code, result):
+        raise NotImplementedError
+
+    def fail(self, job_id, worker, error):
+        raise NotImplementedError
+
+    def get(self, job_id):
+        raise NotImplementedError
+
+    def requeue_expired(self):
+        raise NotImplementedError
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Job queue in a SQLite file. Workers of several processes, or hosts sharing the file
+    system, lease jobs in write transactions so a job is leased by one worker at a time.
+    """
+    def __init__(self, path, max_attempts = 3, timeout = 30.):
+        super(SQLiteJobQueue, self).__init__(max_attempts)
+        self.path = path
+        self.timeout = timeout
+        with self._connect() as connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    status_code INTEGER,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )''')
+            connection.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created)')
+
+    def _connect(self):
+        """
+        A connection per call, sqlite3 connections can't be shared between threads.
+        """
+        connection = sqlite3.connect(self.path, timeout = self.timeout, isolation_level = None)
+        connection.row_factory = sqlite3.Row
+        return _Transaction(connection)
+
+    def submit(self, endpoint, payload):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT INTO jobs (id, endpoint, payload, state, created, updated) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, endpoint, json.dumps(payload), QUEUED, now, now))
+        return job_id
+
+    def _requeue_expired(self, connection, now):
+        connection.execute(
+            'UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, error = ?, updated = ? '
+            'WHERE state = ? AND lease_expires < ? AND attempts >= ?',
+            (FAILED, 'Lease expired %d times.' % self.max_attempts, now, RUNNING, now, self.max_attempts))
+        return connection.execute(
+            'UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, updated = ? '
+            'WHERE state = ? AND lease_expires < ?',
+            (QUEUED, now, RUNNING, now)).rowcount
+
+    def requeue_expired(self):
+        with self._connect() as connection:
+            return self._requeue_expired(connection, time.time())
+
+    def lease(self, worker, lease_seconds):
+        now = time.time()
+        with self._connect() as connection:
+            self._requeue_expired(connection, now)
+            row = connection.execute(
+                'SELECT * FROM jobs WHERE state = ? ORDER BY created LIMIT 1', (QUEUED,)).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                'UPDATE jobs SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, updated = ? '
+                'WHERE id = ?',
+                (RUNNING, worker, now + lease_seconds, now, row['id']))
+        return self.get(row['id'])
+
+    def heartbeat(self, job_id, worker, lease_seconds):
+        now = time.time()
+        with self._connect() as connection:
+            return connection.execute(
+                'UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND worker = ? AND state = ?',
+                (now + lease_seconds, now, job_id, worker, RUNNING)).rowcount == 1
+
+    def complete(self, job_id, worker, status_code, result):
+        with self._connect() as connection:
+            return connection.execute(
+                'UPDATE jobs SET state = ?, status_code = ?, result = ?, lease_expires = NULL, updated = ? '
+                'WHERE id = ? AND worker = ? AND state = ?',
+                (DONE, status_code, result, time.time(), job_id, worker, RUNNING)).rowcount == 1
+
+    def fail(self, job_id, worker, error):
+        with self._connect() as connection:
+            return connection.execute(
+                'UPDATE jobs SET state = ?, error = ?, lease_expires = NULL, updated = ? '
+                'WHERE id = ? AND worker = ? AND state = ?',
+                (FAILED, error, time.time(), job_id, worker, RUNNING)).rowcount == 1
+
+    def get(self, job_id):
+        with self._connect() as connection:
+            row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict((key, row[key]) for key in row.keys() if key != 'lease_expires')
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+
+class _Transaction(object):
+    """
+    Connection used as a write transaction taken at the start (BEGIN IMMEDIATE),
+    committed or rolled back and closed at the end of a with block.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self.connection.close()
+
+
+_backends = {
+    'sqlite': lambda path = 'jobs.sqlite', **options: SQLiteJobQueue(os.path.abspath(path), **options)
+}
+
+
+def register_backend(name, factory):
+    """
+    Register a queue backend. `factory(**options)` returns a JobQueue.
+    """
+    _backends[name] = factory
+
+
+def create_queue(backend = 'sqlite', **options):
+    if backend not in _backends:
+        raise ValueError('Unknown job queue backend: %s' % backend)
+    return _backends[backend](**options)
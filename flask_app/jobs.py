@@ -0,0 +1,102 @@
+from flask import request
+from flask.views import MethodView
+
+import json
+
+from errors import ExceptionHandler
+from encoders import dumps, jsonify
+from ortools_packages.assignment import AssignmentProtocol
+from ortools_packages.bpp2d import Bpp2dSolver
+from ortools_packages.bpp import BppSolver
+from ortools_packages.mip import MipSolver
+from ortools_packages.vrp import VrpSolver, DistanceMatrix
+from ortools_packages.vrp_insertion import VrpInsertionSolver
+from ortools_packages.tsp_endpoint import AdaptiveTspSolver
+from ortools_packages.linear import MinCostFlowsSolver
+from ortools_packages.ntf_assignment import NtfAssignmentSolver
+
+# Solvers a job can run: the views by the path of their endpoint, and the assignment protocol.
+JOB_VIEWS = {
+    'vrp': ('/vrp', VrpSolver),
+    'vrp_insert': ('/vrp/insert', VrpInsertionSolver),
+    'distances': ('/distances', DistanceMatrix),
+    'tsp': ('/tsp', AdaptiveTspSolver),
+    'mip': ('/mip', MipSolver),
+    'bpp': ('/bpp', BppSolver),
+    'bpp2d': ('/bpp2d', Bpp2dSolver),
+    'min_cost': ('/min_cost', MinCostFlowsSolver),
+    'ntf_assignment': ('/ntf_assignment', NtfAssignmentSolver)
+}
+JOB_ENDPOINTS = sorted(list(JOB_VIEWS) + ['assignment'])
+
+
+def assign(payload):
+    """
+    Assignment job, the input of stm_assignment with the costs already computed.
+    """
+    return AssignmentProtocol(payload['costs'], payload['order_weights'], payload['order_cbms'],
+                              payload['max_weights'], payload['max_cbms'],
+                              engine = payload.get('engine', 'auto'), presolve = payload.get('presolve', False),
+                              processes = payload.get('processes')).Assign()
+
+
+def run_job(app, job):
+    """
+    Solve a job outside of the admission control and the cache.
+    Return the status code and the body of the response.
+    """
+    payload = job['payload']
+    try:
+        if job['endpoint'] == 'assignment':
+            return 200, dumps(assign(payload))
+        path, view_class = JOB_VIEWS[job['endpoint']]
+        with app.test_request_context(path, method = 'POST', data = json.dumps(payload),
+                                      content_type = 'application/json'):
+            response = app.make_response(view_class.as_view(job['endpoint'])())
+            return response.status_code, response.get_data(as_text = True)
+    except ExceptionHandler as e:
+        return getattr(e, 'status_code', 400), dumps(e.convert2Dict())
+
+
+class JobsView(MethodView):
+    """
+    Queue a solve for the workers and poll its result:
+        - POST /jobs { 'endpoint': ..., 'payload': ... }: 202 with the job id
+        - GET /jobs/<job_id>: state of the job, and the response of the solver once done
+    """
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def post(self):
+        data = request.get_json(silent = True)
+        if not isinstance(data, dict):
+            raise ExceptionHandler(message = 'The body must be a JSON object.', status_code = 400)
+        if data.get('endpoint') not in JOB_ENDPOINTS:
+            raise ExceptionHandler(message = 'Unknown endpoint: %s' % data.get('endpoint'), status_code = 400)
+        if 'payload' not in data:
+            raise ExceptionHandler(message = 'Missing payload.', status_code = 400)
+        response = jsonify({ 'id': self.queue.submit(data['endpoint'], data['payload']) })
+        response.status_code = 202
+        return response
+
+    def get(self, job_id):
+        job = self.queue.get(job_id)
+        if job is None:
+            raise ExceptionHandler(message = 'Unknown job: %s' % job_id, status_code = 404)
+
+        result = job['result']
+        if result is not None:
+            try:
+                result = json.loads(result)
+            except ValueError:
+                pass
+        return jsonify({
+            'id': job['id'],
+            'endpoint': job['endpoint'],
+            'state': job['state'],
+            'attempts': job['attempts'],
+            'status_code': job['status_code'],
+            'result': result,
+            'error': job['error']
+        })
@@ -1,9 +1,44 @@
+from __future__ import print_function
 from ortools.linear_solver import pywraplp
+from assignment_heuristic import HeuristicAssignment
+from assignment_presolve import AssignmentPresolve
+from deadline import Deadline
+from shared_matrix import shared_store
 
 import json
+import multiprocessing
+import numpy as np
 import sys
 import os
 
+# With the 'auto' engine, instances with more orders x trips use the heuristic engine.
+HEURISTIC_THRESHOLD = 20000
+# With the presolve, components are solved in parallel processes from this many allowed pairs.
+PARALLEL_MIN_PAIRS = 5000
+
+
+def _solve_component(args):
+    """
+    Assignment of a presolved component, in a pool process.
+    Return (result, deadline cuts).
+    """
+    arguments, engine, time_limit_ms = args
+    deadline = None if time_limit_ms is None else Deadline(time_limit_ms)
+    costs, order_weights, order_cbms, max_weights, max_cbms, allowed = arguments
+    result = AssignmentProtocol(costs.tolist(), order_weights.tolist(), order_cbms.tolist(), max_weights.tolist(),
+                                max_cbms.tolist(), engine = engine, deadline = deadline, allowed = allowed).Assign()
+    return result, [] if deadline is None else deadline.cuts
+
+def _solve_shared_component(args):
+    """
+    _solve_component of a component whose costs and allowed pairs are sliced from the
+    matrices of the whole problem, attached from the shared store.
+    """
+    costs, allowed, orders, trips, capacities, engine, time_limit_ms = args
+    rows = np.ix_(orders, trips)
+    arguments = (costs.attach()[rows],) + capacities + (allowed.attach()[rows],)
+    return _solve_component((arguments, engine, time_limit_ms))
+
 class AssignmentProtocol(object):
     """
     An assignment protocol has these following parameters
@@ -11,16 +46,28 @@ class AssignmentProtocol(object):
         - order_weights: array of weights of orders
         - order_cbms: array of cbms of orders
         - max_weights, max_cbms: trip capacities
+        - engine: 'cbc', 'heuristic' or 'auto' to choose by the instance size
+        - deadline: deadline.Deadline of the request, CBC gets the time left and returns its
+          best solution at the limit, or the heuristic one when it has none
+        - allowed: orders x trips booleans, the only pairs given a variable, all by default
+        - presolve: drop the infeasible pairs, fix the forced orders and solve the connected
+          components apart, in `processes` parallel processes (see AssignmentPresolve)
 
     Methods:
         - Assign: find the assignment
     """
-    def __init__(self, costs, order_weights, order_cbms, max_weights, max_cbms):
+    def __init__(self, costs, order_weights, order_cbms, max_weights, max_cbms, engine = 'auto', deadline = None,
+                 allowed = None, presolve = False, processes = None):
         self.costs = costs
         self.order_weights = order_weights
         self.order_cbms = order_cbms
         self.max_weights = max_weights
         self.max_cbms = max_cbms
+        self.engine = engine
+        self.deadline = deadline
+        self.allowed = allowed
+        self.presolve = presolve
+        self.processes = processes
         # Instantiate a mixed-integer solver.
         self.solver = pywraplp.Solver('SolveAssignmentProblemMIP',
                             pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
@@ -36,46 +83,137 @@ class AssignmentProtocol(object):
                     }
                 ]
             }
+        with 'infeasible': true and no assignment when CBC proves the orders can't all be assigned.
         """
+        if self.presolve:
+            return self.presolved()
+
         num_orders = len(self.costs)
         num_trips = len(self.costs[0])
+        if self.engine == 'heuristic' or (self.engine == 'auto' and num_orders * num_trips > HEURISTIC_THRESHOLD):
+            return self.heuristic().Assign()
+
+        time_limit_ms = None if self.deadline is None else self.deadline.share_ms()
+        if time_limit_ms == 0:
+            self.deadline.cut('assignment', 'heuristic')
+            return self.heuristic().Assign()
+        if time_limit_ms is not None:
+            self.solver.SetTimeLimit(time_limit_ms)
+
         x = {}
 
         for i in range(num_orders):
             for j in range(num_trips):
-                x[i, j] = self.solver.BoolVar('x[%i,%i]' % (i, j))
+                if self.allowed is None or self.allowed[i][j]:
+                    x[i, j] = self.solver.BoolVar('x[%i,%i]' % (i, j))
+        trip_orders = [[j for j in range(num_orders) if (j, i) in x] for i in range(num_trips)]
+        order_trips = [[j for j in range(num_trips) if (i, j) in x] for i in range(num_orders)]
         
         # Objective
-        self.solver.Minimize(self.solver.Sum([self.costs[i][j] * x[i, j] for i in range(num_orders)
-                                                        for j in range(num_trips)]))
+        self.solver.Minimize(self.solver.Sum([self.costs[i][j] * x[i, j] for i, j in x]))
         
         # Constraints
         # Total orders assigned doesn't exceed max weight of trip
         for i in range(num_trips):
-            self.solver.Add(self.solver.Sum([x[j, i] * self.order_weights[j] for j in range(num_orders)]) <= self.max_weights[i])
+            self.solver.Add(self.solver.Sum([x[j, i] * self.order_weights[j] for j in trip_orders[i]]) <= self.max_weights[i])
 
         # Total CBM assigned doesn't exceed max CBM of trip
         for i in range(num_trips):
-            self.solver.Add(self.solver.Sum([x[j, i] * self.order_cbms[j] for j in range(num_orders)]) <= self.max_cbms[i])
+            self.solver.Add(self.solver.Sum([x[j, i] * self.order_cbms[j] for j in trip_orders[i]]) <= self.max_cbms[i])
 
         # Each order is assigned to at most 1 trip
         for i in range(num_orders):
-            self.solver.Add(self.solver.Sum([x[i, j] for j in range(num_trips)]) <= 1)
+            self.solver.Add(self.solver.Sum([x[i, j] for j in order_trips[i]]) <= 1)
 
         # All orders must be assigned
-        self.solver.Add(self.solver.Sum([x[i, j] for i in range(num_orders) for j in range(num_trips)]) == num_orders)
+        self.solver.Add(self.solver.Sum(list(x.values())) == num_orders)
 
         solve = self.solver.Solve()
+        if time_limit_ms is not None:
+            if solve == pywraplp.Solver.FEASIBLE:
+                self.deadline.cut('assignment', 'best_found')
+            elif solve == pywraplp.Solver.NOT_SOLVED:
+                # Stopped before its first solution.
+                self.deadline.cut('assignment', 'heuristic')
+                return self.heuristic().Assign()
         json_data = {
             'assignment': []
         }
+        if solve == pywraplp.Solver.INFEASIBLE:
+            # Every order is required, CBC proved they can't all go in the trips.
+            json_data['infeasible'] = True
+            return json_data
         for i in range(num_orders):
-            for j in range(num_trips):
+            for j in order_trips[i]:
                 if x[i, j].solution_value() > 0:
                     json_data['assignment'].append({ 'order': i, 'trip': j })
         
         # Return result
         return json_data
+
+    def heuristic(self, **options):
+        """
+        Heuristic engine on the same input, its local search ends with the deadline.
+        """
+        if self.deadline is not None and self.deadline.ms is not None:
+            options['time_limit'] = self.deadline.remaining_ms() / 1000.
+        costs = self.costs
+        if self.allowed is not None:
+            costs = np.where(self.allowed, costs, np.inf)
+        return HeuristicAssignment(costs, self.order_weights, self.order_cbms,
+                                   self.max_weights, self.max_cbms, **options)
+
+    def presolved(self):
+        """
+        Assign with the presolve: the forced orders and the assignments of the components,
+        the orders without any trip, or left out by their component, are unassigned.
+        The orders of the components CBC proved infeasible are in the presolve's
+        'infeasible_components'.
+        """
+        presolve = AssignmentPresolve(self.costs, self.order_weights, self.order_cbms, self.max_weights, self.max_cbms)
+        components = list(presolve.components())
+
+        processes = self.processes
+        if processes is None:
+            processes = multiprocessing.cpu_count() if presolve.allowed.sum() >= PARALLEL_MIN_PAIRS else 1
+        processes = max(1, min(processes, len(components)))
+        time_limit_ms = None
+        if self.deadline is not None:
+            # The components solved one after another in a process share its time.
+            time_limit_ms = self.deadline.share_ms(-(-len(components) // processes))
+        if processes > 1:
+            # The processes slice their component from the matrices written once to the shared store.
+            store = shared_store()
+            handles = [store.put(presolve.costs), store.put(presolve.allowed)]
+            jobs = [tuple(handles) + (orders, trips, presolve.capacities(orders, trips), self.engine, time_limit_ms)
+                    for orders, trips in components]
+            pool = multiprocessing.Pool(processes = processes)
+            try:
+                results = pool.map(_solve_shared_component, jobs)
+            finally:
+                pool.terminate()
+                for handle in handles:
+                    store.release(handle)
+        else:
+            results = [_solve_component((arguments, self.engine, time_limit_ms))
+                       for _, _, arguments in presolve.subproblems()]
+
+        trips = presolve.fixed.copy()
+        infeasible = []
+        for (orders, component_trips), (result, cuts) in zip(components, results):
+            for pair in result['assignment']:
+                trips[orders[pair['order']]] = component_trips[pair['trip']]
+            if result.get('infeasible'):
+                infeasible.append(orders.tolist())
+            if self.deadline is not None:
+                self.deadline.cuts.extend(cuts)
+        presolve.stats['processes'] = processes
+        presolve.stats['infeasible_components'] = infeasible
+        return {
+            'assignment': [{ 'order': int(i), 'trip': int(trips[i]) } for i in np.nonzero(trips >= 0)[0]],
+            'unassigned': np.nonzero(trips < 0)[0].tolist(),
+            'presolve': presolve.stats
+        }
     
 
 def main():
@@ -134,7 +272,7 @@ def main():
                 json_data['assignment'].append({ 'order': i, 'trip': j })
     
     # Print result
-    print json.dumps(json_data)
+    print(json.dumps(json_data))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,211 @@
+import time
+import numpy as np
+
+_EPSILON = 1e-9
+
+
+class HeuristicAssignment(object):
+    """
+    Heuristic engine for the inputs of AssignmentProtocol, for instances too large for CBC.
+        - Regret insertion: repeatedly assign the order with the largest gap between its best
+          and second best feasible trip.
+        - Local search: shift an order to another trip, or swap the trips of two orders,
+          while it lowers the cost and respects the weight and CBM capacities.
+        - Lagrangian lower bound: the capacity constraints are relaxed and their multipliers
+          improved by subgradient steps, so the result reports its optimality gap.
+
+    Methods:
+        - Assign: find the assignment
+    """
+    def __init__(self, costs, order_weights, order_cbms, max_weights, max_cbms,
+                 time_limit = 10., max_passes = 50, bound_iterations = 200):
+        self.costs = np.asarray(costs, dtype=np.float64)
+        self.order_weights = np.asarray(order_weights, dtype=np.float64)
+        self.order_cbms = np.asarray(order_cbms, dtype=np.float64)
+        self.max_weights = np.asarray(max_weights, dtype=np.float64)
+        self.max_cbms = np.asarray(max_cbms, dtype=np.float64)
+        self.time_limit = time_limit
+        self.max_passes = max_passes
+        self.bound_iterations = bound_iterations
+
+    def Assign(self):
+        """
+        Return the assignment in the format of AssignmentProtocol.Assign, with:
+            - total: cost of the assignment
+            - lower_bound, gap: Lagrangian bound of the assignment of every order and
+              relative gap to it. The bound is None when it isn't finite, e.g. with an
+              order no trip can take; the gap is None as well, or when orders are left
+              unassigned, as the total then doesn't cover the orders the bound does
+            - unassigned: orders which fit in no trip
+        """
+        started = time.time()
+        trips = self.regret_insertion()
+        trips = self.local_search(trips, started + self.time_limit)
+        assigned = np.nonzero(trips >= 0)[0]
+        total = float(self.costs[assigned, trips[assigned]].sum())
+        lower_bound = self.lagrangian_bound(total)
+        gap = None
+        if not np.isfinite(lower_bound):
+            lower_bound = None
+        else:
+            lower_bound = float(lower_bound)
+            if len(assigned) == len(trips):
+                gap = (total - lower_bound) / max(abs(total), _EPSILON)
+
+        return {
+            'assignment': [{ 'order': int(i), 'trip': int(trips[i]) } for i in assigned],
+            'total': total,
+            'lower_bound': lower_bound,
+            'gap': gap,
+            'unassigned': np.nonzero(trips < 0)[0].tolist()
+        }
+
+    def _best_two(self, costs):
+        """
+        Index of the best trip and cost of the two best trips of each row.
+        """
+        if costs.shape[1] == 1:
+            return np.zeros(len(costs), dtype=np.int64), costs[:, 0], np.full(len(costs), np.inf)
+        two = np.argpartition(costs, 1, axis=1)[:, :2]
+        rows = np.arange(len(costs))
+        first, second = costs[rows, two[:, 0]], costs[rows, two[:, 1]]
+        swap = second < first
+        best = np.where(swap, two[:, 1], two[:, 0])
+        return best, np.minimum(first, second), np.maximum(first, second)
+
+    def regret_insertion(self):
+        """
+        Return the trip of each order, -1 for the orders which fit in no trip.
+        """
+        num_orders, num_trips = self.costs.shape
+        weights, cbms = self.order_weights, self.order_cbms
+        left_weights, left_cbms = self.max_weights.copy(), self.max_cbms.copy()
+        trips = np.full(num_orders, -1, dtype=np.int64)
+
+        fits = (weights[:, None] <= left_weights[None, :]) & (cbms[:, None] <= left_cbms[None, :])
+        costs = np.where(fits, self.costs, np.inf)
+        best, first, second = self._best_two(costs)
+        pending = np.ones(num_orders, dtype=bool)
+
+        while True:
+            candidates = pending & np.isfinite(first)
+            if not candidates.any():
+                break
+            regret = np.where(candidates, second - first, -np.inf)
+            # Orders with a single feasible trip left have an infinite regret and go first.
+            order = int(np.argmax(regret))
+            trip = int(best[order])
+            trips[order] = trip
+            pending[order] = False
+            left_weights[trip] -= weights[order]
+            left_cbms[trip] -= cbms[order]
+
+            # Only the column of the trip changes, refresh the orders which lose it.
+            lost = pending & np.isfinite(costs[:, trip]) & (
+                (weights > left_weights[trip]) | (cbms > left_cbms[trip]))
+            if lost.any():
+                costs[lost, trip] = np.inf
+                rows = np.nonzero(lost)[0]
+                best[rows], first[rows], second[rows] = self._best_two(costs[rows])
+
+        return trips
+
+    def local_search(self, trips, deadline):
+        """
+        Improve the assignment with shift and swap moves until no move lowers the cost.
+        """
+        num_orders, num_trips = self.costs.shape
+        weights, cbms = self.order_weights, self.order_cbms
+        assigned = trips >= 0
+        left_weights = self.max_weights - np.bincount(trips[assigned], weights[assigned], num_trips)
+        left_cbms = self.max_cbms - np.bincount(trips[assigned], cbms[assigned], num_trips)
+        orders = np.nonzero(assigned)[0]
+
+        for _ in range(self.max_passes):
+            improved = False
+            for i in orders:
+                if time.time() > deadline:
+                    return trips
+                a = trips[i]
+                current = self.costs[i, a]
+
+                # Shift: move order i to the trip b with the best saving.
+                delta = self.costs[i] - current
+                delta[(weights[i] > left_weights) | (cbms[i] > left_cbms)] = np.inf
+                delta[a] = np.inf
+                b = int(np.argmin(delta))
+                if delta[b] < -_EPSILON:
+                    trips[i] = b
+                    left_weights[a] += weights[i]
+                    left_cbms[a] += cbms[i]
+                    left_weights[b] -= weights[i]
+                    left_cbms[b] -= cbms[i]
+                    improved = True
+                    continue
+
+                # Swap: exchange the trips of orders i and k.
+                others = trips[orders]
+                delta = (self.costs[i, others] + self.costs[orders, a]
+                         - current - self.costs[orders, others])
+                fits = ((left_weights[a] + weights[i] - weights[orders] >= 0)
+                        & (left_cbms[a] + cbms[i] - cbms[orders] >= 0)
+                        & (left_weights[others] + weights[orders] - weights[i] >= 0)
+                        & (left_cbms[others] + cbms[orders] - cbms[i] >= 0)
+                        & (others != a))
+                delta[~fits] = np.inf
+                k = int(np.argmin(delta))
+                if delta[k] < -_EPSILON:
+                    j, b = orders[k], others[k]
+                    trips[i], trips[j] = b, a
+                    left_weights[a] += weights[i] - weights[j]
+                    left_cbms[a] += cbms[i] - cbms[j]
+                    left_weights[b] += weights[j] - weights[i]
+                    left_cbms[b] += cbms[j] - cbms[i]
+                    improved = True
+            if not improved:
+                break
+
+        return trips
+
+    def lagrangian_bound(self, upper_bound):
+        """
+        Lower bound of the optimal cost, the weight and CBM capacities are relaxed with
+        multipliers updated by subgradient steps (Polyak step size towards upper_bound).
+        """
+        num_orders, num_trips = self.costs.shape
+        weights, cbms = self.order_weights, self.order_cbms
+        weight_multipliers = np.zeros(num_trips)
+        cbm_multipliers = np.zeros(num_trips)
+        rows = np.arange(num_orders)
+        best_bound = -np.inf
+        step_scale = 2.
+        stalled = 0
+
+        for _ in range(self.bound_iterations):
+            reduced = (self.costs + weights[:, None] * weight_multipliers[None, :]
+                       + cbms[:, None] * cbm_multipliers[None, :])
+            choice = np.argmin(reduced, axis=1)
+            bound = (reduced[rows, choice].sum() - weight_multipliers.dot(self.max_weights)
+                     - cbm_multipliers.dot(self.max_cbms))
+            if bound > best_bound + _EPSILON:
+                best_bound = bound
+                stalled = 0
+            else:
+                stalled += 1
+                if stalled >= 10:
+                    step_scale /= 2
+                    stalled = 0
+
+            weight_gradient = np.bincount(choice, weights, num_trips) - self.max_weights
+            cbm_gradient = np.bincount(choice, cbms, num_trips) - self.max_cbms
+            # Multipliers at zero can't decrease, their gradient doesn't count.
+            weight_gradient[(weight_multipliers <= 0) & (weight_gradient < 0)] = 0
+            cbm_gradient[(cbm_multipliers <= 0) & (cbm_gradient < 0)] = 0
+            norm = weight_gradient.dot(weight_gradient) + cbm_gradient.dot(cbm_gradient)
+            if norm <= _EPSILON or step_scale < 1e-4:
+                break
+            step = step_scale * max(upper_bound - bound, _EPSILON) / norm
+            weight_multipliers = np.maximum(0, weight_multipliers + step * weight_gradient)
+            cbm_multipliers = np.maximum(0, cbm_multipliers + step * cbm_gradient)
+
+        return float(best_bound)
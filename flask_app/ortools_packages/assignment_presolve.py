@@ -0,0 +1,130 @@
+import numpy as np
+
+try:
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:
+    connected_components = None
+
+# Costs from this value mark impossible pairs, the _INFINITE of the TSP costs.
+IMPOSSIBLE_COST = 10000000
+
+
+def _union_find(num_nodes, tails, heads):
+    """
+    Root of the component of every node of an undirected graph, without scipy.
+    """
+    parents = list(range(num_nodes))
+
+    def root(node):
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    for tail, head in zip(tails.tolist(), heads.tolist()):
+        tail, head = root(tail), root(head)
+        if tail != head:
+            parents[max(tail, head)] = min(tail, head)
+    return np.array([root(node) for node in range(num_nodes)], dtype=np.int64)
+
+
+class AssignmentPresolve(object):
+    """
+    Reductions of an AssignmentProtocol input before the solve:
+        - pairs where the order is over the trip's weight or CBM, or whose cost is
+          IMPOSSIBLE_COST or more, are dropped
+        - an order left with a single trip has to go there: it is fixed, the trip's
+          capacity shrinks and the pairs it no longer fits are dropped, until no order
+          is forced. Orders left with no trip are unassigned
+        - the remaining orders and trips are split into the connected components of
+          the allowed pairs, independent problems
+    """
+    def __init__(self, costs, order_weights, order_cbms, max_weights, max_cbms):
+        self.costs = np.asarray(costs, dtype=np.float64)
+        self.order_weights = np.asarray(order_weights, dtype=np.float64)
+        self.order_cbms = np.asarray(order_cbms, dtype=np.float64)
+        self.max_weights = np.asarray(max_weights, dtype=np.float64).copy()
+        self.max_cbms = np.asarray(max_cbms, dtype=np.float64).copy()
+        num_orders, num_trips = self.costs.shape
+        self.fixed = np.full(num_orders, -1, dtype=np.int64)
+        self.unassigned = np.zeros(num_orders, dtype=bool)
+        self.stats = {'pairs': num_orders * num_trips}
+        self._reduce()
+
+    def _fits(self):
+        return ((self.order_weights[:, None] <= self.max_weights[None, :])
+                & (self.order_cbms[:, None] <= self.max_cbms[None, :]))
+
+    def _reduce(self):
+        self.allowed = self._fits() & np.isfinite(self.costs) & (self.costs < IMPOSSIBLE_COST)
+        self.stats['pruned_pairs'] = int(self.stats['pairs'] - self.allowed.sum())
+
+        pending = np.ones(len(self.costs), dtype=bool)
+        while True:
+            counts = self.allowed.sum(axis=1)
+            self.unassigned |= pending & (counts == 0)
+            pending &= counts > 0
+            forced = np.nonzero(pending & (counts == 1))[0]
+            if len(forced) == 0:
+                break
+            for order in forced:
+                trip = int(np.argmax(self.allowed[order]))
+                # An earlier forced order may have taken the room.
+                if (self.order_weights[order] > self.max_weights[trip]
+                        or self.order_cbms[order] > self.max_cbms[trip]):
+                    self.allowed[order, trip] = False
+                    continue
+                self.fixed[order] = trip
+                self.max_weights[trip] -= self.order_weights[order]
+                self.max_cbms[trip] -= self.order_cbms[order]
+                self.allowed[order] = False
+                pending[order] = False
+            self.allowed &= self._fits()
+        self.stats['forced'] = int((self.fixed >= 0).sum())
+        self.stats['unassigned'] = int(self.unassigned.sum())
+
+        self.order_labels, self.trip_labels = self._components()
+        self.stats['components'] = len(np.unique(self.order_labels[self.order_labels >= 0]))
+
+    def _components(self):
+        """
+        Component of every order and trip, -1 for those without allowed pairs: the
+        connected components of the bipartite graph of the allowed pairs, the orders
+        being its first nodes and the trips the next ones.
+        """
+        num_orders, num_trips = self.allowed.shape
+        orders, trips = np.nonzero(self.allowed)
+        num_nodes = num_orders + num_trips
+        if connected_components is not None:
+            graph = coo_matrix((np.ones(len(orders), dtype=np.int8), (orders, num_orders + trips)),
+                               shape=(num_nodes, num_nodes))
+            _, labels = connected_components(graph, directed=False)
+        else:
+            labels = _union_find(num_nodes, orders, num_orders + trips)
+        order_labels = np.where(self.allowed.any(axis=1), labels[:num_orders], -1)
+        trip_labels = np.where(self.allowed.any(axis=0), labels[num_orders:], -1)
+        return order_labels, trip_labels
+
+    def components(self):
+        """
+        (orders, trips) of every component.
+        """
+        for label in np.unique(self.order_labels[self.order_labels >= 0]):
+            yield np.nonzero(self.order_labels == label)[0], np.nonzero(self.trip_labels == label)[0]
+
+    def capacities(self, orders, trips):
+        """
+        Order weights and CBMs, and the capacity left in the trips, of a component.
+        """
+        return self.order_weights[orders], self.order_cbms[orders], self.max_weights[trips], self.max_cbms[trips]
+
+    def subproblems(self):
+        """
+        (orders, trips, AssignmentProtocol arguments with the allowed pairs) of every
+        component, the trips with their capacity left.
+        """
+        for orders, trips in self.components():
+            order_weights, order_cbms, max_weights, max_cbms = self.capacities(orders, trips)
+            yield orders, trips, (self.costs[np.ix_(orders, trips)], order_weights, order_cbms, max_weights,
+                                  max_cbms, self.allowed[np.ix_(orders, trips)])
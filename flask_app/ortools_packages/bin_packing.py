@@ -0,0 +1,158 @@
+from ortools.linear_solver import pywraplp
+
+import time
+import numpy as np
+
+# The MIP refinement is skipped above this many item x bin variables.
+MIP_MAX_VARIABLES = 20000
+TIME_LIMIT_MS = 5000
+
+
+def _order(weights, capacities):
+    """
+    Items by decreasing size, the size being the sum of the weights relative to the capacities.
+    """
+    return np.argsort(-(weights / capacities[:, None]).sum(axis=0), kind='mergesort')
+
+
+def fit_decreasing(weights, capacities, best_fit=False):
+    """
+    First fit decreasing, or best fit decreasing: each item goes to the feasible bin
+    with the least relative room left. weights is dimensions x items.
+    Return the bin of every item.
+    """
+    num_items = weights.shape[1]
+    loads = np.zeros((num_items, len(capacities)))
+    bins = np.empty(num_items, dtype=np.int64)
+    used = 0
+    for item in _order(weights, capacities):
+        weight = weights[:, item]
+        fits = np.nonzero((loads[:used] + weight <= capacities).all(axis=1))[0]
+        if len(fits) == 0:
+            target = used
+            used += 1
+        elif best_fit:
+            room = ((capacities - loads[fits] - weight) / capacities).sum(axis=1)
+            target = fits[np.argmin(room)]
+        else:
+            target = fits[0]
+        loads[target] += weight
+        bins[item] = target
+    return bins
+
+
+def l2_bound(sizes, capacity):
+    """
+    Martello and Toth L2 lower bound of one dimensional bin packing, for all the
+    thresholds k at once with prefix sums of the sorted sizes.
+    """
+    sizes = np.sort(np.asarray(sizes, dtype=np.float64))
+    sums = np.concatenate([[0.], np.cumsum(sizes)])
+    half = capacity / 2.
+    k = np.unique(np.concatenate([[0.], sizes[sizes <= half]]))
+
+    up_to_half = np.searchsorted(sizes, half, 'right')
+    up_to_rest = np.searchsorted(sizes, capacity - k, 'right')
+    from_k = np.searchsorted(sizes, k, 'left')
+    large = len(sizes) - up_to_rest
+    medium = up_to_rest - up_to_half
+    # Room the small items (k <= size <= C/2) can use in the bins of the medium ones.
+    room = medium * capacity - (sums[up_to_rest] - sums[up_to_half])
+    small = sums[up_to_half] - sums[from_k]
+    extra = np.maximum(0, np.ceil((small - room) / capacity - 1e-9))
+    bound = int(np.ceil(sums[-1] / capacity - 1e-9))
+    return max(bound, int((large + medium + extra).max()))
+
+
+def lower_bound(weights, capacities):
+    """
+    Largest L2 bound over the dimensions, each dimension alone is a relaxation.
+    """
+    return max(l2_bound(weights[d], capacities[d]) for d in range(len(capacities)))
+
+
+def mip_refine(weights, capacities, upper_bound, time_limit_ms):
+    """
+    Fewest bins with CBC, within the upper_bound - 1 bins of a heuristic solution.
+    Item k of the decreasing order only goes to the bins 0..k, which removes the symmetric
+    solutions. Return (bin of every item or None without a better solution, optimal).
+    """
+    num_bins = upper_bound - 1
+    order = _order(weights, capacities)
+    solver = pywraplp.Solver('bin_packing', pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
+    solver.SetTimeLimit(int(time_limit_ms))
+
+    y = [solver.BoolVar('y[%i]' % b) for b in range(num_bins)]
+    x = {}
+    for k, item in enumerate(order):
+        for b in range(min(k + 1, num_bins)):
+            x[item, b] = solver.BoolVar('x[%i,%i]' % (item, b))
+        solver.Add(solver.Sum([x[item, b] for b in range(min(k + 1, num_bins))]) == 1)
+    for b in range(num_bins):
+        for d in range(len(capacities)):
+            solver.Add(solver.Sum([weights[d, item] * x[item, b] for k, item in enumerate(order) if b <= k])
+                       <= capacities[d] * y[b])
+        if b > 0:
+            solver.Add(y[b] <= y[b - 1])
+    solver.Minimize(solver.Sum(y))
+
+    status = solver.Solve()
+    if status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        # Infeasible proves the heuristic packing optimal.
+        return None, status == pywraplp.Solver.INFEASIBLE
+    bins = np.empty(weights.shape[1], dtype=np.int64)
+    for (item, b), variable in x.items():
+        if variable.solution_value() > 0.5:
+            bins[item] = b
+    # Number the bins in use consecutively.
+    bins = np.unique(bins, return_inverse=True)[1]
+    return bins, status == pywraplp.Solver.OPTIMAL
+
+
+def pack(weights, capacities, heuristic='best', time_limit_ms=TIME_LIMIT_MS):
+    """
+    Pack all the items into the fewest bins. weights is dimensions x items.
+    The fit decreasing heuristics give a first packing; when it is above the lower bound
+    and the instance is small enough, CBC looks for one with fewer bins in the time limit.
+    """
+    started = time.time()
+    weights = np.asarray(weights, dtype=np.float64)
+    capacities = np.asarray(capacities, dtype=np.float64)
+    if (weights > capacities[:, None]).any():
+        raise ValueError('Some items are larger than a bin')
+    if weights.shape[1] == 0:
+        return { 'num_bins': 0, 'lower_bound': 0, 'optimal': True, 'method': heuristic, 'assignment': [],
+                 'bins': [], 'loads': [], 'elapsed_ms': 0 }
+
+    candidates = {
+        'ffd': lambda: fit_decreasing(weights, capacities),
+        'bfd': lambda: fit_decreasing(weights, capacities, best_fit=True)
+    }
+    if heuristic not in ('best', 'ffd', 'bfd'):
+        raise ValueError('Unknown heuristic: %s' % heuristic)
+    names = ['ffd', 'bfd'] if heuristic == 'best' else [heuristic]
+    method, bins = min(((name, candidates[name]()) for name in names), key=lambda candidate: candidate[1].max())
+    num_bins = int(bins.max()) + 1
+    bound = lower_bound(weights, capacities)
+    optimal = num_bins == bound
+
+    remaining_ms = time_limit_ms - 1000 * (time.time() - started)
+    if not optimal and remaining_ms > 0 and weights.shape[1] * (num_bins - 1) <= MIP_MAX_VARIABLES:
+        refined, optimal = mip_refine(weights, capacities, num_bins, remaining_ms)
+        if refined is not None:
+            bins = refined
+            method = 'mip'
+            num_bins = int(bins.max()) + 1
+
+    loads = np.zeros((num_bins, len(capacities)))
+    np.add.at(loads, bins, weights.T)
+    return {
+        'num_bins': num_bins,
+        'lower_bound': bound,
+        'optimal': bool(optimal),
+        'method': method,
+        'assignment': bins.tolist(),
+        'bins': [np.nonzero(bins == b)[0].tolist() for b in range(num_bins)],
+        'loads': loads.tolist(),
+        'elapsed_ms': int(1000 * (time.time() - started))
+    }
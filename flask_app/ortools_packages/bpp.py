@@ -3,17 +3,37 @@ import sys
 import os
 from ortools.algorithms import pywrapknapsack_solver
 
-from flask import jsonify, request
+from flask import request
 from flask.views import MethodView
+from bin_packing import pack, TIME_LIMIT_MS
+
+sys.path.append('..')
+from errors import ExceptionHandler
+from encoders import jsonify
 
 
 class BppSolver(MethodView):
     """
     Bin packing solver with multiple dimensions.
+    By default a single multidimensional knapsack. With 'mode': 'binpacking', every item
+    is packed into the fewest bins of the given capacities in one call, see bin_packing.pack;
+    only the packings proven optimal are cached.
     """
 
     def post(self):
         data = request.get_json()
+        if data.get('mode') == 'binpacking':
+            try:
+                result = pack(data['weights'], data['capacities'], data.get('heuristic', 'best'),
+                              data.get('time_limit_ms', TIME_LIMIT_MS))
+            except ValueError as e:
+                raise ExceptionHandler(message = str(e), status_code = 400)
+            response = jsonify(result)
+            # A packing not proven optimal depends on the time limit, it isn't cached.
+            if not result['optimal']:
+                response.cache_control.no_store = True
+            return response
+
         profits = data['profits']
         weights = data['weights']
         capacities = data['capacities']
@@ -1,19 +1,33 @@
 from rectpack import newPacker
-from flask import jsonify, request
+from flask import request
 from flask.views import MethodView
 
 import json
 import sys
 import os
 
+from rect_packing import ENGINES, pack_rectangles
+
+sys.path.append('..')
+from errors import ExceptionHandler
+from encoders import jsonify
+
 class Bpp2dSolver(MethodView):
     """
     2D Bin packing solver
+        - engine: 'rectpack' by default, or the NumPy 'maxrects' or 'skyline' of
+          rect_packing for large batches, with the same response
     """
     def post(self):
         data = request.get_json()
         rectangles = data['rectangles']
         bins = data['bins']
+        engine = data.get('engine', 'rectpack')
+
+        if engine in ENGINES:
+            return self.pack_numpy(rectangles, bins, engine)
+        if engine != 'rectpack':
+            raise ExceptionHandler(message='Unknown engine: %s' % engine, status_code=400)
 
         # Packing protocol
         packer = newPacker()
@@ -37,3 +51,13 @@ class Bpp2dSolver(MethodView):
             response['packing'].append({ 'bin': b, 'rect': rid, 'x': x, 'y': y, 'w': w, 'h': h })
 
         return jsonify(response)
+
+    @staticmethod
+    def pack_numpy(rectangles, bins, engine):
+        """
+        Packing of a rect_packing engine, built from its columns.
+        """
+        columns = pack_rectangles([r['width'] for r in rectangles], [r['height'] for r in rectangles],
+                                  [b['width'] for b in bins], [b['height'] for b in bins], engine)
+        keys = ('bin', 'rect', 'x', 'y', 'w', 'h')
+        return jsonify({ 'packing': [dict(zip(keys, row)) for row in zip(*[column.tolist() for column in columns])] })
@@ -0,0 +1,60 @@
+import time
+
+# Smallest time limit given to a solver call, below it the call is skipped for its fallback.
+MIN_SOLVE_MS = 10
+
+
+class Deadline(object):
+    """
+    Time budget of a whole request, shared by its sub-solves. Each solver call is given
+    its share of the time left, and the parts which had to fall back to a cheaper
+    estimate or to the best solution found so far are reported.
+    `ms` None is no deadline: every share is None and nothing is cut short.
+
+    Methods:
+        - remaining_ms: time left
+        - share_ms: time limit of the next of `parts` sub-solves left
+        - split: deadline of a phase taking a fraction of the time left
+        - cut: record a part cut short
+        - report: summary for the response
+    """
+    def __init__(self, ms = None, cuts = None):
+        self.ms = ms
+        self.expires = None if ms is None else time.time() + ms / 1000.
+        self.cuts = [] if cuts is None else cuts
+
+    def remaining_ms(self):
+        if self.expires is None:
+            return None
+        return max(0, int(1000 * (self.expires - time.time())))
+
+    def expired(self):
+        return self.expires is not None and time.time() >= self.expires
+
+    def share_ms(self, parts = 1):
+        """
+        Time limit of the next sub-solve when `parts` of them, this one included, are left.
+        0 when its share is too short to run a solver.
+        """
+        remaining = self.remaining_ms()
+        if remaining is None:
+            return None
+        share = remaining // max(1, parts)
+        return share if share >= MIN_SOLVE_MS else 0
+
+    def split(self, fraction):
+        """
+        Deadline of a phase with `fraction` of the time left, its cuts are reported here.
+        """
+        remaining = self.remaining_ms()
+        return Deadline(None if remaining is None else int(remaining * fraction), self.cuts)
+
+    def cut(self, part, fallback):
+        self.cuts.append({ 'part': part, 'fallback': fallback })
+
+    def report(self):
+        return {
+            'deadline_ms': self.ms,
+            'remaining_ms': self.remaining_ms(),
+            'cut_short': self.cuts
+        }
@@ -0,0 +1,233 @@
+from ortools.graph import pywrapgraph
+
+from collections import deque
+import multiprocessing
+import numpy as np
+
+from shared_matrix import shared_store
+
+# Components are solved in parallel processes from this many arcs in total.
+PARALLEL_MIN_ARCS = 20000
+
+
+def _adjacency(tails, heads, num_nodes):
+    """
+    Compressed adjacency lists: the neighbours of node v are neighbours[offsets[v]:offsets[v + 1]].
+    """
+    order = np.argsort(tails, kind='mergesort')
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(tails, minlength=num_nodes))])
+    return heads[order], offsets
+
+
+def _reachable(tails, heads, sources, num_nodes):
+    """
+    Nodes reachable from the sources along the arcs.
+    """
+    neighbours, offsets = _adjacency(tails, heads, num_nodes)
+    reached = np.zeros(num_nodes, dtype=bool)
+    reached[sources] = True
+    queue = deque(sources.tolist())
+    while queue:
+        node = queue.popleft()
+        for neighbour in neighbours[offsets[node]:offsets[node + 1]]:
+            if not reached[neighbour]:
+                reached[neighbour] = True
+                queue.append(neighbour)
+    return reached
+
+
+def _components(tails, heads, num_nodes):
+    """
+    Weakly connected component of every node, -1 for the nodes without arcs.
+    """
+    both_tails = np.concatenate([tails, heads])
+    both_heads = np.concatenate([heads, tails])
+    neighbours, offsets = _adjacency(both_tails, both_heads, num_nodes)
+    labels = np.full(num_nodes, -1, dtype=np.int64)
+    count = 0
+    for node in np.unique(both_tails):
+        if labels[node] >= 0:
+            continue
+        labels[node] = count
+        queue = deque([node])
+        while queue:
+            current = queue.popleft()
+            for neighbour in neighbours[offsets[current]:offsets[current + 1]]:
+                if labels[neighbour] < 0:
+                    labels[neighbour] = count
+                    queue.append(neighbour)
+        count += 1
+    return labels, count
+
+
+def solve_component(args):
+    """
+    Min cost flow of one component, nodes numbered from 0.
+    Return (optimal, cost, flow of every arc).
+    """
+    tails, heads, capacities, costs, supplies = args
+    min_cost_flow = pywrapgraph.SimpleMinCostFlow()
+    for i in range(len(tails)):
+        min_cost_flow.AddArcWithCapacityAndUnitCost(int(tails[i]), int(heads[i]), int(capacities[i]), int(costs[i]))
+    for node in range(len(supplies)):
+        min_cost_flow.SetNodeSupply(node, int(supplies[node]))
+    if min_cost_flow.Solve() != min_cost_flow.OPTIMAL:
+        return False, 0, []
+    return True, min_cost_flow.OptimalCost(), [min_cost_flow.Flow(arc) for arc in range(min_cost_flow.NumArcs())]
+
+
+def solve_shared_component(args):
+    """
+    solve_component of the arcs and nodes of a component, sliced from the arrays of the
+    whole network attached from the shared store.
+    """
+    arcs, supplies, arc_start, arc_end, node_start, node_end = args
+    tails, heads, capacities, costs = arcs.attach()[:, arc_start:arc_end]
+    return solve_component((tails, heads, capacities, costs, supplies.attach()[node_start:node_end]))
+
+
+class FlowPresolve(object):
+    """
+    Reductions of a min cost flow network which keep its optimal cost:
+        - arcs without capacity, and self loops which cost nothing or more, are removed
+        - without negative costs, arcs on no path from a supply to a demand are removed:
+          some optimal flow only uses paths from supplies to demands
+        - parallel arcs of the same cost become one arc with their total capacity; parallel
+          arcs of different costs are already the piecewise linear convex cost and stay
+        - the weakly connected components are independent problems
+    solve() solves the components, in parallel processes for large networks, and maps
+    the flows back to the original arcs.
+    """
+    def __init__(self, starts, ends, capacities, costs, supplies):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.capacities = np.asarray(capacities, dtype=np.int64)
+        self.costs = np.asarray(costs, dtype=np.int64)
+        self.num_nodes = max([len(supplies)] + [int(nodes.max()) + 1 for nodes in (self.starts, self.ends)
+                                                if len(nodes)])
+        self.supplies = np.zeros(self.num_nodes, dtype=np.int64)
+        self.supplies[:len(supplies)] = supplies
+        self.stats = {'arcs': len(self.starts)}
+        self._reduce()
+
+    def _reduce(self):
+        keep = (self.capacities > 0) & ~((self.starts == self.ends) & (self.costs >= 0))
+        self.stats['removed_useless'] = int((~keep).sum())
+
+        removed = 0
+        if (self.costs[keep] >= 0).all():
+            tails, heads = self.starts[keep], self.ends[keep]
+            from_supplies = _reachable(tails, heads, np.nonzero(self.supplies > 0)[0], self.num_nodes)
+            to_demands = _reachable(heads, tails, np.nonzero(self.supplies < 0)[0], self.num_nodes)
+            alive = keep & from_supplies[self.starts] & to_demands[self.ends]
+            removed = int((keep & ~alive).sum())
+            keep = alive
+        self.stats['removed_dead'] = removed
+
+        # Group the kept arcs by (tail, head, cost), the arcs of a group in their original order.
+        arcs = np.nonzero(keep)[0]
+        arcs = arcs[np.lexsort((arcs, self.costs[arcs], self.ends[arcs], self.starts[arcs]))]
+        first = np.ones(len(arcs), dtype=bool)
+        first[1:] = ((self.starts[arcs[1:]] != self.starts[arcs[:-1]]) | (self.ends[arcs[1:]] != self.ends[arcs[:-1]])
+                     | (self.costs[arcs[1:]] != self.costs[arcs[:-1]]))
+        self.arcs = arcs
+        self.group = np.cumsum(first) - 1
+        leaders = arcs[first]
+        self.tails, self.heads, self.unit_costs = self.starts[leaders], self.ends[leaders], self.costs[leaders]
+        self.group_capacities = np.zeros(len(leaders), dtype=np.int64)
+        np.add.at(self.group_capacities, self.group, self.capacities[arcs])
+        self.stats['merged'] = int(len(arcs) - len(leaders))
+
+        self.labels, count = _components(self.tails, self.heads, self.num_nodes)
+        self.stats['components'] = count
+        self.stats['solved_arcs'] = len(leaders)
+
+    def feasible(self):
+        """
+        False when a node without arcs, or a whole component, has unbalanced supplies.
+        """
+        isolated = self.labels < 0
+        if (self.supplies[isolated] != 0).any():
+            return False
+        balance = np.bincount(self.labels[~isolated], weights=self.supplies[~isolated],
+                              minlength=self.stats['components'])
+        return bool((balance == 0).all())
+
+    def network(self):
+        """
+        The merged network sorted by component:
+            - arcs: of the merged network, in the order of the columns
+            - columns: 4 x arcs array of the tails and heads, numbered in their component,
+              the capacities and the unit costs
+            - arc_offsets: the arcs of component c are the columns arc_offsets[c]:arc_offsets[c + 1]
+            - supplies, node_offsets: the supplies of the nodes, by component the same way
+        """
+        count = self.stats['components']
+        nodes = np.nonzero(self.labels >= 0)[0]
+        nodes = nodes[np.argsort(self.labels[nodes], kind='mergesort')]
+        node_offsets = np.concatenate([[0], np.cumsum(np.bincount(self.labels[nodes], minlength=count))])
+        # Number of every node in its component.
+        local = np.full(self.num_nodes, -1, dtype=np.int64)
+        local[nodes] = np.arange(len(nodes)) - node_offsets[self.labels[nodes]]
+        arc_labels = self.labels[self.tails]
+        arcs = np.argsort(arc_labels, kind='mergesort')
+        arc_offsets = np.concatenate([[0], np.cumsum(np.bincount(arc_labels, minlength=count))])
+        columns = np.vstack([local[self.tails[arcs]], local[self.heads[arcs]], self.group_capacities[arcs],
+                             self.unit_costs[arcs]])
+        return arcs, columns, arc_offsets, self.supplies[nodes], node_offsets
+
+    def subproblems(self):
+        """
+        (arcs of the merged network, solve_component arguments) of every component.
+        """
+        arcs, columns, arc_offsets, supplies, node_offsets = self.network()
+        for component in range(self.stats['components']):
+            start, end = arc_offsets[component], arc_offsets[component + 1]
+            tails, heads, capacities, costs = columns[:, start:end]
+            yield arcs[start:end], (tails, heads, capacities, costs,
+                                    supplies[node_offsets[component]:node_offsets[component + 1]])
+
+    def solve(self, processes=None):
+        """
+        Return (total cost, flow of every original arc), None without a solution.
+        """
+        if not self.feasible():
+            return None
+        count = self.stats['components']
+        if processes is None:
+            processes = multiprocessing.cpu_count() if len(self.tails) >= PARALLEL_MIN_ARCS else 1
+        processes = max(1, min(processes, count))
+        arcs, columns, arc_offsets, supplies, node_offsets = self.network()
+        if processes > 1:
+            # The processes slice their component from the arrays written once to the shared store.
+            store = shared_store()
+            handles = [store.put(columns), store.put(supplies)]
+            jobs = [tuple(handles) + (arc_offsets[c], arc_offsets[c + 1], node_offsets[c], node_offsets[c + 1])
+                    for c in range(count)]
+            pool = multiprocessing.Pool(processes=processes)
+            try:
+                results = pool.map(solve_shared_component, jobs)
+            finally:
+                pool.terminate()
+                for handle in handles:
+                    store.release(handle)
+        else:
+            results = [solve_component(tuple(columns[:, arc_offsets[c]:arc_offsets[c + 1]])
+                                       + (supplies[node_offsets[c]:node_offsets[c + 1]],)) for c in range(count)]
+        self.stats['processes'] = processes
+
+        merged_flows = np.zeros(len(self.tails), dtype=np.int64)
+        for c, (optimal, _, flows) in enumerate(results):
+            if not optimal:
+                return None
+            merged_flows[arcs[arc_offsets[c]:arc_offsets[c + 1]]] = flows
+
+        flows = np.zeros(len(self.starts), dtype=np.int64)
+        if len(self.arcs):
+            # Fill the arcs of a group in their original order.
+            capacities = self.capacities[self.arcs]
+            before = np.cumsum(capacities) - capacities
+            group_starts = np.searchsorted(self.group, self.group, 'left')
+            filled_before = before - before[group_starts]
+            flows[self.arcs] = np.clip(merged_flows[self.group] - filled_before, 0, capacities)
+        return int((flows * self.costs).sum()), flows
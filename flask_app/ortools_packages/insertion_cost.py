@@ -0,0 +1,97 @@
+import numpy as np
+
+from road_network import haversine
+
+# Largest number of order x trip x stop cells computed at once.
+CHUNK_CELLS = 5 * 1000 * 1000
+
+
+def _km(lat1, lon1, lat2, lon2):
+    """
+    Haversine distances truncated to whole km, as tsp.DistanceMatrix.Distance prices a leg.
+    """
+    return np.trunc(haversine(lat1, lon1, lat2, lon2))
+
+
+class InsertionCostEstimator(object):
+    """
+    Estimate the cost of every (order, trip) pair as the length of the trip's stop sequence
+    plus the cheapest detour to insert the order's pickup and then its drop into it.
+    It is the length of one route through the points, not a bound of their TSP cost, whose
+    path starts at the pickup and may reorder the stops. Legs are truncated to whole km
+    like the distances of the TSP costs, so the estimates and the TSP costs of rechecked
+    pairs are on the same scale.
+
+    Orders and trips have the input format of stm_assignment:
+        - order: { 'lats': [pickup_lat, drop_lat], 'lons': [pickup_lon, drop_lon] }
+        - trip: { 'lats': [...], 'lons': [...] } of its stops
+
+    Methods:
+        - costs: orders x trips matrix of the estimates
+    """
+    def __init__(self, orders, trips):
+        self.pickups = np.array([(order['lats'][0], order['lons'][0]) for order in orders], dtype=np.float64)
+        self.drops = np.array([(order['lats'][1], order['lons'][1]) for order in orders], dtype=np.float64)
+
+        # Stops of the trips padded to the longest trip.
+        self.num_stops = np.array([len(trip['lats']) for trip in trips], dtype=np.int64)
+        max_stops = max(1, self.num_stops.max()) if len(trips) else 1
+        self.stop_lats = np.zeros((len(trips), max_stops))
+        self.stop_lons = np.zeros((len(trips), max_stops))
+        for t, trip in enumerate(trips):
+            self.stop_lats[t, :len(trip['lats'])] = trip['lats']
+            self.stop_lons[t, :len(trip['lons'])] = trip['lons']
+
+        # segments[t, g] is the leg S[g-1] -> S[g] broken by an insertion in gap g.
+        stops = np.arange(max_stops)[None, :]
+        self.segments = np.zeros((len(trips), max_stops + 1))
+        self.segments[:, 1:-1] = _km(self.stop_lats[:, :-1], self.stop_lons[:, :-1],
+                                     self.stop_lats[:, 1:], self.stop_lons[:, 1:])
+        self.segments[:, 1:-1] *= (stops[:, 1:] < self.num_stops[:, None])
+        self.base = self.segments.sum(axis=1)
+
+    def _to_stops(self, points):
+        """
+        Distances from points to every stop, points x trips x stops.
+        """
+        return _km(points[:, 0, None, None], points[:, 1, None, None],
+                   self.stop_lats[None, :, :], self.stop_lons[None, :, :])
+
+    def _costs(self, pickups, drops):
+        num_trips, max_stops = self.stop_lats.shape
+        gaps = np.arange(max_stops + 1)[None, None, :]
+        num_stops = self.num_stops[None, :, None]
+        after_stop = (gaps >= 1)
+        before_stop = (gaps < num_stops)
+
+        # left[..., g] = d(S[g-1], X) and right[..., g] = d(X, S[g]) for gap g, 0 off the trip.
+        pad = np.zeros((len(pickups), num_trips, 1))
+        to_pickups = self._to_stops(pickups)
+        to_drops = self._to_stops(drops)
+        left_pickup = np.concatenate([pad, to_pickups], axis=2) * after_stop
+        right_pickup = np.concatenate([to_pickups, pad], axis=2) * before_stop
+        left_drop = np.concatenate([pad, to_drops], axis=2) * after_stop
+        right_drop = np.concatenate([to_drops, pad], axis=2) * before_stop
+        segments = self.segments[None, :, :]
+        pickup_to_drop = _km(pickups[:, 0], pickups[:, 1], drops[:, 0], drops[:, 1])[:, None, None]
+
+        # Pickup and drop inserted in the same gap, one after the other.
+        same_gap = left_pickup + pickup_to_drop + right_drop - segments
+        # Pickup in an earlier gap than the drop.
+        pickup_detour = left_pickup + right_pickup - segments
+        drop_detour = left_drop + right_drop - segments
+        best_pickup = np.minimum.accumulate(pickup_detour, axis=2)
+        earlier_pickup = np.concatenate([np.full(pad.shape, np.inf), best_pickup[:, :, :-1]], axis=2)
+        detour = np.minimum(same_gap, earlier_pickup + drop_detour)
+        detour[np.broadcast_to(gaps > num_stops, detour.shape)] = np.inf
+
+        return self.base[None, :] + detour.min(axis=2)
+
+    def costs(self):
+        num_trips, max_stops = self.stop_lats.shape
+        chunk = max(1, CHUNK_CELLS // max(1, num_trips * (max_stops + 1)))
+        costs = np.empty((len(self.pickups), num_trips))
+        for start in range(0, len(self.pickups), chunk):
+            costs[start:start + chunk] = self._costs(self.pickups[start:start + chunk],
+                                                     self.drops[start:start + chunk])
+        return costs
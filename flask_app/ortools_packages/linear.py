@@ -1,17 +1,23 @@
-from flask import jsonify, request
+from flask import request
 from flask.views import MethodView
 from ortools.graph import pywrapgraph
 
 import sys
 import os
 
+from flow_presolve import FlowPresolve
+
 sys.path.append('..')
 from errors import ExceptionHandler
+from encoders import jsonify
 
 
 class MinCostFlowsSolver(MethodView):
     """
     Min cost flows solver
+        - presolve: reduce the network and solve its components apart, see FlowPresolve
+        - processes: parallel processes of the presolved components, by default one per
+          core for large networks
     """
 
     def post(self):
@@ -22,6 +28,9 @@ class MinCostFlowsSolver(MethodView):
         supplies = data['supplies']
         capacities = data['capacities']
 
+        if data.get('presolve', False):
+            return self.presolved(data)
+
         min_cost_flow = pywrapgraph.SimpleMinCostFlow()
 
         for i in range(len(starts)):
@@ -50,3 +59,25 @@ class MinCostFlowsSolver(MethodView):
         else:
             raise ExceptionHandler(
                 message="No solution found", status_code=400)
+
+    @staticmethod
+    def presolved(data):
+        """
+        Same response with the presolve, the arcs being the arcs of the request.
+        """
+        presolve = FlowPresolve(data['starts'], data['ends'], data['capacities'], data['costs'], data['supplies'])
+        result = presolve.solve(data.get('processes'))
+        if result is None:
+            raise ExceptionHandler(
+                message="No solution found", status_code=400)
+        total, flows = result
+        return jsonify({
+            'total': total,
+            'arcs': [{
+                'arc': int(arc),
+                'tail': int(presolve.starts[arc]),
+                'head': int(presolve.ends[arc]),
+                'cost': int(presolve.costs[arc])
+            } for arc in flows.nonzero()[0]],
+            'presolve': presolve.stats
+        })
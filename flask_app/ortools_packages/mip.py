@@ -5,35 +5,51 @@ import json
 import sys
 import os
 
-from flask import jsonify, request
+from flask import request
 from flask.views import MethodView
+from deadline import Deadline
 
 sys.path.append('..')
 from errors import ExceptionHandler
+from encoders import jsonify
+
+# Largest number of trucks of a type.
+MAX_TRUCKS = 1000
 
 
 class MipSolver(MethodView):
     """
     Mix Integer Programming solver for assignment problem 
+    With 'deadline_ms', the sub problems share the deadline: each search is given its
+    share of the time left, and returns its best solution at its limit, or the cheapest
+    single truck type cover when it has none.
     """
 
     def post(self):
         data = request.get_json()
         arr = data['array']
         demand = data['demand']
+        deadline = Deadline(data.get('deadline_ms'))
 
         response_data = { 'data': [] }
-        for obj in arr:
+        for k, obj in enumerate(arr):
             c = map(int, obj['list_weights'])
             costs = map(int, obj['costs'])
             num_trucks = len(c)
+            part = 'array[%d]' % k
+
+            time_limit_ms = deadline.share_ms(len(arr) - k)
+            if time_limit_ms == 0:
+                deadline.cut(part, 'estimate')
+                response_data['data'].append(cheapest_cover(c, costs, demand))
+                continue
 
             # Instantiate a CP solver.
             parameters = pywrapcp.Solver.DefaultSolverParameters()
             solver = pywrapcp.Solver("mip_solver", parameters)
 
             # array number for each type of truck
-            x = [solver.IntVar(0, 1000, "x%i" % i) for i in range(num_trucks)]
+            x = [solver.IntVar(0, MAX_TRUCKS, "x%i" % i) for i in range(num_trucks)]
 
             formula = x[0] * c[0]
             for i in range(1, num_trucks):
@@ -53,13 +69,46 @@ class MipSolver(MethodView):
             collector = solver.LastSolutionCollector()
             for i in x: collector.Add(i)
             collector.AddObjective(obj_expr)
-            solver.Solve(decision_builder, [objective, collector])
+            monitors = [objective, collector]
+            if time_limit_ms is not None:
+                monitors.append(solver.TimeLimit(time_limit_ms))
+            solver.Solve(decision_builder, monitors)
+            timed_out = time_limit_ms is not None and solver.WallTime() >= time_limit_ms
             if collector.SolutionCount() > 0:
                 response_data['data'].append(print_result(collector, x))
+                if timed_out:
+                    deadline.cut(part, 'best_found')
+            elif timed_out:
+                deadline.cut(part, 'estimate')
+                response_data['data'].append(cheapest_cover(c, costs, demand))
             else:
                 raise ExceptionHandler(message = "No solution found.", status_code = 400)
 
-        return jsonify(response_data)
+        if deadline.ms is not None:
+            response_data['deadline'] = deadline.report()
+        response = jsonify(response_data)
+        # A solve cut short by the deadline isn't the answer to cache.
+        if deadline.cuts:
+            response.cache_control.no_store = True
+        return response
+
+def cheapest_cover(c, costs, demand):
+    """
+    Cheapest cover of the demand with trucks of a single type, a feasible solution:
+    ceil(demand / c) trucks carry less than demand + c. Types without capacity or
+    needing more than MAX_TRUCKS trucks can't cover the demand alone.
+    """
+    counts = [-(-demand // weight) if weight > 0 else None for weight in c]
+    types = [i for i in range(len(c)) if counts[i] is not None and counts[i] <= MAX_TRUCKS]
+    if not types:
+        raise ExceptionHandler(message = "No solution found.", status_code = 400)
+    best = min(types, key = lambda i: counts[i] * costs[i])
+    list_result = [0] * len(c)
+    list_result[best] = counts[best]
+    return {
+        'total_cost': counts[best] * costs[best],
+        'list_result': list_result
+    }
 
 def print_result(collector, x):
     list_result = []
@@ -1,46 +1,111 @@
-from ortools.linear_solver import pywraplp
+from __future__ import print_function
+from ortools.graph import pywrapgraph
+from flask import request
+from flask.views import MethodView
 
 import json
 import sys
 import os
+import numpy as np
 
-def main():
-    file_path = sys.argv[1]
-    input_str = open(file_path, 'r').read()
-    input_data = json.loads(input_str)
-    if os.path.isfile(file_path):
-        os.remove(file_path)
+sys.path.append('..')
+from errors import ExceptionHandler
+from encoders import jsonify
 
-    costs = input_data['costs']
-    num_vendors = len(costs)
-    num_orders = len(costs[0])
-    x = {}
+# Min cost flow takes integer costs, they are scaled to keep 3 decimals.
+COST_SCALE = 1000
 
-    solver = pywraplp.Solver('SolveAssignmentProblemMIP',
-                            pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
+def assign_uncapacitated(costs):
+    """
+    Without vendor capacities every order simply goes to its cheapest vendor,
+    costs is a vendors x orders matrix.
+    """
+    vendors = np.argmin(np.asarray(costs, dtype=np.float64), axis=0)
+    return {
+        'assignment': [{ 'vendor': int(vendor), 'order': order } for order, vendor in enumerate(vendors)]
+    }
 
-    for i in range(num_vendors):
-            for j in range(num_orders):
-                x[i, j] = solver.BoolVar('x[%i,%i]' % (i, j))
+def assign_capacitated(costs, capacities):
+    """
+    Each vendor takes at most capacities[vendor] orders. Solved as a min cost flow
+    source -> vendors -> orders -> sink. Return None when the orders don't fit.
+    Raise ValueError when capacities doesn't have one value per vendor.
+    """
+    costs = np.rint(np.asarray(costs, dtype=np.float64) * COST_SCALE).astype(np.int64)
+    num_vendors, num_orders = costs.shape
+    if len(capacities) != num_vendors:
+        raise ValueError('capacities must have one value per vendor: %d values for %d vendors.'
+                         % (len(capacities), num_vendors))
+    source = num_vendors + num_orders
+    sink = source + 1
 
-    # Objective
-    solver.Minimize(solver.Sum([costs[i][j] * x[i, j] for i in range(num_vendors)
-                                                        for j in range(num_orders)]))
+    min_cost_flow = pywrapgraph.SimpleMinCostFlow()
+    for i in range(num_vendors):
+        min_cost_flow.AddArcWithCapacityAndUnitCost(source, i, int(capacities[i]), 0)
+    first_order_arc = min_cost_flow.NumArcs()
+    for i in range(num_vendors):
+        for j in range(num_orders):
+            min_cost_flow.AddArcWithCapacityAndUnitCost(i, num_vendors + j, 1, int(costs[i, j]))
+    for j in range(num_orders):
+        min_cost_flow.AddArcWithCapacityAndUnitCost(num_vendors + j, sink, 1, 0)
+    min_cost_flow.SetNodeSupply(source, num_orders)
+    min_cost_flow.SetNodeSupply(sink, -num_orders)
 
-    # Constraints
-    # All orders must be assigned
-    solver.Add(solver.Sum([x[i, j] for i in range(num_vendors) for j in range(num_orders)]) == num_orders)
+    if min_cost_flow.Solve() != min_cost_flow.OPTIMAL:
+        return None
 
-    solve = solver.Solve()
     json_data = {
         'assignment': []
     }
-    for i in range(num_vendors):
-        for j in range(num_orders):
-            if x[i, j].solution_value() > 0:
-                json_data['assignment'].append({ 'vendor': i, 'order': j })
+    for arc in range(first_order_arc, first_order_arc + num_vendors * num_orders):
+        if min_cost_flow.Flow(arc) > 0:
+            json_data['assignment'].append({
+                'vendor': min_cost_flow.Tail(arc),
+                'order': min_cost_flow.Head(arc) - num_vendors
+            })
+    json_data['assignment'].sort(key = lambda item: item['order'])
+    return json_data
+
+class NtfAssignmentSolver(MethodView):
+    """
+    Vendor assignment of orders, with optional vendor capacities (number of orders).
+    """
+
+    def post(self):
+        data = request.get_json()
+        costs = data['costs']
+        capacities = data.get('capacities')
+
+        if capacities is None:
+            return jsonify(assign_uncapacitated(costs))
+
+        try:
+            json_data = assign_capacitated(costs, capacities)
+        except ValueError as e:
+            raise ExceptionHandler(message = str(e), status_code = 400)
+        if json_data is None:
+            raise ExceptionHandler(message = "No solution found", status_code = 400)
+        return jsonify(json_data)
+
+def main():
+    file_path = sys.argv[1]
+    input_str = open(file_path, 'r').read()
+    input_data = json.loads(input_str)
+    if os.path.isfile(file_path):
+        os.remove(file_path)
+
+    costs = input_data['costs']
+    capacities = input_data.get('capacities')
+
+    # The only constraint is one vendor per order, no solver is needed.
+    if capacities is None:
+        json_data = assign_uncapacitated(costs)
+    else:
+        json_data = assign_capacitated(costs, capacities)
+        if json_data is None:
+            raise Exception('No assignment is possible.')
 
-    print json.dumps(json_data)
+    print(json.dumps(json_data))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,114 @@
+from flask import Response
+
+import sys
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+sys.path.append('..')
+from encoders import dumps
+
+MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream'
+}
+
+
+def current_routes(routing, num_vehicles):
+    """
+    Nodes of every route of the solution being reported by a routing callback.
+    """
+    routes = []
+    for vehicle in range(num_vehicles):
+        nodes = []
+        index = routing.Start(vehicle)
+        while not routing.IsEnd(index):
+            nodes.append(routing.IndexToNode(index))
+            index = routing.NextVar(index).Value()
+        nodes.append(routing.IndexToNode(index))
+        routes.append(nodes)
+    return routes
+
+
+class ProgressMonitor(object):
+    """
+    Routing search monitor reporting every improving solution as a 'solution' event,
+    optionally with its routes. Once `stopped` is set, the search finishes at the
+    next solution.
+    """
+    def __init__(self, report, stopped, include_routes = False):
+        self.report = report
+        self.stopped = stopped
+        self.include_routes = include_routes
+        self.best = None
+        self.solutions = 0
+        self.started = time.time()
+
+    def attach(self, routing, num_vehicles):
+        def at_solution():
+            self.solutions += 1
+            objective = routing.CostVar().Max()
+            if self.best is None or objective < self.best:
+                self.best = objective
+                event = {
+                    'event': 'solution',
+                    'objective': objective,
+                    'solutions': self.solutions,
+                    'elapsed_ms': int(1000 * (time.time() - self.started))
+                }
+                if self.include_routes:
+                    event['routes'] = current_routes(routing, num_vehicles)
+                self.report(event)
+            if self.stopped.is_set():
+                routing.solver().FinishCurrentSearch()
+        routing.AddAtSolutionCallback(at_solution)
+
+    def finish(self, routing):
+        pass
+
+
+def _encode(event, stream_format):
+    body = dumps(event)
+    if not isinstance(body, bytes):
+        body = body.encode('utf-8')
+    if stream_format == 'sse':
+        return b'event: ' + event['event'].encode('utf-8') + b'\ndata: ' + body + b'\n\n'
+    return body + b'\n'
+
+
+def progress_response(run, stream_format):
+    """
+    Stream the events of a solve as NDJSON lines or Server-Sent Events.
+    `run(report, stopped)` runs in a thread, reports the intermediate events and returns
+    the final one. `stopped` is set when the client goes away.
+    """
+    events = queue.Queue()
+    stopped = threading.Event()
+
+    def solve():
+        try:
+            final = run(events.put, stopped)
+        except Exception as e:
+            final = { 'event': 'error', 'message': str(e) }
+        events.put(final)
+        events.put(None)
+
+    thread = threading.Thread(target = solve)
+    thread.daemon = True
+    thread.start()
+
+    def generate():
+        try:
+            while True:
+                event = events.get()
+                if event is None:
+                    break
+                yield _encode(event, stream_format)
+        finally:
+            stopped.set()
+
+    return Response(generate(), mimetype = MIMETYPES[stream_format])
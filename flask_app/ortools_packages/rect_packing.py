@@ -0,0 +1,247 @@
+import numpy as np
+
+ENGINES = ('maxrects', 'skyline')
+
+
+def _order(widths, heights):
+    """
+    Rectangles by decreasing area, in their order for equal areas, as rectpack sorts them.
+    """
+    return np.argsort(-(widths * heights), kind='mergesort')
+
+
+def _orientations(width, height, rotation):
+    if rotation and width != height:
+        return [(width, height), (height, width)]
+    return [(width, height)]
+
+
+class _Bins(object):
+    """
+    The bins of a request, opened in their order when a rectangle fits in no open bin.
+    """
+    def __init__(self, bin_widths, bin_heights, rotation):
+        self.widths = bin_widths
+        self.heights = bin_heights
+        self.rotation = rotation
+        self.available = np.ones(len(bin_widths), dtype=bool)
+        self.opened = []
+
+    def open(self, width, height):
+        """
+        Open the first available bin the rectangle fits in. Return its bin number, the
+        index among the opened bins, or None.
+        """
+        fits = self.available & (self.widths >= width) & (self.heights >= height)
+        if self.rotation:
+            fits |= self.available & (self.widths >= height) & (self.heights >= width)
+        candidates = np.nonzero(fits)[0]
+        if len(candidates) == 0:
+            return None
+        self.available[candidates[0]] = False
+        self.opened.append(int(candidates[0]))
+        return len(self.opened) - 1
+
+
+class MaxRects(object):
+    """
+    MaxRects with the best short side fit over all the open bins at once: the free
+    rectangles of every bin are rows of the same arrays, tagged with their bin.
+    """
+    def __init__(self, bins, dtype):
+        self.bins = bins
+        self.free_bins = np.empty(0, dtype=np.int64)
+        self.free = np.empty((0, 4), dtype=dtype)
+
+    def _add_bin(self, b):
+        index = self.bins.opened[b]
+        self.free_bins = np.append(self.free_bins, b)
+        self.free = np.vstack([self.free, [[0, 0, self.bins.widths[index], self.bins.heights[index]]]])
+
+    def _best(self, width, height):
+        """
+        (short side, long side, bin, free rectangle, width, height) of the best position, or None.
+        """
+        best = None
+        fw, fh = self.free[:, 2], self.free[:, 3]
+        for w, h in _orientations(width, height, self.bins.rotation):
+            candidates = np.nonzero((fw >= w) & (fh >= h))[0]
+            if len(candidates) == 0:
+                continue
+            short = np.minimum(fw[candidates] - w, fh[candidates] - h)
+            long = np.maximum(fw[candidates] - w, fh[candidates] - h)
+            j = np.lexsort((self.free_bins[candidates], long, short))[0]
+            k = candidates[j]
+            position = (short[j], long[j], self.free_bins[k], k, w, h)
+            if best is None or position[:3] < best[:3]:
+                best = position
+        return best
+
+    def place(self, width, height):
+        """
+        Return (bin, x, y, width, height) of the rectangle, or None when it fits in no bin.
+        """
+        best = self._best(width, height)
+        if best is None:
+            b = self.bins.open(width, height)
+            if b is None:
+                return None
+            self._add_bin(b)
+            best = self._best(width, height)
+        _, _, b, k, w, h = best
+        x, y = self.free[k, 0], self.free[k, 1]
+        self._split(b, x, y, w, h)
+        return b, x, y, w, h
+
+    def _split(self, b, x, y, w, h):
+        """
+        Replace the free rectangles of bin b the placed one overlaps by their maximal parts
+        around it, and remove the free rectangles contained in another one.
+        """
+        fx, fy, fw, fh = self.free.T
+        overlaps = (self.free_bins == b) & (fx < x + w) & (fx + fw > x) & (fy < y + h) & (fy + fh > y)
+        ox, oy, ow, oh = self.free[overlaps].T
+        parts = np.vstack([
+            np.column_stack([ox, oy, x - ox, oh]),
+            np.column_stack([np.full_like(ox, x + w), oy, ox + ow - x - w, oh]),
+            np.column_stack([ox, oy, ow, y - oy]),
+            np.column_stack([ox, np.full_like(oy, y + h), ow, oy + oh - y - h])
+        ])
+        parts = parts[(parts[:, 2] > 0) & (parts[:, 3] > 0)]
+
+        keep = ~overlaps
+        same = keep & (self.free_bins == b)
+        others = self.free[same]
+        # Parts contained in a free rectangle left, or in another part (the first of equal ones stays).
+        inside_others = _contains(others, parts).any(axis=0)
+        inside_parts = _contains(parts, parts)
+        np.fill_diagonal(inside_parts, False)
+        equal = (parts[:, None, :] == parts[None, :, :]).all(axis=2)
+        inside_parts &= ~equal | np.tri(len(parts), k=-1, dtype=bool)
+        parts = parts[~(inside_others | inside_parts.any(axis=0))]
+
+        self.free = np.vstack([self.free[keep], parts])
+        self.free_bins = np.concatenate([self.free_bins[keep], np.full(len(parts), b, dtype=np.int64)])
+
+
+def _contains(outer, inner):
+    """
+    outer x inner booleans, whether the outer rectangle contains the inner one.
+    """
+    return ((outer[:, None, 0] <= inner[None, :, 0]) & (outer[:, None, 1] <= inner[None, :, 1])
+            & (outer[:, None, 0] + outer[:, None, 2] >= inner[None, :, 0] + inner[None, :, 2])
+            & (outer[:, None, 1] + outer[:, None, 3] >= inner[None, :, 1] + inner[None, :, 3]))
+
+
+class Skyline(object):
+    """
+    Skyline bottom-left, first fit over the open bins. The skyline of a bin is the
+    arrays of the start, the height and the width of its segments.
+    """
+    def __init__(self, bins, dtype):
+        self.bins = bins
+        self.dtype = dtype
+        self.skylines = []
+        self.floors = np.empty(0, dtype=dtype)
+
+    def _add_bin(self, b):
+        width = self.bins.widths[self.bins.opened[b]]
+        self.skylines.append((np.zeros(1, dtype=self.dtype), np.zeros(1, dtype=self.dtype),
+                              np.array([width], dtype=self.dtype)))
+        self.floors = np.append(self.floors, 0)
+
+    def _best(self, b, width, height):
+        """
+        (top, x, segment, width, height) of the lowest then leftmost position in bin b, or None.
+        """
+        index = self.bins.opened[b]
+        bin_width, bin_height = self.bins.widths[index], self.bins.heights[index]
+        xs, ys, ws = self.skylines[b]
+        best = None
+        for w, h in _orientations(width, height, self.bins.rotation):
+            ends = xs + w
+            covers = (xs[None, :] < ends[:, None]) & (xs[None, :] + ws[None, :] > xs[:, None])
+            bottoms = np.where(covers, ys[None, :], ys.min()).max(axis=1)
+            candidates = np.nonzero((ends <= bin_width) & (bottoms + h <= bin_height))[0]
+            if len(candidates) == 0:
+                continue
+            tops = bottoms[candidates] + h
+            i = candidates[np.lexsort((xs[candidates], tops))[0]]
+            position = (bottoms[i] + h, xs[i], i, w, h)
+            if best is None or position[:2] < best[:2]:
+                best = position
+        return best
+
+    def place(self, width, height):
+        """
+        Return (bin, x, y, width, height) of the rectangle, or None when it fits in no bin.
+        """
+        smallest = min(width, height) if self.bins.rotation else height
+        heights = np.array([self.bins.heights[index] for index in self.bins.opened], dtype=self.dtype)
+        best = None
+        # A bin whose lowest segment is too high can't take the rectangle.
+        for b in np.nonzero(heights - self.floors >= smallest)[0]:
+            best = self._best(b, width, height)
+            if best is not None:
+                break
+        if best is None:
+            b = self.bins.open(width, height)
+            if b is None:
+                return None
+            self._add_bin(b)
+            best = self._best(b, width, height)
+        top, x, _, w, h = best
+        self._raise(b, x, w, top)
+        return int(b), x, top - h, w, h
+
+    def _raise(self, b, x, w, top):
+        """
+        Put a segment from x to x + w at height top on the skyline of bin b.
+        """
+        xs, ys, ws = self.skylines[b]
+        bin_width = self.bins.widths[self.bins.opened[b]]
+        ends = xs + ws
+        left = xs < x
+        right = ends > x + w
+        # The segment ending past x + w now starts there.
+        cut = right & (xs < x + w)
+        xs = np.where(cut, x + w, xs)
+        keep = left | right
+        xs = np.concatenate([xs[keep], [x]])
+        ys = np.concatenate([ys[keep], [top]])
+        order = np.argsort(xs, kind='mergesort')
+        xs, ys = xs[order], ys[order]
+        # Neighbours at the same height are one segment.
+        distinct = np.concatenate([[True], ys[1:] != ys[:-1]])
+        xs, ys = xs[distinct], ys[distinct]
+        ws = np.diff(np.concatenate([xs, [bin_width]]))
+        self.skylines[b] = (xs, ys, ws)
+        self.floors[b] = ys.min()
+
+
+def pack_rectangles(widths, heights, bin_widths, bin_heights, engine='maxrects', rotation=True):
+    """
+    Pack the rectangles by decreasing area into the bins, each bin used at most once,
+    as rectpack's default packer does. The rectangles which fit in no bin are left out.
+    Return the arrays (bin, rect, x, y, w, h) of the packed rectangles in the order of
+    rectpack's rect_list: by bin, the bins numbered in the order they were opened.
+    """
+    dimensions = np.asarray(list(widths) + list(heights) + list(bin_widths) + list(bin_heights))
+    dtype = np.int64 if dimensions.dtype.kind in 'iub' else np.float64
+    widths, heights = np.asarray(widths, dtype=dtype), np.asarray(heights, dtype=dtype)
+    bins = _Bins(np.asarray(bin_widths, dtype=dtype), np.asarray(bin_heights, dtype=dtype), rotation)
+    if engine not in ENGINES:
+        raise ValueError('Unknown engine: %s' % engine)
+    packer = MaxRects(bins, dtype) if engine == 'maxrects' else Skyline(bins, dtype)
+
+    placed = []
+    for rect in _order(widths, heights):
+        position = packer.place(widths[rect], heights[rect])
+        if position is not None:
+            b, x, y, w, h = position
+            placed.append((b, rect, x, y, w, h))
+    if not placed:
+        return tuple(np.empty(0, dtype=np.int64) for _ in range(6))
+    columns = [np.array(column) for column in zip(*placed)]
+    order = np.argsort(columns[0], kind='mergesort')
+    return tuple(column[order] for column in columns)
@@ -0,0 +1,221 @@
+import heapq
+import json
+import os
+import threading
+import numpy as np
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra
+    from scipy.spatial import cKDTree
+except ImportError:
+    csr_matrix = None
+
+# Speed (km/h) of the legs between a location and its nearest road node.
+ACCESS_SPEED = 20.
+# Largest number of cells computed at once when searching or snapping.
+CHUNK_CELLS = 20 * 1000 * 1000
+# csgraph treats explicit zeros as missing edges.
+_MIN_WEIGHT = 1e-9
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Vectorized haversine distance in km.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    s = (np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2)
+    c = 2 * np.arcsin(np.sqrt(s))
+
+    # 6367 km is the radius of the Earth
+    return 6367 * c
+
+
+def _csr(num_nodes, tails, heads, weights):
+    """
+    Compressed sparse rows of a weighted graph, parallel edges keep the smallest weight.
+    """
+    order = np.lexsort((weights, heads, tails))
+    tails, heads, weights = tails[order], heads[order], weights[order]
+    first = np.ones(len(tails), dtype=bool)
+    first[1:] = (tails[1:] != tails[:-1]) | (heads[1:] != heads[:-1])
+    tails, heads, weights = tails[first], heads[first], weights[first]
+
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=num_nodes), out=indptr[1:])
+    return indptr, heads.astype(np.int32), np.maximum(weights, _MIN_WEIGHT)
+
+
+def _dijkstra(indptr, indices, weights, source, targets):
+    """
+    Single source shortest paths, stopped once every target is settled.
+    """
+    dist = {source: 0.}
+    settled = set()
+    remaining = set(targets)
+    heap = [(0., source)]
+    while heap and remaining:
+        d, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled.add(u)
+        remaining.discard(u)
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            nd = d + weights[k]
+            if nd < dist.get(v, np.inf):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return [dist.get(t, np.inf) for t in targets]
+
+
+class RoadGraph(object):
+    """
+    Road network held in CSR arrays, one for the lengths (km) and one for the
+    travel times (seconds) of the edges.
+
+    Methods:
+        - load: read a graph file
+        - grid: synthetic grid graph
+        - snap: nearest road nodes of coordinates
+        - shortest: many-to-many shortest path costs between nodes
+        - matrices: distance and time matrices between coordinates
+    """
+    def __init__(self, lats, lons, tails, heads, lengths, speeds, oneway=None):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        tails = np.asarray(tails, dtype=np.int64)
+        heads = np.asarray(heads, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.float64)
+        times = lengths / np.asarray(speeds, dtype=np.float64) * 3600
+
+        # Two-way edges are added in both directions.
+        if oneway is None:
+            oneway = np.zeros(len(tails), dtype=bool)
+        twoway = ~np.asarray(oneway, dtype=bool)
+        tails, heads = np.concatenate([tails, heads[twoway]]), np.concatenate([heads, tails[twoway]])
+        lengths = np.concatenate([lengths, lengths[twoway]])
+        times = np.concatenate([times, times[twoway]])
+
+        self.num_nodes = len(self.lats)
+        self.length_csr = _csr(self.num_nodes, tails, heads, lengths)
+        self.time_csr = _csr(self.num_nodes, tails, heads, times)
+        self.tree = None
+        if csr_matrix is not None:
+            self.tree = cKDTree(np.column_stack(self._project(self.lats, self.lons)))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a graph file, either json or npz, with:
+            - nodes: [[lat, lon], ...]
+            - edges: [[from, to, length_km, speed_kmh, oneway], ...], oneway is optional
+        """
+        if path.endswith('.npz'):
+            data = np.load(path)
+            nodes, edges = data['nodes'], data['edges']
+        else:
+            with open(path, 'r') as graph_file:
+                data = json.load(graph_file)
+            nodes = np.asarray(data['nodes'], dtype=np.float64)
+            edges = np.asarray(data['edges'], dtype=np.float64)
+        oneway = edges[:, 4] if edges.shape[1] > 4 else None
+        return cls(nodes[:, 0], nodes[:, 1], edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3], oneway)
+
+    @classmethod
+    def grid(cls, rows, cols, spacing=0.5, speed=40., origin=(10.75, 106.65)):
+        """
+        Synthetic two-way grid of rows x cols nodes, `spacing` km apart.
+        """
+        step_lat = spacing / 6367. * 180 / np.pi
+        step_lon = step_lat / np.cos(np.radians(origin[0]))
+        ids = np.arange(rows * cols).reshape(rows, cols)
+        lats = origin[0] + step_lat * np.repeat(np.arange(rows), cols)
+        lons = origin[1] + step_lon * np.tile(np.arange(cols), rows)
+        tails = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+        heads = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+        lengths = haversine(lats[tails], lons[tails], lats[heads], lons[heads])
+        return cls(lats, lons, tails, heads, lengths, np.full(len(tails), speed))
+
+    def _project(self, lats, lons):
+        """
+        Equirectangular projection, good enough to find the nearest node.
+        """
+        scale = np.cos(np.radians(np.mean(self.lats)))
+        return np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64) * scale
+
+    def snap(self, lats, lons):
+        """
+        Return the nearest node of each coordinate and the distance (km) to it.
+        """
+        ys, xs = self._project(lats, lons)
+        if self.tree is not None:
+            _, nodes = self.tree.query(np.column_stack([ys, xs]))
+        else:
+            node_ys, node_xs = self._project(self.lats, self.lons)
+            chunk = max(1, CHUNK_CELLS // self.num_nodes)
+            nodes = np.empty(len(ys), dtype=np.int64)
+            for start in range(0, len(ys), chunk):
+                dy = ys[start:start + chunk, None] - node_ys[None, :]
+                dx = xs[start:start + chunk, None] - node_xs[None, :]
+                nodes[start:start + chunk] = np.argmin(dy * dy + dx * dx, axis=1)
+        offsets = haversine(np.asarray(lats), np.asarray(lons), self.lats[nodes], self.lons[nodes])
+        return nodes, offsets
+
+    def shortest(self, sources, targets, weight='length'):
+        """
+        Shortest path costs from every source node to every target node,
+        np.inf when the target can't be reached.
+        """
+        indptr, indices, weights = self.length_csr if weight == 'length' else self.time_csr
+        unique_sources, source_rows = np.unique(sources, return_inverse=True)
+        targets = np.asarray(targets)
+        costs = np.empty((len(unique_sources), len(targets)))
+
+        if csr_matrix is not None:
+            graph = csr_matrix((weights, indices, indptr), shape=(self.num_nodes, self.num_nodes))
+            chunk = max(1, CHUNK_CELLS // self.num_nodes)
+            for start in range(0, len(unique_sources), chunk):
+                rows = dijkstra(graph, directed=True, indices=unique_sources[start:start + chunk])
+                costs[start:start + chunk] = rows[:, targets]
+        else:
+            indptr, indices, weights = indptr.tolist(), indices.tolist(), weights.tolist()
+            target_list = targets.tolist()
+            for row, source in enumerate(unique_sources.tolist()):
+                costs[row] = _dijkstra(indptr, indices, weights, source, target_list)
+        return costs[source_rows]
+
+    def matrices(self, lats, lons):
+        """
+        Distance (km) and time (seconds) matrices between coordinates, including the
+        legs to and from the nearest road nodes.
+        """
+        nodes, offsets = self.snap(lats, lons)
+        access_times = offsets / ACCESS_SPEED * 3600
+        distances = self.shortest(nodes, nodes, 'length') + offsets[:, None] + offsets[None, :]
+        times = self.shortest(nodes, nodes, 'time') + access_times[:, None] + access_times[None, :]
+        np.fill_diagonal(distances, 0)
+        np.fill_diagonal(times, 0)
+        return distances, times
+
+
+_graphs = {}
+_graphs_lock = threading.Lock()
+
+
+def load_graph(name, directory):
+    """
+    Load a graph file of the graph directory once and keep it for the next requests.
+    """
+    if not name or os.path.basename(name) != name:
+        raise ValueError('Invalid road graph name: %s' % name)
+    path = os.path.join(directory, name)
+    with _graphs_lock:
+        graph = _graphs.get(path)
+        if graph is None:
+            if not os.path.isfile(path):
+                raise ValueError('Road graph not found: %s' % name)
+            graph = _graphs[path] = RoadGraph.load(path)
+    return graph
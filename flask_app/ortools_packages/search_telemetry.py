@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+
+# Solver counters reported when this OR-tools version exposes them.
+COUNTERS = ['Branches', 'Failures', 'Neighbors', 'FilteredNeighbors', 'AcceptedNeighbors']
+# Gaps to the final objective of the 'ms_to_within' times.
+WITHIN = [0.05, 0.01]
+
+_log_lock = threading.Lock()
+
+
+class SearchTelemetry(object):
+    """
+    Routing search monitor recording the trajectory of a search: the improving objectives
+    over wall time, the number of solutions, the time of the first one and the local
+    search counters of the solver.
+    """
+    def __init__(self, time_limit_ms):
+        self.time_limit_ms = time_limit_ms
+        self.started = None
+        self.trajectory = []
+        self.solutions = 0
+        self.wall_ms = None
+        self.counters = {}
+        self.profile = None
+
+    def _elapsed_ms(self):
+        return int(1000 * (time.time() - self.started))
+
+    def attach(self, routing, num_vehicles):
+        self.started = time.time()
+
+        def at_solution():
+            self.solutions += 1
+            objective = routing.CostVar().Max()
+            if not self.trajectory or objective < self.trajectory[-1][1]:
+                self.trajectory.append((self._elapsed_ms(), objective))
+        routing.AddAtSolutionCallback(at_solution)
+
+    def finish(self, routing):
+        self.wall_ms = self._elapsed_ms()
+        solver = routing.solver()
+        for name in COUNTERS:
+            counter = getattr(solver, name, None)
+            if counter is not None:
+                self.counters[name] = counter()
+        # Per operator statistics, in the versions which have the profiler.
+        profile = getattr(solver, 'LocalSearchProfile', None)
+        if profile is not None:
+            self.profile = profile()
+
+    def summary(self):
+        best = self.trajectory[-1][1] if self.trajectory else None
+        last_improvement_ms = self.trajectory[-1][0] if self.trajectory else None
+        ms_to_within = {}
+        for gap in WITHIN:
+            reached = [ms for ms, objective in self.trajectory if objective <= best + gap * abs(best)]
+            ms_to_within['%g%%' % (100 * gap)] = reached[0] if reached else None
+        summary = {
+            'time_limit_ms': self.time_limit_ms,
+            'wall_ms': self.wall_ms,
+            'solutions': self.solutions,
+            'first_solution_ms': self.trajectory[0][0] if self.trajectory else None,
+            'last_improvement_ms': last_improvement_ms,
+            'best_objective': best,
+            'ms_to_within': ms_to_within,
+            'trajectory': self.trajectory,
+            'counters': self.counters
+        }
+        if self.profile:
+            summary['local_search_profile'] = self.profile
+        return summary
+
+
+def log_telemetry(path, record):
+    """
+    Append a telemetry record to the json lines log read by benchmarks/telemetry_report.py.
+    """
+    with _log_lock:
+        with open(path, 'a') as log:
+            log.write(json.dumps(record) + '\n')
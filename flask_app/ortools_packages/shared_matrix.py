@@ -0,0 +1,165 @@
+from contextlib import contextmanager
+
+import atexit
+import errno
+import os
+import tempfile
+import threading
+import uuid
+import numpy as np
+
+_PREFIX = 'optimize-matrix-'
+
+
+def _default_directory():
+    """
+    /dev/shm keeps the files in memory on Linux, elsewhere use the temp directory.
+    """
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno == errno.EPERM
+    return True
+
+
+class SharedMatrix(object):
+    """
+    Picklable handle of a matrix in the store, workers attach to it by name.
+    """
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+
+    def attach(self):
+        """
+        Read-only view of the matrix, nothing is copied.
+        """
+        return attach(self)
+
+
+_attached = {}
+
+
+def attach(handle):
+    """
+    Map the matrix of a handle read-only, once per process.
+    """
+    matrix = _attached.get(handle.name)
+    if matrix is None:
+        matrix = _attached[handle.name] = np.asarray(np.load(handle.path, mmap_mode='r'))
+    return matrix
+
+
+def detach(handle):
+    """
+    Forget the mapping of a handle in this process.
+    """
+    _attached.pop(handle.name, None)
+
+
+class SharedMatrixStore(object):
+    """
+    Matrices written once by the parent process into memory-mapped files, so solver
+    processes attach to them instead of receiving a pickled copy per job.
+    Each matrix is leased: put() holds the first lease, acquire() adds one, release()
+    drops one, and the file is removed with the last lease. Files left by dead
+    processes are removed when a store is created.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory or _default_directory()
+        self.leases = {}
+        self.lock = threading.Lock()
+        self.remove_stale()
+        atexit.register(self.close)
+
+    def remove_stale(self):
+        for filename in os.listdir(self.directory):
+            if not filename.startswith(_PREFIX):
+                continue
+            try:
+                pid = int(filename[len(_PREFIX):].split('-')[0])
+            except ValueError:
+                continue
+            if not _process_alive(pid):
+                self._remove(os.path.join(self.directory, filename))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def put(self, array):
+        """
+        Write an array into the store and return its handle, with one lease held.
+        """
+        array = np.ascontiguousarray(array)
+        name = '%s%d-%s' % (_PREFIX, os.getpid(), uuid.uuid4().hex)
+        path = os.path.join(self.directory, name + '.npy')
+        matrix = np.lib.format.open_memmap(path, mode='w+', dtype=array.dtype, shape=array.shape)
+        matrix[...] = array
+        matrix.flush()
+        del matrix
+
+        handle = SharedMatrix(name, path)
+        with self.lock:
+            self.leases[name] = [handle, 1]
+        return handle
+
+    def acquire(self, handle):
+        with self.lock:
+            self.leases[handle.name][1] += 1
+        return handle
+
+    def release(self, handle):
+        with self.lock:
+            lease = self.leases.get(handle.name)
+            if lease is None:
+                return
+            lease[1] -= 1
+            if lease[1] > 0:
+                return
+            del self.leases[handle.name]
+        detach(handle)
+        self._remove(handle.path)
+
+    @contextmanager
+    def lease(self, array):
+        """
+        Handle of an array for the duration of a with block.
+        """
+        handle = self.put(array)
+        try:
+            yield handle
+        finally:
+            self.release(handle)
+
+    def close(self):
+        with self.lock:
+            handles = [lease[0] for lease in self.leases.values()]
+            self.leases.clear()
+        for handle in handles:
+            detach(handle)
+            self._remove(handle.path)
+
+
+_store = {}
+_store_lock = threading.Lock()
+
+
+def shared_store():
+    """
+    Store of the current process.
+    """
+    with _store_lock:
+        store = _store.get(os.getpid())
+        if store is None:
+            store = _store[os.getpid()] = SharedMatrixStore()
+    return store
@@ -1,3 +1,4 @@
+from __future__ import print_function
 import json
 import sys
 import numpy as np
@@ -6,8 +7,12 @@ import os
 
 import tsp
 import assignment
+from insertion_cost import InsertionCostEstimator
+from deadline import Deadline
 
 _INFINITE = 10000000
+# With a deadline, share of the time left for the costs, the assignment gets the rest.
+COSTS_SHARE = 0.7
 
 class DistanceMatrix(object):
     """
@@ -48,6 +53,34 @@ class DistanceMatrix(object):
         """
         return self.matrix.tolist()
 
+def tsp_cost(order, trip, deadline = None):
+    """
+    Total distance of the TSP from the order's pickup through the trip's stops and the order's drop.
+    """
+    # Generate locations list
+    locations = [(order['lats'][0], order['lons'][0])]
+    for idx in range(len(trip['lats'])):
+        locations.append((trip['lats'][idx], trip['lons'][idx]))
+    locations.append((order['lats'][1], order['lons'][1]))
+
+    # Create distance matrix, then calculate the cost (as distance)
+    dist_matrix = DistanceMatrix(locations).get_matrix()
+    cost_data = tsp.TSPSolver(dist_matrix).SolveTSP(deadline)
+    return cost_data['total']
+
+def tsp_costs(orders, trips, costs, pairs, deadline):
+    """
+    Set the TSP cost of the (order, trip) pairs, each one within its share of the deadline.
+    When no time is left for a TSP, the remaining pairs keep their estimate in costs.
+    """
+    for k, (i, j) in enumerate(pairs):
+        left = len(pairs) - k
+        if deadline.share_ms(left) == 0:
+            deadline.cut('costs', 'insertion estimate for %d of %d pairs' % (left, len(pairs)))
+            break
+        costs[i, j] = tsp_cost(orders[i], trips[j], deadline.split(1. / left))
+    return costs
+
 def main():
     file_path = sys.argv[1]
     input_str = open(file_path, 'r').read()
@@ -60,23 +93,24 @@ def main():
     num_trips = len(trips)
     num_orders = len(orders)
     
+    # With 'deadline_ms', the TSP costs which don't fit in the deadline keep the insertion estimate.
+    deadline = Deadline(input_data.get('deadline_ms'))
+
     # Generate costs matrix
-    costs = []
-    for i in range(num_orders):
-        costs.append([0 for j in range(num_trips)])
-    for i, order in enumerate(orders):
-        locations = [(order['lats'][0], order['lons'][0])]
-        for j, trip in enumerate(trips):
-            # Generate locations list
-            for idx in range(len(trip['lats'])):
-                locations.append((trip['lats'][idx], trip['lons'][idx]))
-            locations.append((order['lats'][1], order['lons'][1]))
-
-            # Create distance matrix, then calculate the cost (as distance)
-            dist_matrix = DistanceMatrix(locations).get_matrix()
-            cost_data = tsp.TSPSolver(dist_matrix).SolveTSP()
-            costs[i][j] = cost_data['total']
-    
+    cost_estimator = input_data.get('cost_estimator', 'tsp')
+    if cost_estimator == 'insertion' or deadline.ms is not None:
+        costs = InsertionCostEstimator(orders, trips).costs()
+    else:
+        costs = np.zeros((num_orders, num_trips))
+    if cost_estimator == 'insertion':
+        # Re-check the k cheapest trips of each order with the exact TSP.
+        top_k = min(input_data.get('recheck_top_k', 0), num_trips)
+        candidates = np.argsort(costs, axis=1)[:, :top_k]
+        pairs = [(i, j) for i in range(num_orders) for j in candidates[i]]
+    else:
+        pairs = [(i, j) for i in range(num_orders) for j in range(num_trips)]
+    costs = tsp_costs(orders, trips, costs, pairs, deadline.split(COSTS_SHARE)).tolist()
+
     # Generate data for assignment
     order_weights = [order['weight'] for order in orders]
     order_cbms = [order['cbm'] for order in orders]
@@ -84,11 +118,16 @@ def main():
     max_cbms = [trip['max_cbm'] for trip in trips]
 
     # Create assignment protocol
-    assignment_protocol = assignment.AssignmentProtocol(costs, order_weights, order_cbms, max_weights, max_cbms)
+    assignment_protocol = assignment.AssignmentProtocol(costs, order_weights, order_cbms, max_weights, max_cbms,
+                                                        engine = input_data.get('engine', 'auto'), deadline = deadline,
+                                                        presolve = input_data.get('presolve', False),
+                                                        processes = input_data.get('processes'))
     assignment_result = assignment_protocol.Assign()
+    if deadline.ms is not None:
+        assignment_result['deadline'] = deadline.report()
 
     # Print assignment
-    print json.dumps(assignment_result)
+    print(json.dumps(assignment_result))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,3 +1,4 @@
+from __future__ import print_function
 from ortools.constraint_solver import pywrapcp
 from ortools.constraint_solver import routing_enums_pb2
 
@@ -7,6 +8,8 @@ import numpy as np
 import sys
 import os
 
+from tsp_adaptive import HELD_KARP_MAX, held_karp, path_cost
+
 _INFINITE = 10000000
 
 class DistanceMatrix(object):
@@ -68,17 +71,27 @@ class TSPSolver(object):
     def __init__(self, matrix):
         self.matrix = matrix
 
-    def SolveTSP(self):
+    def SolveTSP(self, deadline = None):
         """
         Solve TSP method.
+        With a deadline.Deadline, the two routing models share it. A model whose share is
+        too short is skipped, and without any solution the nodes are visited in order.
+        Small instances are solved exactly by dynamic programming instead.
         """
         tsp_size = len(self.matrix)
         num_routes = 1
+        if 2 < tsp_size <= HELD_KARP_MAX:
+            # Distances truncated like the arc costs of the routing models.
+            matrix = np.trunc(np.asarray(self.matrix, dtype=np.float64))
+            route_detail = held_karp(matrix, 0, [tsp_size - 1, tsp_size - 2])
+            return {
+                'total': int(path_cost(matrix, route_detail)),
+                'route_detail': route_detail
+            }
         # Create routing model
         if tsp_size > 2:
             first_routing = pywrapcp.RoutingModel(tsp_size, num_routes, [0], [tsp_size - 1])
             second_routing = pywrapcp.RoutingModel(tsp_size, num_routes, [0], [tsp_size - 2])
-            search_parameters = pywrapcp.RoutingModel.DefaultSearchParameters()
 
             # Create the distance callback, which takes two arguments (the from and to node indices)
             # and returns the distance between these nodes.
@@ -87,8 +100,8 @@ class TSPSolver(object):
             first_routing.SetArcCostEvaluatorOfAllVehicles(dist_callback)
             second_routing.SetArcCostEvaluatorOfAllVehicles(dist_callback)
             # Solve, returns a solution if any.
-            first_assignment = first_routing.SolveWithParameters(search_parameters)
-            second_assignment = second_routing.SolveWithParameters(search_parameters)
+            first_assignment = self._solve(first_routing, deadline, 2)
+            second_assignment = self._solve(second_routing, deadline, 1)
 
             # Create result data of 2 routing models
             first_result_data = {
@@ -133,6 +146,9 @@ class TSPSolver(object):
                 second_result_data['route_detail'].append(second_routing.IndexToNode(index))
             
             if not (first_assignment or second_assignment):
+                if deadline is not None and deadline.share_ms() == 0:
+                    deadline.cut('tsp', 'in_order')
+                    return self.in_order()
                 raise Exception('No solution found')
             else:
                 # Select the one has smallest total distance of route, then dump it to json string.
@@ -141,6 +157,31 @@ class TSPSolver(object):
         else:
             raise Exception('Specify an instance greater than 2.')
 
+    @staticmethod
+    def _solve(routing, deadline, parts):
+        """
+        Solve a routing model within its share of the deadline, None when it has no time left.
+        """
+        search_parameters = pywrapcp.RoutingModel.DefaultSearchParameters()
+        if deadline is not None:
+            time_limit_ms = deadline.share_ms(parts)
+            if time_limit_ms == 0:
+                return None
+            if time_limit_ms is not None:
+                search_parameters.time_limit_ms = time_limit_ms
+        return routing.SolveWithParameters(search_parameters)
+
+    def in_order(self):
+        """
+        Path visiting the nodes in their order, the result when no search had time to run.
+        """
+        dist_between_nodes = DistanceMatrix(self.matrix)
+        route_detail = list(range(len(self.matrix)))
+        return {
+            'total': sum(dist_between_nodes.Distance(a, b) for a, b in zip(route_detail, route_detail[1:])),
+            'route_detail': route_detail
+        }
+
 def main():
     file_path = sys.argv[1]
     input_str = open(file_path, 'r').read()
@@ -189,7 +230,7 @@ def main():
 
             # dump the result to json string.
             json_str = json.dumps(result_data)
-            print json_str
+            print(json_str)
         else:
             raise Exception('No solution found')
 
@@ -0,0 +1,237 @@
+from ortools.constraint_solver import pywrapcp
+
+import time
+import numpy as np
+
+# Largest number of nodes solved exactly by dynamic programming.
+HELD_KARP_MAX = 12
+# Largest number of nodes solved by the NumPy local search, OR-tools above.
+LOCAL_SEARCH_MAX = 300
+# Longest segment moved by Or-opt.
+OR_OPT_MAX = 3
+# OR-tools takes integer arc costs.
+COST_SCALE = 1000
+TIME_LIMIT_MS = 10000
+_EPSILON = 1e-9
+
+
+def haversine_matrix(lats, lons):
+    """
+    Distances in km between all the locations, with the same formula as tsp.py.
+    """
+    lats, lons = np.radians(np.asarray(lats, dtype=np.float64)), np.radians(np.asarray(lons, dtype=np.float64))
+    dlat = lats[None, :] - lats[:, None]
+    dlon = lons[None, :] - lons[:, None]
+    s = np.sin(dlat / 2) ** 2 + np.cos(lats[:, None]) * np.cos(lats[None, :]) * np.sin(dlon / 2) ** 2
+    return 6367 * 2 * np.arcsin(np.sqrt(s))
+
+
+def path_cost(matrix, route):
+    route = np.asarray(route)
+    return float(matrix[route[:-1], route[1:]].sum())
+
+
+def held_karp(matrix, start, ends):
+    """
+    Exact shortest path from start through every node, ending at one of `ends`;
+    ends [start] is the closed tour. The subsets of the other nodes are processed by
+    size, each size in a few vectorized steps.
+    """
+    n = len(matrix)
+    others = np.array([node for node in range(n) if node != start], dtype=np.int64)
+    m = len(others)
+    if m == 0:
+        return [start, start] if ends == [start] else [start]
+    sub = matrix[np.ix_(others, others)]
+
+    masks = np.arange(1 << m)
+    sizes = np.array([bin(mask).count('1') for mask in masks])
+    cost = np.full((1 << m, m), np.inf)
+    parent = np.full((1 << m, m), -1, dtype=np.int64)
+    cost[1 << np.arange(m), np.arange(m)] = matrix[start, others]
+
+    for size in range(2, m + 1):
+        layer = masks[sizes == size]
+        for k in range(m):
+            bit = 1 << k
+            targets = layer[(layer & bit) != 0]
+            candidates = cost[targets ^ bit] + sub[:, k][None, :]
+            best = np.argmin(candidates, axis=1)
+            cost[targets, k] = candidates[np.arange(len(targets)), best]
+            parent[targets, k] = best
+
+    full = (1 << m) - 1
+    if ends == [start]:
+        totals = cost[full] + matrix[others, start]
+    else:
+        totals = np.full(m, np.inf)
+        for end in ends:
+            k = int(np.nonzero(others == end)[0][0])
+            totals[k] = cost[full, k]
+    k = int(np.argmin(totals))
+
+    route = []
+    mask = full
+    while k >= 0:
+        route.append(int(others[k]))
+        mask, k = mask ^ (1 << k), parent[mask, k]
+    route.append(start)
+    route.reverse()
+    if ends == [start]:
+        route.append(start)
+    return route
+
+
+def nearest_neighbour(matrix, start, end):
+    """
+    Path from start to end, visiting the nearest unvisited node at each step.
+    """
+    n = len(matrix)
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = visited[end] = True
+    route = [start]
+    for _ in range(n - 2 if end != start else n - 1):
+        distances = np.where(visited, np.inf, matrix[route[-1]])
+        node = int(np.argmin(distances))
+        visited[node] = True
+        route.append(node)
+    route.append(end)
+    return route
+
+
+def two_opt_move(matrix, route):
+    """
+    Best reversal of route[i..j], exact for asymmetric matrices: the arcs inside the
+    segment change direction. Return (delta, i, j).
+    """
+    forward = matrix[route[:-1], route[1:]]
+    backward = matrix[route[1:], route[:-1]]
+    cum_forward = np.concatenate([[0.], np.cumsum(forward)])
+    cum_backward = np.concatenate([[0.], np.cumsum(backward)])
+    positions = np.arange(1, len(route) - 1)
+    i, j = positions[:, None], positions[None, :]
+    a, b, c, d = route[i - 1], route[i], route[j], route[np.minimum(j + 1, len(route) - 1)]
+    delta = (matrix[a, c] + matrix[b, d] - matrix[a, b] - matrix[c, d]
+             + (cum_backward[j] - cum_backward[i]) - (cum_forward[j] - cum_forward[i]))
+    delta = np.where(j > i, delta, np.inf)
+    best = np.unravel_index(np.argmin(delta), delta.shape)
+    return delta[best], int(positions[best[0]]), int(positions[best[1]])
+
+
+def or_opt_move(matrix, route, length):
+    """
+    Best move of a segment of `length` nodes, kept in its direction, to another gap.
+    Return (delta, i, g): route[i:i + length] goes between route[g] and route[g + 1].
+    """
+    n = len(route)
+    starts = np.arange(1, n - length)
+    if len(starts) == 0:
+        return np.inf, 0, 0
+    first, last = route[starts], route[starts + length - 1]
+    before, after = route[starts - 1], route[starts + length]
+    removal = matrix[before, first] + matrix[last, after] - matrix[before, after]
+    gaps = np.arange(0, n - 1)
+    tails, heads = route[gaps], route[gaps + 1]
+    insertion = (matrix[tails[None, :], first[:, None]] + matrix[last[:, None], heads[None, :]]
+                 - matrix[tails, heads][None, :])
+    # The gap can't touch the segment: g from i - 1 to i + length - 1 leaves it in place.
+    g, i = gaps[None, :], starts[:, None]
+    valid = (g < i - 1) | (g > i + length - 1)
+    delta = np.where(valid, insertion - removal[:, None], np.inf)
+    best = np.unravel_index(np.argmin(delta), delta.shape)
+    return delta[best], int(starts[best[0]]), int(gaps[best[1]])
+
+
+def local_search(matrix, start, end, deadline):
+    """
+    Nearest neighbour path improved by the best 2-opt or Or-opt move until none improves.
+    """
+    route = np.array(nearest_neighbour(matrix, start, end), dtype=np.int64)
+    while time.time() < deadline:
+        delta, i, j = two_opt_move(matrix, route)
+        move = ('2-opt', i, j, 0)
+        for length in range(1, OR_OPT_MAX + 1):
+            or_delta, k, g = or_opt_move(matrix, route, length)
+            if or_delta < delta:
+                delta, move = or_delta, ('or-opt', k, g, length)
+        if delta >= -_EPSILON:
+            break
+        kind, i, j, length = move
+        if kind == '2-opt':
+            route[i:j + 1] = route[i:j + 1][::-1]
+        else:
+            segment = route[i:i + length]
+            rest = np.concatenate([route[:i], route[i + length:]])
+            gap = j if j < i else j - length
+            route = np.concatenate([rest[:gap + 1], segment, rest[gap + 1:]])
+    return route.tolist()
+
+
+def ortools_path(matrix, start, end, time_limit_ms):
+    """
+    OR-tools routing model of a single vehicle from start to end.
+    """
+    n = len(matrix)
+    scaled = np.rint(matrix * COST_SCALE).astype(np.int64).tolist()
+    if end == start:
+        routing = pywrapcp.RoutingModel(n, 1, start)
+    else:
+        routing = pywrapcp.RoutingModel(n, 1, [start], [end])
+    routing.SetArcCostEvaluatorOfAllVehicles(lambda a, b: scaled[a][b])
+    search_parameters = pywrapcp.RoutingModel.DefaultSearchParameters()
+    search_parameters.time_limit_ms = int(time_limit_ms)
+    assignment = routing.SolveWithParameters(search_parameters)
+    if not assignment:
+        return None
+
+    route = []
+    index = routing.Start(0)
+    while not routing.IsEnd(index):
+        route.append(routing.IndexToNode(index))
+        index = assignment.Value(routing.NextVar(index))
+    route.append(routing.IndexToNode(index))
+    return route
+
+
+def engine_for(n, engine='auto'):
+    if engine != 'auto':
+        return engine
+    if n <= HELD_KARP_MAX:
+        return 'exact'
+    if n <= LOCAL_SEARCH_MAX:
+        return 'local_search'
+    return 'ortools'
+
+
+def solve_tsp(matrix, start=0, ends=None, engine='auto', time_limit_ms=TIME_LIMIT_MS):
+    """
+    Shortest path from `start` through every node to one of `ends`, or the closed tour
+    back to start when ends is None. The engine is chosen by the number of nodes:
+    exact dynamic programming, then NumPy 2-opt/Or-opt, then OR-tools.
+    Return { 'total', 'route_detail', 'engine' }, or None when OR-tools finds nothing.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    ends = [start] if ends is None else list(ends)
+    engine = engine_for(len(matrix), engine)
+    deadline = time.time() + time_limit_ms / 1000.
+
+    if engine == 'exact':
+        route = held_karp(matrix, start, ends)
+    else:
+        route = None
+        for end in ends:
+            remaining_ms = max(1, 1000 * (deadline - time.time()) / max(1, len(ends) - ends.index(end)))
+            if engine == 'local_search':
+                candidate = local_search(matrix, start, end, time.time() + remaining_ms / 1000.)
+            else:
+                candidate = ortools_path(matrix, start, end, remaining_ms)
+            if candidate is not None and (route is None or path_cost(matrix, candidate) < path_cost(matrix, route)):
+                route = candidate
+        if route is None:
+            return None
+
+    return {
+        'total': path_cost(matrix, route),
+        'route_detail': route,
+        'engine': engine
+    }
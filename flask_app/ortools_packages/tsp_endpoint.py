@@ -0,0 +1,50 @@
+from flask import request
+from flask.views import MethodView
+
+import sys
+import numpy as np
+
+from tsp_adaptive import HELD_KARP_MAX, TIME_LIMIT_MS, haversine_matrix, solve_tsp
+
+sys.path.append('..')
+from errors import ExceptionHandler
+from encoders import jsonify
+
+
+class AdaptiveTspSolver(MethodView):
+    """
+    TSP solver choosing its engine by the number of nodes.
+        - matrix: distances, or lats and lons for haversine distances
+        - start: first node, 0 by default
+        - end, or ends: last node or the candidates for it, the closed tour without them
+        - engine: 'auto', 'exact', 'local_search' or 'ortools'
+    """
+
+    def post(self):
+        data = request.get_json()
+        if 'matrix' in data:
+            matrix = np.asarray(data['matrix'], dtype=np.float64)
+        else:
+            matrix = haversine_matrix(data['lats'], data['lons'])
+        n = len(matrix)
+        start = data.get('start', 0)
+        ends = data.get('ends', [data['end']] if 'end' in data else None)
+        engine = data.get('engine', 'auto')
+
+        if matrix.shape != (n, n) or n == 0:
+            raise ExceptionHandler(message='The matrix must be square.', status_code=400)
+        if not all(0 <= node < n for node in [start] + (ends or [])):
+            raise ExceptionHandler(message='Start and end nodes must be nodes of the matrix.', status_code=400)
+        if engine not in ('auto', 'exact', 'local_search', 'ortools'):
+            raise ExceptionHandler(message='Unknown engine: %s' % engine, status_code=400)
+        if engine == 'exact' and n > HELD_KARP_MAX + 4:
+            raise ExceptionHandler(message='The exact engine takes at most %d nodes.' % (HELD_KARP_MAX + 4),
+                                   status_code=400)
+        if ends is not None and start in ends and n > 1:
+            raise ExceptionHandler(message='A path must end elsewhere than its start, omit the end for a tour.',
+                                   status_code=400)
+
+        result = solve_tsp(matrix, start, ends, engine, data.get('time_limit_ms', TIME_LIMIT_MS))
+        if result is None:
+            raise ExceptionHandler(message='No solution found.', status_code=400)
+        return jsonify(result)
@@ -2,16 +2,26 @@ import json
 import numpy as np
 import sys
 import datetime
+import multiprocessing
 import os
+import time
 from ortools.constraint_solver import pywrapcp, routing_enums_pb2
 from collections import namedtuple
 from copy import deepcopy
 
-from flask import jsonify, request
+from flask import current_app, request
 from flask.views import MethodView
+from road_network import load_graph
+from shared_matrix import SharedMatrix, shared_store
+from vrp_stream import load_vrp_request
+from progress import MIMETYPES, ProgressMonitor, progress_response
+from deadline import Deadline, MIN_SOLVE_MS
+from search_telemetry import SearchTelemetry, log_telemetry
+from vrp_presolve import impossible_arcs
 
 sys.path.append('..')
 from errors import ExceptionHandler
+from encoders import jsonify
 
 
 DISTANCE_INF = 1000
@@ -23,13 +33,23 @@ class Evaluator:
     - Time callback.
     - Demand callback.
     - Distance callback.
+
+    Distances and transit times are computed with the haversine formula, unless the
+    road network matrices are given. The road network travel times already account for
+    the speed of the roads, the vehicle speed isn't applied to them.
     """
 
+    def __init__(self, distance_matrix=None, time_matrix=None):
+        self.distance_matrix = distance_matrix
+        self.time_matrix = time_matrix
+
     def total_time(self, demands, locations, loadings, unloadings, speed=40):
         def service_time_return(a, b):
             return loadings[a] + unloadings[a]
 
         def transit_time_return(a, b):
+            if self.time_matrix is not None:
+                return self.time_matrix[a][b]
             return (self.distance(locations[a], locations[b]) / speed) * 3600
 
         def total_time_return(a, b):
@@ -56,6 +76,8 @@ class Evaluator:
     def distance_callback(self, locations, matrix):
         def distance_calculate(a, b):
             if matrix[a][b]:
+                if self.distance_matrix is not None:
+                    return self.distance_matrix[a][b]
                 return self.distance(locations[a], locations[b])
             return DISTANCE_INF
         return distance_calculate
@@ -66,185 +88,483 @@ class Evaluator:
         return get_demand
 
 
-class VrpSolver(MethodView):
+def road_graph(data):
     """
-    Solver for Vehicle Routing Problem
+    Road graph selected by the request, from the graph directory of the app.
     """
+    try:
+        return load_graph(data.get('graph'), current_app.config.get('ROAD_GRAPH_DIR', 'graphs'))
+    except ValueError as e:
+        raise ExceptionHandler(message=str(e), status_code=400)
 
-    def post(self):
-        # region Input data
-        data = request.get_json()
-        allow_drop = data['allow_drop']
-        departure_times = data['departure_times']
-        vehicle_capacities = data['vehicle_capacities']
-        vehicle_costs = data['vehicle_costs']
-
-        # Gererate locations coordinate
-        lats = data['lats']
-        lons = data['lons']
-        num_locations = len(lats)
-        locations = [None for lat in lats]
-        for idx in range(num_locations):
-            locations[idx] = (lats[idx], lons[idx])
-
-        departure_depots = data['departure_depots']
-        return_depots = data['return_depots']
-        start_times = data['start_times']
-        end_times = data['end_times']
-        return_times = data['return_times']
-        demands = data['demands']
-        matrix = data['matrix']
-        groups = data['groups']
-        velocities = data['velocities']
-        horizon = data['horizon']
-        loadings = data['loadings']
-        unloadings = data['unloadings']
-        min_weights = data['min_weights']
-        first_vendor_index = data['first_vendor_index']
-
-        num_vehicles = len(vehicle_capacities)
-        # endregion
-
-        # region Create evaluators and add constrains.
-        evaluator = Evaluator()
-        dist_callback = evaluator.distance_callback(locations, matrix)
-        demands_callback = evaluator.demands_calculate(demands)
-        total_time_callbacks = []
-        for i in range(num_vehicles):
-            total_time_callbacks.append(deepcopy(evaluator.total_time(
-                demands=demands, locations=locations, loadings=loadings, unloadings=unloadings, speed=velocities[i])))
-
-        routing = pywrapcp.RoutingModel(
-            num_locations, num_vehicles, departure_depots, return_depots)
-        routing.SetArcCostEvaluatorOfAllVehicles(dist_callback)
-        for index, cost in enumerate(vehicle_costs):
-            routing.SetFixedCostOfVehicle(cost, index)
-
-        search_parameters = pywrapcp.RoutingModel.DefaultSearchParameters()
-        search_parameters.first_solution_strategy = (
-            routing_enums_pb2.FirstSolutionStrategy.AUTOMATIC)
-        search_parameters.local_search_metaheuristic = (
-            routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH)
-
-        search_parameters.time_limit_ms = 30 * 1000
-
-        routing.AddDimensionWithVehicleCapacity(evaluator=demands_callback,
-                                                slack_max=0,
-                                                vehicle_capacities=vehicle_capacities,
-                                                fix_start_cumul_to_zero=True,
-                                                name="capacity")
-
-        routing.AddDimensionWithVehicleTransits(evaluators=total_time_callbacks,
-                                                slack_max=horizon,
-                                                capacity=horizon,
-                                                fix_start_cumul_to_zero=False,
-                                                name="time")
-
-        routing.AddDimension(evaluator=dist_callback,
-                             slack_max=0,
-                             capacity=1000,
-                             fix_start_cumul_to_zero=True,
-                             name="distance")
-
-        time_dimension = routing.GetDimensionOrDie("time")
-        for location in range(num_locations):
-            start = int(3600 * start_times[location])
-            end = int(3600 * end_times[location])
-            time_dimension.CumulVar(location).SetRange(start, end)
-
-        for vehicle in range(num_vehicles):
-            start = int(3600 * departure_times[vehicle])
-            end = int(3600 * return_times[vehicle])
-            time_dimension.CumulVar(routing.Start(vehicle)).SetValue(start)
-            time_dimension.CumulVar(routing.End(vehicle)).SetRange(start, end)
-
-        for i in range(num_locations):
-            for j in range(num_locations):
-                if routing.NextVar(i).Contains(j):
-                    if matrix[i][j] == 0:
-                        routing.NextVar(i).RemoveValue(j)
-
-        for group in groups:
-            routing.AddSoftSameVehicleConstraint(group, 40)
-
-        min_load = 1
-        capacity_dimension = routing.GetDimensionOrDie("capacity")
-
-        for vehicle in range(num_vehicles):
-            if vehicle < first_vendor_index:
-                if allow_drop > 0:
-                    capacity_dimension.CumulVar(routing.End(
-                        vehicle)).RemoveInterval(0, min_weights[vehicle])
-                else:
-                    capacity_dimension.CumulVar(routing.End(
-                        vehicle)).RemoveInterval(1, min_weights[vehicle])
+
+def request_evaluator(data):
+    """
+    Evaluator of a /vrp request, on the road network matrices with 'distance_backend': 'road'.
+    """
+    if data.get('distance_backend', 'haversine') != 'road':
+        return Evaluator()
+    distances, times = road_graph(data).matrices(data['lats'], data['lons'])
+    # Unreachable pairs cost like the forbidden arcs and can't fit in the horizon.
+    return Evaluator(distance_matrix=np.where(np.isinf(distances), DISTANCE_INF, distances).tolist(),
+                     time_matrix=np.where(np.isinf(times), data['horizon'] + 1, times).tolist())
+
+
+def rows_result(total, vehicle_routes, lats, lons, departure_times, return_times, vehicle_capacities):
+    """
+    Default response layout: one dict per stop of every vehicle.
+    """
+    json_data = []
+    for j, route in enumerate(vehicle_routes):
+        routes = []
+        for k, node_index in enumerate(route['nodes']):
+            routes.append({
+                'location_no': node_index,
+                'location_latitude': lats[node_index],
+                'location_longitude': lons[node_index],
+                'load': route['loads'][k],
+                'distance': route['distances'][k],
+                'time_open': route['time_open'][k],
+                'time_leave': route['time_leave'][k]
+            })
+
+        # add vehicle's routes to list data
+        json_data.append({
+            'vehicle_no': j,
+            'departure_time': departure_times[j],
+            'return_time': return_times[j],
+            'capacity': vehicle_capacities[j],
+            'routes': routes
+        })
+
+    return {
+        'total': total,
+        'result': json_data
+    }
+
+
+def columnar_result(total, vehicle_routes, lats, lons, departure_times, return_times, vehicle_capacities):
+    """
+    Compact response layout: per-vehicle arrays of the stops, coordinates are sent once
+    and indexed by the node ids.
+    """
+    json_data = []
+    for j, route in enumerate(vehicle_routes):
+        json_data.append({
+            'vehicle_no': j,
+            'departure_time': departure_times[j],
+            'return_time': return_times[j],
+            'capacity': vehicle_capacities[j],
+            'nodes': route['nodes'],
+            'loads': route['loads'],
+            'distances': route['distances'],
+            'time_open': route['time_open'],
+            'time_leave': route['time_leave']
+        })
+
+    return {
+        'total': total,
+        'format': 'columnar',
+        'lats': lats,
+        'lons': lons,
+        'result': json_data
+    }
+
+
+# Search configurations tried by the portfolio mode, the first one is the default search.
+PORTFOLIO = [
+    ('AUTOMATIC', 'GUIDED_LOCAL_SEARCH'),
+    ('PATH_CHEAPEST_ARC', 'GUIDED_LOCAL_SEARCH'),
+    ('SAVINGS', 'GUIDED_LOCAL_SEARCH'),
+    ('PARALLEL_CHEAPEST_INSERTION', 'GUIDED_LOCAL_SEARCH'),
+    ('PATH_CHEAPEST_ARC', 'TABU_SEARCH'),
+    ('SAVINGS', 'SIMULATED_ANNEALING'),
+    ('PARALLEL_CHEAPEST_INSERTION', 'TABU_SEARCH'),
+    ('PATH_CHEAPEST_ARC', 'SIMULATED_ANNEALING')
+]
+TIME_LIMIT_MS = 30 * 1000
+# Layouts of the response selected with 'format', the first one is the default.
+RESPONSE_FORMATS = ('rows', 'columnar')
+# Extra time given to the portfolio processes to build their models and report.
+PORTFOLIO_GRACE_MS = 10 * 1000
+# With a deadline, share of the time left given to the search, the rest builds the model and the response.
+SEARCH_SHARE = 0.8
+
+
+def solve_vrp(data, evaluator, first_solution_strategy='AUTOMATIC',
+              local_search_metaheuristic='GUIDED_LOCAL_SEARCH', time_limit_ms=TIME_LIMIT_MS, monitors=()):
+    """
+    Build the routing model of a /vrp request and search it with one configuration.
+    `monitors` are attached to the model with attach(routing, num_vehicles) before the search,
+    and told the search is over with finish(routing).
+    The arcs of data['impossible_arcs'], computed here when 'presolve' is true, are
+    removed from the NextVar domains.
+    Return (objective, vehicle_routes), or None when no solution is found.
+    """
+    # region Input data
+    allow_drop = data['allow_drop']
+    departure_times = data['departure_times']
+    vehicle_capacities = data['vehicle_capacities']
+    vehicle_costs = data['vehicle_costs']
+
+    # Gererate locations coordinate
+    lats = data['lats']
+    lons = data['lons']
+    num_locations = len(lats)
+    locations = [None for lat in lats]
+    for idx in range(num_locations):
+        locations[idx] = (lats[idx], lons[idx])
+
+    departure_depots = data['departure_depots']
+    return_depots = data['return_depots']
+    start_times = data['start_times']
+    end_times = data['end_times']
+    return_times = data['return_times']
+    demands = data['demands']
+    matrix = data['matrix']
+    groups = data['groups']
+    velocities = data['velocities']
+    horizon = data['horizon']
+    loadings = data['loadings']
+    unloadings = data['unloadings']
+    min_weights = data['min_weights']
+    first_vendor_index = data['first_vendor_index']
+
+    num_vehicles = len(vehicle_capacities)
+    # endregion
+
+    # region Create evaluators and add constrains.
+    dist_callback = evaluator.distance_callback(locations, matrix)
+    demands_callback = evaluator.demands_calculate(demands)
+    total_time_callbacks = []
+    for i in range(num_vehicles):
+        total_time_callbacks.append(deepcopy(evaluator.total_time(
+            demands=demands, locations=locations, loadings=loadings, unloadings=unloadings, speed=velocities[i])))
+
+    routing = pywrapcp.RoutingModel(
+        num_locations, num_vehicles, departure_depots, return_depots)
+    routing.SetArcCostEvaluatorOfAllVehicles(dist_callback)
+    for index, cost in enumerate(vehicle_costs):
+        routing.SetFixedCostOfVehicle(cost, index)
+
+    search_parameters = pywrapcp.RoutingModel.DefaultSearchParameters()
+    search_parameters.first_solution_strategy = getattr(
+        routing_enums_pb2.FirstSolutionStrategy, first_solution_strategy)
+    search_parameters.local_search_metaheuristic = getattr(
+        routing_enums_pb2.LocalSearchMetaheuristic, local_search_metaheuristic)
+
+    search_parameters.time_limit_ms = time_limit_ms
+
+    routing.AddDimensionWithVehicleCapacity(evaluator=demands_callback,
+                                            slack_max=0,
+                                            vehicle_capacities=vehicle_capacities,
+                                            fix_start_cumul_to_zero=True,
+                                            name="capacity")
+
+    routing.AddDimensionWithVehicleTransits(evaluators=total_time_callbacks,
+                                            slack_max=horizon,
+                                            capacity=horizon,
+                                            fix_start_cumul_to_zero=False,
+                                            name="time")
+
+    routing.AddDimension(evaluator=dist_callback,
+                         slack_max=0,
+                         capacity=1000,
+                         fix_start_cumul_to_zero=True,
+                         name="distance")
+
+    time_dimension = routing.GetDimensionOrDie("time")
+    for location in range(num_locations):
+        start = int(3600 * start_times[location])
+        end = int(3600 * end_times[location])
+        time_dimension.CumulVar(location).SetRange(start, end)
+
+    for vehicle in range(num_vehicles):
+        start = int(3600 * departure_times[vehicle])
+        end = int(3600 * return_times[vehicle])
+        time_dimension.CumulVar(routing.Start(vehicle)).SetValue(start)
+        time_dimension.CumulVar(routing.End(vehicle)).SetRange(start, end)
+
+    # The arcs 'matrix' forbids and the arcs no vehicle can travel, their nodes mapped to
+    # the model indices. End depots have no single index and keep their arcs.
+    forbidden = np.asarray(matrix) == 0
+    impossible = data.get('impossible_arcs')
+    if impossible is None and data.get('presolve', False):
+        impossible = impossible_arcs(data, evaluator)[0]
+    if impossible is not None:
+        forbidden |= impossible
+    indices = [routing.NodeToIndex(node) for node in range(num_locations)]
+    tails, heads = np.nonzero(forbidden)
+    for i, j in zip(tails.tolist(), heads.tolist()):
+        tail, head = indices[i], indices[j]
+        if tail >= 0 and head >= 0 and routing.NextVar(tail).Contains(head):
+            routing.NextVar(tail).RemoveValue(head)
+
+    for group in groups:
+        routing.AddSoftSameVehicleConstraint(group, 40)
+
+    min_load = 1
+    capacity_dimension = routing.GetDimensionOrDie("capacity")
+
+    for vehicle in range(num_vehicles):
+        if vehicle < first_vendor_index:
+            if allow_drop > 0:
+                capacity_dimension.CumulVar(routing.End(
+                    vehicle)).RemoveInterval(0, min_weights[vehicle])
             else:
                 capacity_dimension.CumulVar(routing.End(
                     vehicle)).RemoveInterval(1, min_weights[vehicle])
+        else:
+            capacity_dimension.CumulVar(routing.End(
+                vehicle)).RemoveInterval(1, min_weights[vehicle])
+    # endregion
+
+    for monitor in monitors:
+        monitor.attach(routing, num_vehicles)
+
+    assignment = routing.SolveWithParameters(search_parameters)
+    for monitor in monitors:
+        monitor.finish(routing)
+    if not assignment:
+        return None
+
+    # print "total distance of all routes:", assignment.objectivevalue(), "\n"
+    capacity_dimension = routing.GetDimensionOrDie("capacity")
+    time_dimension = routing.GetDimensionOrDie("time")
+    distance_dimension = routing.GetDimensionOrDie("distance")
+
+    # collect the routes as per-vehicle arrays
+    vehicle_routes = []
+
+    for j in range(num_vehicles):
+        route = {
+            'nodes': [],
+            'loads': [],
+            'distances': [],
+            'time_open': [],
+            'time_leave': []
+        }
+        index = routing.Start(j)
+        while True:
+            node_index = routing.IndexToNode(index)
+            load_var = capacity_dimension.CumulVar(index)
+            time_var = time_dimension.CumulVar(index)
+            distance_var = distance_dimension.CumulVar(index)
+
+            # extends route to list
+            route['nodes'].append(node_index)
+            route['loads'].append(assignment.Value(load_var) / 1000.)
+            route['distances'].append(assignment.Value(distance_var))
+            route['time_open'].append(assignment.Min(time_var))
+            route['time_leave'].append(assignment.Max(time_var))
+
+            if routing.IsEnd(index):
+                break
+            else:
+                index = assignment.Value(routing.NextVar(index))
 
-        assignment = routing.SolveWithParameters(search_parameters)
-        if assignment:
-            # print "total distance of all routes:", assignment.objectivevalue(), "\n"
-            capacity_dimension = routing.GetDimensionOrDie("capacity")
-            time_dimension = routing.GetDimensionOrDie("time")
-            distance_dimension = routing.GetDimensionOrDie("distance")
-
-            # initialize json data
-            json_data = []
-
-            for j in range(num_vehicles):
-                routes = []
-                index = routing.Start(j)
-                while True:
-                    node_index = routing.IndexToNode(index)
-                    load_var = capacity_dimension.CumulVar(index)
-                    time_var = time_dimension.CumulVar(index)
-                    distance_var = distance_dimension.CumulVar(index)
-
-                    # extends route to list
-                    obj_append = {
-                        'location_no': node_index,
-                        'location_latitude': lats[node_index],
-                        'location_longitude': lons[node_index],
-                        'load': assignment.Value(load_var) / 1000.,
-                        'distance': assignment.Value(distance_var),
-                        'time_open': assignment.Min(time_var),
-                        'time_leave': assignment.Max(time_var)
-                    }
-
-                    routes.append(obj_append)
-                    if routing.IsEnd(index):
-                        break
-                    else:
-                        index = assignment.Value(routing.NextVar(index))
-
-                # print plan_output
-
-                # add vehicle's routes to list data
-                vehicle_json_data = {
-                    'vehicle_no': j,
-                    'departure_time': departure_times[j],
-                    'return_time': return_times[j],
-                    'capacity': vehicle_capacities[j],
-                    'routes': routes
-                }
-                json_data.append(vehicle_json_data)
+        vehicle_routes.append(route)
+
+    return assignment.ObjectiveValue(), vehicle_routes
+
+
+def _solve_portfolio_member(args):
+    """
+    Entry point of a portfolio process, the matrices are attached from the shared store.
+    """
+    data, evaluator, first_solution_strategy, local_search_metaheuristic, time_limit_ms = args
+    data = dict(data, matrix=data['matrix'].attach())
+    if isinstance(data.get('impossible_arcs'), SharedMatrix):
+        data['impossible_arcs'] = data['impossible_arcs'].attach()
+    if isinstance(evaluator.distance_matrix, SharedMatrix):
+        evaluator = Evaluator(distance_matrix=evaluator.distance_matrix.attach(),
+                              time_matrix=evaluator.time_matrix.attach())
+    return solve_vrp(data, evaluator, first_solution_strategy, local_search_metaheuristic, time_limit_ms)
 
-            # parse results to json
-            json_object = {
-                'total': assignment.ObjectiveValue(),
-                'result': json_data
-            }
+
+def solve_portfolio(data, evaluator, size, time_limit_ms=TIME_LIMIT_MS, grace_ms=PORTFOLIO_GRACE_MS):
+    """
+    Run the first `size` configurations of PORTFOLIO in parallel processes, at most one
+    per core, under the same time limit. Return (objective, vehicle_routes, configuration)
+    of the best solution, or None when none of them found one. Processes which haven't
+    reported `grace_ms` after the time limit are ignored.
+    The matrices and the impossible arcs are written once to the shared store instead of
+    pickled for every process.
+    """
+    configurations = PORTFOLIO[:max(1, min(size, len(PORTFOLIO), multiprocessing.cpu_count()))]
+    store = shared_store()
+    handles = [store.put(np.asarray(data['matrix']))]
+    shared_data = dict(data, matrix=handles[0])
+    if data.get('impossible_arcs') is not None:
+        handles.append(store.put(data['impossible_arcs']))
+        shared_data['impossible_arcs'] = handles[-1]
+    shared_evaluator = evaluator
+    if evaluator.distance_matrix is not None:
+        handles.append(store.put(np.asarray(evaluator.distance_matrix)))
+        handles.append(store.put(np.asarray(evaluator.time_matrix)))
+        shared_evaluator = Evaluator(distance_matrix=handles[-2], time_matrix=handles[-1])
+
+    jobs = [(shared_data, shared_evaluator, first_solution_strategy, local_search_metaheuristic, time_limit_ms)
+            for first_solution_strategy, local_search_metaheuristic in configurations]
+    deadline = time.time() + (time_limit_ms + grace_ms) / 1000.
+    pool = multiprocessing.Pool(processes=len(configurations))
+    try:
+        pending = [pool.apply_async(_solve_portfolio_member, (job,)) for job in jobs]
+        results = []
+        for job in pending:
+            try:
+                results.append(job.get(max(0., deadline - time.time())))
+            except multiprocessing.TimeoutError:
+                results.append(None)
+    finally:
+        pool.terminate()
+        for handle in handles:
+            store.release(handle)
+
+    best = None
+    for configuration, result in zip(configurations, results):
+        if result is not None and (best is None or result[0] < best[0]):
+            best = (result[0], result[1], configuration)
+    return best
+
+
+class VrpSolver(MethodView):
+    """
+    Solver for Vehicle Routing Problem
+    """
+
+    def post(self):
+        data = load_vrp_request()
+        response_format = data.get('format', 'rows')
+        if response_format not in RESPONSE_FORMATS:
+            raise ExceptionHandler(message="Unknown format: %s" % response_format, status_code=400)
+        portfolio = data.get('portfolio', 0)
+        stream_format = data.get('stream')
+
+        # With 'deadline_ms', the search stops in time to answer by the deadline.
+        deadline = Deadline(data.get('deadline_ms'))
+        evaluator = request_evaluator(data)
+
+        # With 'presolve', the arcs no vehicle can travel are computed once for all the
+        # searches. Off by default until benchmarks/vrp_presolve.py has measured its gain.
+        presolve = None
+        if data.get('presolve', False):
+            impossible, presolve = impossible_arcs(data, evaluator)
+            data = dict(data, impossible_arcs=impossible)
+
+        time_limit_ms = TIME_LIMIT_MS
+        grace_ms = PORTFOLIO_GRACE_MS
+        if deadline.ms is not None:
+            remaining_ms = deadline.remaining_ms()
+            time_limit_ms = max(MIN_SOLVE_MS, min(TIME_LIMIT_MS, int(remaining_ms * SEARCH_SHARE)))
+            grace_ms = max(0, remaining_ms - time_limit_ms)
+            if time_limit_ms < TIME_LIMIT_MS:
+                deadline.cut('search', 'best_found')
+
+        # Trajectory of the search, in the response with 'telemetry' and in the telemetry log.
+        telemetry = None
+        telemetry_path = current_app.config.get('SEARCH_TELEMETRY_PATH')
+        if data.get('telemetry') or telemetry_path:
+            telemetry = SearchTelemetry(time_limit_ms)
+        monitors = [telemetry] if telemetry is not None else []
+
+        if stream_format is not None:
+            if stream_format not in MIMETYPES:
+                raise ExceptionHandler(message="Unknown stream format: %s" % stream_format, status_code=400)
+
+            # The improving solutions of a single search are streamed, then the result.
+            def run(report, stopped):
+                monitor = ProgressMonitor(report, stopped, include_routes=data.get('stream_routes', False))
+                solution = solve_vrp(data, evaluator, time_limit_ms=time_limit_ms, monitors=[monitor] + monitors)
+                summary = self.telemetry(data, telemetry, telemetry_path)
+                if not solution:
+                    return {'event': 'error', 'message': 'No solution found.'}
+                json_object = self.result(data, solution, response_format)
+                json_object['event'] = 'result'
+                if presolve is not None:
+                    json_object['presolve'] = presolve
+                if deadline.ms is not None:
+                    json_object['deadline'] = deadline.report()
+                if data.get('telemetry'):
+                    json_object['telemetry'] = summary
+                return json_object
+            return progress_response(run, stream_format)
+
+        search = None
+        if portfolio > 0:
+            solution = solve_portfolio(data, evaluator, portfolio, time_limit_ms, grace_ms)
+            if solution:
+                objective, vehicle_routes, configuration = solution
+                solution = (objective, vehicle_routes)
+                search = {
+                    'portfolio': min(portfolio, len(PORTFOLIO), multiprocessing.cpu_count()),
+                    'first_solution_strategy': configuration[0],
+                    'local_search_metaheuristic': configuration[1]
+                }
+        else:
+            solution = solve_vrp(data, evaluator, time_limit_ms=time_limit_ms, monitors=monitors)
+        # The portfolio searches run in other processes, only a single search is recorded.
+        summary = self.telemetry(data, telemetry if portfolio <= 0 else None, telemetry_path)
+
+        if solution:
+            json_object = self.result(data, solution, response_format)
+            if search is not None:
+                json_object['search'] = search
+            if presolve is not None:
+                json_object['presolve'] = presolve
+            if deadline.ms is not None:
+                json_object['deadline'] = deadline.report()
+            if data.get('telemetry') and summary is not None:
+                json_object['telemetry'] = summary
             # save result
             return jsonify(json_object)
         else:
-            return 'No solution found.'
-        # endregion
+            # A search that found nothing in its time limit isn't the answer to cache.
+            response = current_app.make_response('No solution found.')
+            response.cache_control.no_store = True
+            return response
+
+    @staticmethod
+    def telemetry(data, telemetry, path):
+        """
+        Summary of a recorded search, appended to the telemetry log when there is one.
+        """
+        if telemetry is None:
+            return None
+        summary = telemetry.summary()
+        if path:
+            log_telemetry(path, dict(summary, timestamp=time.time(), locations=len(data['lats']),
+                                     vehicles=len(data['vehicle_capacities'])))
+        return summary
+
+    @staticmethod
+    def result(data, solution, response_format):
+        """
+        Response object of a solution in the requested layout.
+        """
+        objective, vehicle_routes = solution
+        result_args = (objective, vehicle_routes, data['lats'], data['lons'],
+                       data['departure_times'], data['return_times'], data['vehicle_capacities'])
+        # parse results to json
+        if response_format == 'columnar':
+            return columnar_result(*result_args)
+        return rows_result(*result_args)
+
+
+def finite_or_none(matrix):
+    """
+    Matrix as lists, with None for the unreachable pairs.
+    """
+    unreachable = np.isinf(matrix)
+    matrix = matrix.astype(object)
+    matrix[unreachable] = None
+    return matrix.tolist()
 
 
 class DistanceMatrix(MethodView):
     """
-    Distance matrix from list of locations.
+    Distance matrix from list of locations. With 'distance_backend': 'road', as for /vrp,
+    the distance and time matrices on the road graph selected by 'graph'.
     """
 
     @staticmethod
@@ -266,6 +586,14 @@ class DistanceMatrix(MethodView):
         data = request.get_json()
         locations = data['locations']
 
+        if data.get('distance_backend', 'haversine') == 'road':
+            distances, times = road_graph(data).matrices([loc['lat'] for loc in locations],
+                                                         [loc['lng'] for loc in locations])
+            return jsonify({
+                'matrix': finite_or_none(distances),
+                'times': finite_or_none(times)
+            })
+
         response = { 'matrix': [] }
         for first_loc in locations:
             row = []
@@ -0,0 +1,293 @@
+from flask.views import MethodView
+
+import sys
+import time
+import numpy as np
+
+from vrp import DISTANCE_INF, RESPONSE_FORMATS, Evaluator, VrpSolver, request_evaluator
+from vrp_stream import load_vrp_request
+
+sys.path.append('..')
+from errors import ExceptionHandler
+from encoders import jsonify
+
+_EPSILON = 1e-9
+# Capacity of the distance dimension of the routing model.
+MAX_DISTANCE = 1000
+
+
+class RouteState(object):
+    """
+    A vehicle's route with the values its insertions are checked against:
+        - opens: start of the time window of every stop (seconds)
+        - earliest, latest: feasible service times at every stop
+        - loads: load on arrival at every stop, max_loads: largest load from a stop on
+        - arcs: cost of every leg, cost: legs plus the fixed cost when the vehicle is used
+    """
+    def __init__(self, vehicle, nodes, opens, earliest, latest, loads, arcs, cost, feasible):
+        self.vehicle = vehicle
+        self.nodes = nodes
+        self.opens = opens
+        self.earliest = earliest
+        self.latest = latest
+        self.loads = loads
+        self.max_loads = np.maximum.accumulate(loads[::-1])[::-1]
+        self.arcs = arcs
+        self.distance = float(arcs.sum())
+        self.cost = cost
+        self.feasible = feasible
+
+
+class InsertionPlanner(object):
+    """
+    Cheapest feasible insertion of new orders into an existing /vrp plan, with the
+    constraints of solve_vrp: allowed arcs of 'matrix', time windows, vehicle departure
+    and return times, vehicle capacities, min_weights and the distance capacity.
+    Arcs into the end depots aren't restricted by 'matrix', like in the routing model.
+
+    Methods:
+        - insert: insert the orders, cheapest insertion first
+        - local_search: relocate the stops of the given routes while it lowers the cost
+    """
+    def __init__(self, data, evaluator, routes):
+        self.lats = np.asarray(data['lats'], dtype=np.float64)
+        self.lons = np.asarray(data['lons'], dtype=np.float64)
+        self.allowed = np.asarray(data['matrix']) != 0
+        self.demands = np.asarray(data['demands'], dtype=np.float64)
+        self.services = np.asarray(data['loadings'], dtype=np.float64) + np.asarray(data['unloadings'], dtype=np.float64)
+        self.horizon = data['horizon']
+        self.start_times = np.floor(3600 * np.asarray(data['start_times'], dtype=np.float64))
+        self.end_times = np.minimum(np.floor(3600 * np.asarray(data['end_times'], dtype=np.float64)), self.horizon)
+        self.departure_times = np.floor(3600 * np.asarray(data['departure_times'], dtype=np.float64))
+        self.return_times = np.minimum(np.floor(3600 * np.asarray(data['return_times'], dtype=np.float64)),
+                                       self.horizon)
+        self.velocities = np.asarray(data['velocities'], dtype=np.float64)
+        self.capacities = np.asarray(data['vehicle_capacities'], dtype=np.float64)
+        self.min_weights = np.asarray(data['min_weights'], dtype=np.float64)
+        self.vehicle_costs = np.asarray(data['vehicle_costs'], dtype=np.float64)
+        # End loads in [low, min_weight] are forbidden, empty vehicles are allowed unless dropping.
+        vehicles = np.arange(len(self.capacities))
+        self.min_loads = np.where((vehicles < data['first_vendor_index']) & (data['allow_drop'] > 0), 0, 1)
+
+        self.distance_matrix = self.time_matrix = None
+        if evaluator.distance_matrix is not None:
+            self.distance_matrix = np.asarray(evaluator.distance_matrix, dtype=np.float64)
+            self.time_matrix = np.asarray(evaluator.time_matrix, dtype=np.float64)
+
+        self.routes = [self.state(vehicle, nodes) for vehicle, nodes in enumerate(routes)]
+
+    def distances(self, a, b):
+        if self.distance_matrix is not None:
+            return self.distance_matrix[a, b]
+        return Evaluator.distance((self.lats[a], self.lons[a]), (self.lats[b], self.lons[b]))
+
+    def transits(self, a, b, distances, vehicle):
+        """
+        Service plus travel time of the legs a -> b, 0 between identical locations.
+        """
+        if self.time_matrix is not None:
+            travel = self.time_matrix[a, b]
+        else:
+            travel = distances / self.velocities[vehicle] * 3600
+        return np.where(travel == 0, 0, self.services[a] + travel)
+
+    def end_load_allowed(self, loads, vehicle):
+        return (loads < self.min_loads[vehicle]) | (loads > self.min_weights[vehicle])
+
+    def state(self, vehicle, nodes):
+        nodes = np.asarray(nodes, dtype=np.int64)
+        tails, heads = nodes[:-1], nodes[1:]
+        distances = self.distances(tails, heads)
+        arcs = np.where(self.allowed[tails, heads], distances, DISTANCE_INF)
+        transits = self.transits(tails, heads, distances, vehicle)
+
+        opens = self.start_times[nodes]
+        closes = self.end_times[nodes]
+        opens[0] = closes[0] = opens[-1] = self.departure_times[vehicle]
+        closes[-1] = self.return_times[vehicle]
+        earliest = opens.copy()
+        for k in range(1, len(nodes)):
+            earliest[k] = max(opens[k], earliest[k - 1] + transits[k - 1])
+        latest = closes.copy()
+        for k in range(len(nodes) - 2, -1, -1):
+            latest[k] = min(closes[k], latest[k + 1] - transits[k])
+
+        loads = np.concatenate([[0.], np.cumsum(self.demands[tails])])
+        feasible = bool((earliest <= latest).all()
+                        and self.allowed[tails[:-1], heads[:-1]].all()
+                        and loads.max() <= self.capacities[vehicle]
+                        and self.end_load_allowed(loads[-1], vehicle)
+                        and arcs.sum() <= MAX_DISTANCE)
+        cost = arcs.sum() + (self.vehicle_costs[vehicle] if len(nodes) > 2 else 0.)
+        return RouteState(vehicle, nodes, opens, earliest, latest, loads, arcs, cost, feasible)
+
+    def candidates(self, route, orders):
+        """
+        Cheapest feasible insertion of every order into a route.
+        Return the extra cost (inf when it doesn't fit) and the position of each order.
+        """
+        vehicle = route.vehicle
+        orders = np.asarray(orders, dtype=np.int64)[:, None]
+        tails, heads = route.nodes[None, :-1], route.nodes[None, 1:]
+        to_orders = self.distances(tails, orders)
+        from_orders = self.distances(orders, heads)
+
+        # Legs out of an order into the end depot aren't restricted.
+        into_end = np.arange(heads.shape[1])[None, :] == heads.shape[1] - 1
+        allowed = self.allowed[tails, orders] & (self.allowed[orders, heads] | into_end)
+        costs = (np.where(self.allowed[tails, orders], to_orders, DISTANCE_INF)
+                 + np.where(self.allowed[orders, heads], from_orders, DISTANCE_INF) - route.arcs[None, :])
+        if len(route.nodes) == 2:
+            costs = costs + self.vehicle_costs[vehicle]
+
+        arrivals = np.maximum(self.start_times[orders], route.earliest[None, :-1]
+                              + self.transits(tails, orders, to_orders, vehicle))
+        next_arrivals = np.maximum(route.opens[None, 1:],
+                                   arrivals + self.transits(orders, heads, from_orders, vehicle))
+        demands = self.demands[orders]
+        fits = (allowed
+                & (arrivals <= self.end_times[orders])
+                & (next_arrivals <= route.latest[None, 1:])
+                & (route.max_loads[None, 1:] + demands <= self.capacities[vehicle])
+                & self.end_load_allowed(route.loads[-1] + demands, vehicle)
+                & (route.distance + costs <= MAX_DISTANCE))
+        costs = np.where(fits, costs, np.inf)
+        positions = np.argmin(costs, axis=1)
+        return costs[np.arange(len(orders)), positions], positions + 1
+
+    def apply(self, route, order, position):
+        nodes = np.insert(route.nodes, position, order)
+        self.routes[route.vehicle] = self.state(route.vehicle, nodes)
+
+    def insert(self, orders):
+        """
+        Repeatedly insert the order with the cheapest feasible insertion. After an insertion
+        only the candidates of the changed route are computed again.
+        Return the vehicles which got an order and the orders which fit nowhere.
+        """
+        orders = list(orders)
+        costs = np.full((len(orders), len(self.routes)), np.inf)
+        positions = np.zeros((len(orders), len(self.routes)), dtype=np.int64)
+        for route in self.routes:
+            costs[:, route.vehicle], positions[:, route.vehicle] = self.candidates(route, orders)
+
+        pending = np.ones(len(orders), dtype=bool)
+        changed = []
+        while pending.any():
+            masked = np.where(pending[:, None], costs, np.inf)
+            i, vehicle = [int(index) for index in np.unravel_index(np.argmin(masked), masked.shape)]
+            if not np.isfinite(masked[i, vehicle]):
+                break
+            self.apply(self.routes[vehicle], orders[i], positions[i, vehicle])
+            pending[i] = False
+            if vehicle not in changed:
+                changed.append(vehicle)
+            costs[:, vehicle], positions[:, vehicle] = self.candidates(self.routes[vehicle], orders)
+
+        return changed, [order for order, left in zip(orders, pending) if left]
+
+    def local_search(self, vehicles, deadline):
+        """
+        Move single stops between the given routes, or within one, while it lowers the cost.
+        Return the number of moves.
+        """
+        moves = 0
+        improved = True
+        while improved and time.time() < deadline:
+            improved = False
+            for vehicle in vehicles:
+                route = self.routes[vehicle]
+                for position in range(1, len(route.nodes) - 1):
+                    if time.time() >= deadline:
+                        return moves
+                    node = route.nodes[position]
+                    reduced = self.state(vehicle, np.delete(route.nodes, position))
+                    if not reduced.feasible:
+                        continue
+                    gain = route.cost - reduced.cost
+                    best = (gain - _EPSILON, None, None)
+                    for other in vehicles:
+                        target = reduced if other == vehicle else self.routes[other]
+                        costs, positions = self.candidates(target, [node])
+                        if costs[0] < best[0]:
+                            best = (costs[0], target, positions[0])
+                    if best[1] is not None:
+                        self.routes[vehicle] = reduced
+                        self.apply(best[1], node, best[2])
+                        moves += 1
+                        improved = True
+                        break
+        return moves
+
+    def vehicle_routes(self):
+        """
+        Routes in the layout of solve_vrp.
+        """
+        vehicle_routes = []
+        for route in self.routes:
+            vehicle_routes.append({
+                'nodes': route.nodes.tolist(),
+                'loads': (route.loads / 1000.).tolist(),
+                'distances': np.concatenate([[0.], np.cumsum(route.arcs)]).tolist(),
+                'time_open': route.earliest.tolist(),
+                'time_leave': route.latest.tolist()
+            })
+        return vehicle_routes
+
+    def total(self):
+        return float(sum(route.cost for route in self.routes))
+
+
+def plan_routes(data, plan):
+    """
+    Nodes of every vehicle from a /vrp response, in the rows or the columnar layout.
+    Vehicles missing from the plan start empty.
+    """
+    routes = [[start, end] for start, end in zip(data['departure_depots'], data['return_depots'])]
+    for vehicle in plan['result']:
+        if 'nodes' in vehicle:
+            nodes = vehicle['nodes']
+        else:
+            nodes = [stop['location_no'] for stop in vehicle['routes']]
+        routes[vehicle['vehicle_no']] = list(nodes)
+    return routes
+
+
+class VrpInsertionSolver(MethodView):
+    """
+    Insert new orders into an existing /vrp plan without solving the whole fleet again.
+    The body is the /vrp body of all the locations, with:
+        - plan: the /vrp response being updated
+        - orders: the nodes to insert, which aren't in the plan yet
+        - local_search_ms: time given to relocate the stops of the changed routes, 0 by default
+    """
+
+    def post(self):
+        data = load_vrp_request()
+        started = time.time()
+        plan = data['plan']
+        orders = [int(order) for order in data['orders']]
+        response_format = plan.get('format', 'rows')
+        if response_format not in RESPONSE_FORMATS:
+            raise ExceptionHandler(message='Unknown format: %s' % response_format, status_code=400)
+
+        routes = plan_routes(data, plan)
+        planned = set(node for nodes in routes for node in nodes[1:-1])
+        for order in orders:
+            if order in planned or not 0 <= order < len(data['lats']):
+                raise ExceptionHandler(message='Invalid order: %d' % order, status_code=400)
+
+        planner = InsertionPlanner(data, request_evaluator(data), routes)
+        vehicles, unassigned = planner.insert(orders)
+        moves = 0
+        if data.get('local_search_ms', 0) > 0 and vehicles:
+            moves = planner.local_search(vehicles, time.time() + data['local_search_ms'] / 1000.)
+
+        json_object = VrpSolver.result(data, (planner.total(), planner.vehicle_routes()), response_format)
+        routes = dict((node, route.vehicle) for route in planner.routes for node in route.nodes[1:-1].tolist())
+        json_object['inserted'] = [{'order': order, 'vehicle_no': routes[order]}
+                                   for order in orders if order in routes]
+        json_object['unassigned'] = unassigned
+        json_object['local_search_moves'] = moves
+        json_object['elapsed_ms'] = int(1000 * (time.time() - started))
+        return jsonify(json_object)
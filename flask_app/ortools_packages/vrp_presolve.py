@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def impossible_arcs(data, evaluator):
+    """
+    Arcs i -> j between customer nodes which no vehicle can travel in the routing model
+    of solve_vrp:
+        - time windows: the earliest departure from i, its window start plus its service,
+          plus the travel time of the fastest vehicle is after the end of j's window
+        - capacity: with nonnegative demands, demands[i] + demands[j] is over the largest
+          vehicle capacity
+    Times are truncated to whole seconds like the dimension cumuls and transits. The depots
+    and the arcs 'matrix' already forbids are left out.
+    Return (boolean matrix of the arcs, counts for the response).
+    """
+    lats = np.asarray(data['lats'], dtype=np.float64)
+    lons = np.asarray(data['lons'], dtype=np.float64)
+    num_locations = len(lats)
+    if evaluator.time_matrix is not None:
+        travel = np.asarray(evaluator.time_matrix, dtype=np.float64)
+    else:
+        distances = evaluator.distance((lats[:, None], lons[:, None]), (lats[None, :], lons[None, :]))
+        travel = distances / max(data['velocities']) * 3600
+    services = np.asarray(data['loadings'], dtype=np.float64) + np.asarray(data['unloadings'], dtype=np.float64)
+    transits = np.where(travel == 0, 0, services[:, None] + travel)
+
+    opens = np.floor(3600 * np.asarray(data['start_times'], dtype=np.float64))
+    closes = np.minimum(np.floor(3600 * np.asarray(data['end_times'], dtype=np.float64)), data['horizon'])
+    late = opens[:, None] + np.floor(transits) > closes[None, :]
+
+    demands = np.asarray(data['demands'], dtype=np.float64)
+    heavy = np.zeros_like(late)
+    if (demands >= 0).all():
+        heavy = demands[:, None] + demands[None, :] > max(data['vehicle_capacities'])
+
+    customers = np.ones(num_locations, dtype=bool)
+    customers[list(data['departure_depots']) + list(data['return_depots'])] = False
+    considered = customers[:, None] & customers[None, :] & (np.asarray(data['matrix']) != 0)
+    np.fill_diagonal(considered, False)
+    late &= considered
+    heavy &= considered
+    impossible = late | heavy
+    return impossible, {
+        'arcs': int(considered.sum()),
+        'pruned': int(impossible.sum()),
+        'time_windows': int(late.sum()),
+        'capacity': int((heavy & ~late).sum())
+    }
@@ -0,0 +1,166 @@
+from decimal import Decimal
+from flask import g, request
+
+import sys
+import numpy as np
+
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:
+    ijson = None
+
+sys.path.append('..')
+from errors import ExceptionHandler
+
+# Bodies from this size (bytes) are parsed incrementally when ijson is installed.
+STREAMING_THRESHOLD = 1024 * 1024
+
+# Large /vrp fields read straight into typed arrays. The matrix is only tested
+# against zero, float32 keeps that exact for any value. Demands may be fractional,
+# float64 keeps them as the json parser of small bodies does.
+ARRAY_FIELDS = {
+    'matrix': np.float32,
+    'lats': np.float64,
+    'lons': np.float64,
+    'demands': np.float64,
+    'start_times': np.float64,
+    'end_times': np.float64
+}
+
+
+def _number(value):
+    """
+    Plain int or float of a number event, some ijson backends give Decimal.
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    return value
+
+
+def _read_value(events, event, value):
+    """
+    Build the value starting with (event, value) the usual way.
+    """
+    if event not in ('start_map', 'start_array'):
+        return _number(value)
+    builder = ObjectBuilder()
+    builder.event(event, value)
+    depth = 1
+    for _, event, value in events:
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+        builder.event(event, _number(value) if event == 'number' else value)
+        if depth == 0:
+            return builder.value
+
+
+def _read_array(events, dtype):
+    """
+    Numbers of a flat array, in an array grown by doubling then trimmed.
+    """
+    values = np.empty(1024, dtype=dtype)
+    size = 0
+    for _, event, value in events:
+        if event == 'end_array':
+            return values[:size].copy()
+        if event != 'number':
+            raise ValueError('Expected a number, got %s' % event)
+        if size == len(values):
+            values = np.concatenate([values, np.empty_like(values)])
+        values[size] = value
+        size += 1
+
+
+def _read_matrix(events, dtype):
+    """
+    Square matrix of numbers, allocated once the length of the first row is known.
+    """
+    matrix = None
+    row = 0
+    for _, event, value in events:
+        if event == 'end_array':
+            if matrix is None:
+                return np.zeros((0, 0), dtype=dtype)
+            if row != len(matrix):
+                raise ValueError('Matrix must be square')
+            return matrix
+        if event != 'start_array':
+            raise ValueError('Expected a matrix row, got %s' % event)
+
+        if matrix is None:
+            first_row = _read_array(events, dtype)
+            if len(first_row) == 0:
+                raise ValueError('Matrix rows must not be empty')
+            matrix = np.empty((len(first_row), len(first_row)), dtype=dtype)
+            matrix[0] = first_row
+        else:
+            if row == len(matrix):
+                raise ValueError('Matrix must be square')
+            col = 0
+            for _, event, value in events:
+                if event == 'end_array':
+                    break
+                if event != 'number' or col == len(matrix):
+                    raise ValueError('Matrix rows must be numbers of the same length')
+                matrix[row, col] = value
+                col += 1
+            if col != len(matrix):
+                raise ValueError('Matrix rows must be numbers of the same length')
+        row += 1
+
+
+class _BodyReader(object):
+    """
+    Request body for ijson, which probes its input with read(0): werkzeug's LimitedStream
+    takes an empty read for a client disconnect.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+
+    def read(self, size=-1):
+        if size == 0:
+            return b''
+        return self.stream.read(size)
+
+
+def parse_vrp(stream):
+    """
+    Parse a /vrp body incrementally. ARRAY_FIELDS become NumPy arrays filled as they
+    are read, so their numbers never exist as Python objects; the other fields are
+    parsed as usual.
+    """
+    data = {}
+    events = ijson.parse(stream)
+    for prefix, event, value in events:
+        if prefix != '' or event != 'map_key':
+            continue
+        key = value
+        _, event, value = next(events)
+        if key == 'matrix' and event == 'start_array':
+            data[key] = _read_matrix(events, ARRAY_FIELDS[key])
+        elif key in ARRAY_FIELDS and event == 'start_array':
+            data[key] = _read_array(events, ARRAY_FIELDS[key])
+        else:
+            data[key] = _read_value(events, event, value)
+    return data
+
+
+def load_vrp_request():
+    """
+    Body of the current /vrp request, parsed once and kept on flask.g so the admission
+    control, the cache and the view share it. Large bodies go through parse_vrp.
+    """
+    data = getattr(g, 'vrp_data', None)
+    if data is None:
+        if ijson is None or (request.content_length or 0) < STREAMING_THRESHOLD:
+            data = request.get_json()
+        else:
+            try:
+                data = parse_vrp(_BodyReader(request.stream))
+            except (ValueError, ijson.JSONError) as e:
+                raise ExceptionHandler(message = 'Invalid request body: %s' % e, status_code = 400)
+        g.vrp_data = data
+    return data
@@ -0,0 +1,63 @@
+from flask import g, request
+
+import json
+import random
+import threading
+import time
+
+from ortools_packages.vrp_stream import STREAMING_THRESHOLD
+
+
+class TrafficRecorder(object):
+    """
+    Opt-in recorder of a sample of the requests, one json line per request with the
+    endpoint, the body, the status code and the seconds spent in the app (until the
+    headers for streamed responses), for the replay tool (benchmarks/replay.py).
+    Bodies above `max_body_bytes`, or from the STREAMING_THRESHOLD of the /vrp parser
+    on, are recorded without their content: reading them up front would leave nothing
+    for the streaming parser to read.
+    """
+    def __init__(self, path, sample_rate = 0.01, endpoints = None, max_body_bytes = 1024 * 1024):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.endpoints = endpoints
+        self.max_body_bytes = max_body_bytes
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        app.before_request(self.start)
+        app.after_request(self.finish)
+
+    def start(self):
+        if request.method != 'POST' or random.random() >= self.sample_rate:
+            return
+        if self.endpoints is not None and request.path not in self.endpoints:
+            return
+        body = None
+        content_length = request.content_length or 0
+        if content_length <= self.max_body_bytes and content_length < STREAMING_THRESHOLD:
+            body = request.get_data(cache = True, as_text = True)
+        g.recording = {
+            'started': time.time(),
+            'body': body
+        }
+
+    def finish(self, response):
+        recording = getattr(g, 'recording', None)
+        if recording is None:
+            return response
+        record = {
+            'timestamp': recording['started'],
+            'endpoint': request.path,
+            'query': request.query_string.decode('utf-8'),
+            'content_length': request.content_length,
+            'body': recording['body'],
+            'status': response.status_code,
+            'seconds': time.time() - recording['started']
+        }
+        # Serialized before taking the lock, which only orders the appends.
+        line = json.dumps(record) + '\n'
+        with self.lock:
+            with open(self.path, 'a') as records:
+                records.write(line)
+        return response
@@ -0,0 +1,87 @@
+"""
+Standalone worker pulling solver jobs from the job queue of config.py.
+Run several of them, on one host or on hosts sharing the queue:
+
+    python worker.py --lease-seconds 60
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import traceback
+import uuid
+
+from app import app, job_queue
+from jobs import run_job
+
+
+class Worker(object):
+    """
+    Leases jobs one at a time and solves them, a heartbeat thread extends the lease
+    while the solve runs. A job whose lease was lost, e.g. after a long pause of the
+    worker, is left to the worker which got it next.
+    """
+    def __init__(self, queue, worker_id = None, lease_seconds = 60., poll_interval = 1.):
+        self.queue = queue
+        self.worker_id = worker_id or '%s-%d-%s' % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.stopped = threading.Event()
+
+    def stop(self, *args):
+        """
+        Stop after the job being solved.
+        """
+        self.stopped.set()
+
+    def heartbeat(self, job_id, done):
+        while not done.wait(self.lease_seconds / 3.):
+            if not self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                return
+
+    def solve(self, job):
+        done = threading.Event()
+        heartbeat = threading.Thread(target = self.heartbeat, args = (job['id'], done))
+        heartbeat.daemon = True
+        heartbeat.start()
+        try:
+            status_code, body = run_job(app, job)
+        except Exception:
+            self.queue.fail(job['id'], self.worker_id, traceback.format_exc())
+        else:
+            self.queue.complete(job['id'], self.worker_id, status_code, body)
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def run(self, max_jobs = None):
+        """
+        Solve jobs until stopped, or until max_jobs are solved. Return the number solved.
+        """
+        solved = 0
+        while not self.stopped.is_set() and (max_jobs is None or solved < max_jobs):
+            job = self.queue.lease(self.worker_id, self.lease_seconds)
+            if job is None:
+                self.stopped.wait(self.poll_interval)
+                continue
+            self.solve(job)
+            solved += 1
+        return solved
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Solve the jobs of the job queue.')
+    parser.add_argument('--lease-seconds', type = float, default = app.config.get('JOB_LEASE_SECONDS', 60.))
+    parser.add_argument('--poll-interval', type = float, default = 1.)
+    parser.add_argument('--max-jobs', type = int, default = None)
+    args = parser.parse_args()
+
+    worker = Worker(job_queue, lease_seconds = args.lease_seconds, poll_interval = args.poll_interval)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run(args.max_jobs)
+
+
+if __name__ == '__main__':
+    main()
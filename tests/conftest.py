@@ -0,0 +1,10 @@
+"""
+The app imports its modules by their bare names, from flask_app and flask_app/ortools_packages.
+"""
+import os
+import sys
+
+FLASK_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_app')
+for path in (FLASK_APP, os.path.join(FLASK_APP, 'ortools_packages')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
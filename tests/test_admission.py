@@ -0,0 +1,83 @@
+"""
+AdmissionController cost models: calibration bounds and the solves they are fitted on.
+"""
+import unittest
+
+from flask import Flask, jsonify
+
+from admission import MAX_EXPONENT, MIN_CALIBRATION_SAMPLES, MIN_EXPONENT, AdmissionController, CostModel
+from errors import ExceptionHandler
+
+
+class CostModelTest(unittest.TestCase):
+
+    def test_fit(self):
+        model = CostModel()
+        samples = [(size, 2e-6 * size ** 1.5) for size in range(100, 100 * (MIN_CALIBRATION_SAMPLES + 1), 100)]
+        self.assertTrue(model.calibrate(samples))
+        self.assertAlmostEqual(model.exponent, 1.5)
+        self.assertAlmostEqual(model.estimate(10000), 2., places = 6)
+
+    def test_too_few_samples(self):
+        model = CostModel(1e-4, 1.)
+        samples = [(size, 1e-3 * size) for size in range(1, MIN_CALIBRATION_SAMPLES)]
+        self.assertFalse(model.calibrate(samples))
+        self.assertEqual((model.coefficient, model.exponent), (1e-4, 1.))
+
+    def test_exponent_bounds(self):
+        # Nearly equal sizes with noisy timings give a steep slope either way.
+        steep = [(1000 + i, 0.01 * 10 ** i) for i in range(MIN_CALIBRATION_SAMPLES)]
+        model = CostModel()
+        self.assertTrue(model.calibrate(steep))
+        self.assertEqual(model.exponent, MAX_EXPONENT)
+
+        model = CostModel()
+        self.assertTrue(model.calibrate([(size, 1. / size) for size, _ in steep]))
+        self.assertEqual(model.exponent, MIN_EXPONENT)
+
+
+class AdmissionTimingsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.admission = AdmissionController(calibrate_every = 1000)
+        self.policy = self.admission.register('distances', max_concurrency = 10)
+
+        @self.app.errorhandler(ExceptionHandler)
+        def handle_error(error):
+            response = jsonify({'message': error.message})
+            response.status_code = error.status_code
+            return response
+
+        def distances():
+            outcome = self.outcome
+            if outcome == 'error':
+                raise ExceptionHandler(message = 'Invalid locations', status_code = 400)
+            if outcome == 'failure':
+                response = self.app.make_response('No solution found.')
+                response.cache_control.no_store = True
+                return response
+            if outcome == 'string':
+                return 'ok'
+            return jsonify({'matrix': []})
+        self.app.add_url_rule('/distances', 'distances', self.admission.guard('distances', distances),
+                              methods = ['POST'])
+
+    def post(self, outcome):
+        self.outcome = outcome
+        with self.app.test_client() as client:
+            return client.post('/distances', json = {'locations': [[10.5, 106.5]] * 3})
+
+    def test_only_successful_solves_are_timed(self):
+        self.assertEqual(self.post('error').status_code, 400)
+        self.assertEqual(self.post('failure').status_code, 200)
+        self.assertEqual(len(self.policy.samples), 0)
+
+        self.assertEqual(self.post('json').status_code, 200)
+        self.assertEqual(self.post('string').get_data(), b'ok')
+        self.assertEqual([size for size, _ in self.policy.samples], [9, 9])
+        self.assertEqual(self.policy.in_flight, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
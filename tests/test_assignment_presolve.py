@@ -0,0 +1,87 @@
+"""
+AssignmentPresolve components, with scipy and with the union-find fallback.
+"""
+import unittest
+from collections import deque
+
+import numpy as np
+
+import assignment_presolve
+from assignment_presolve import IMPOSSIBLE_COST, AssignmentPresolve
+
+
+def reference_components(allowed):
+    """
+    Sets of (orders, trips) of the components, by breadth first search.
+    """
+    num_orders, num_trips = allowed.shape
+    seen = set()
+    components = set()
+    for start in range(num_orders):
+        if start in seen or not allowed[start].any():
+            continue
+        seen.add(start)
+        orders, trips, queue = set(), set(), deque([('order', start)])
+        while queue:
+            kind, node = queue.popleft()
+            if kind == 'order':
+                orders.add(node)
+                for trip in np.nonzero(allowed[node])[0].tolist():
+                    if trip not in trips:
+                        trips.add(trip)
+                        queue.append(('trip', trip))
+            else:
+                for order in np.nonzero(allowed[:, node])[0].tolist():
+                    if order not in seen:
+                        seen.add(order)
+                        queue.append(('order', order))
+        components.add((tuple(sorted(orders)), tuple(sorted(trips))))
+    return components
+
+
+def without_scipy(function, *args):
+    """
+    Call function with the fallback of assignment_presolve, as if scipy were missing.
+    """
+    connected_components = assignment_presolve.connected_components
+    assignment_presolve.connected_components = None
+    try:
+        return function(*args)
+    finally:
+        assignment_presolve.connected_components = connected_components
+
+
+def presolve_components(presolve):
+    return set((tuple(orders.tolist()), tuple(trips.tolist())) for orders, trips in presolve.components())
+
+
+class AssignmentPresolveTest(unittest.TestCase):
+
+    def instances(self):
+        rng = np.random.RandomState(0)
+        for _ in range(30):
+            num_orders, num_trips = rng.randint(1, 40), rng.randint(1, 15)
+            costs = rng.uniform(1, 100, (num_orders, num_trips))
+            costs[rng.uniform(size=costs.shape) < rng.uniform(0.5, 0.97)] = IMPOSSIBLE_COST
+            yield (costs, rng.uniform(1, 5, num_orders), rng.uniform(1, 5, num_orders),
+                   rng.uniform(3, 20, num_trips), rng.uniform(3, 20, num_trips))
+
+    def test_components(self):
+        for instance in self.instances():
+            presolve = AssignmentPresolve(*instance)
+            expected = reference_components(presolve.allowed)
+            self.assertEqual(presolve_components(presolve), expected)
+            self.assertEqual(presolve.stats['components'], len(expected))
+            self.assertEqual(presolve_components(without_scipy(AssignmentPresolve, *instance)), expected)
+
+    def test_orders_and_trips_without_pairs(self):
+        costs = np.full((3, 3), IMPOSSIBLE_COST, dtype=np.float64)
+        costs[0, 0] = costs[0, 1] = costs[1, 1] = 1
+        presolve = AssignmentPresolve(costs, [1] * 3, [1] * 3, [10] * 3, [10] * 3)
+        self.assertEqual(presolve.order_labels[2], -1)
+        self.assertEqual(presolve.trip_labels[2], -1)
+        self.assertEqual(presolve.unassigned.tolist(), [False, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+ResultCache: solved responses are served again, failures and no-store responses aren't.
+"""
+import unittest
+
+from flask import Flask, jsonify
+
+from cache import ResultCache
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.solves = 0
+
+        def vrp():
+            self.solves += 1
+            if not self.solvable:
+                response = self.app.make_response('No solution found.')
+                response.cache_control.no_store = True
+                return response
+            return jsonify({'total_distance': 1})
+        view = ResultCache().cached('vrp', vrp)
+        self.app.add_url_rule('/vrp', 'vrp', view, methods = ['POST'])
+
+    def post(self, solvable):
+        self.solvable = solvable
+        with self.app.test_client() as client:
+            return client.post('/vrp', json = {'lats': [10.5, 10.6]})
+
+    def test_solution_is_cached(self):
+        self.assertEqual(self.post(True).headers.get('X-Cache'), 'MISS')
+        self.assertEqual(self.post(True).headers.get('X-Cache'), 'HIT')
+        self.assertEqual(self.solves, 1)
+
+    def test_no_solution_is_not_cached(self):
+        for _ in range(2):
+            response = self.post(False)
+            self.assertEqual(response.get_data(), b'No solution found.')
+            self.assertIsNone(response.headers.get('X-Cache'))
+        self.assertEqual(self.solves, 2)
+        # The next solve of the same body is still cached once it succeeds.
+        self.assertEqual(self.post(True).headers.get('X-Cache'), 'MISS')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+"""
+Deadline shares and phases.
+"""
+import unittest
+
+from deadline import MIN_SOLVE_MS, Deadline
+
+
+class DeadlineTest(unittest.TestCase):
+
+    def test_split_is_whole_ms(self):
+        phase = Deadline(1000).split(1. / 3)
+        self.assertIsInstance(phase.ms, int)
+        self.assertTrue(300 <= phase.ms <= 333)
+        self.assertIsInstance(phase.report()['deadline_ms'], int)
+
+    def test_split_shares_the_cuts(self):
+        deadline = Deadline(1000)
+        deadline.split(0.5).cut('costs', 'estimate')
+        self.assertEqual(deadline.report()['cut_short'], [{'part': 'costs', 'fallback': 'estimate'}])
+
+    def test_no_deadline(self):
+        phase = Deadline().split(0.5)
+        self.assertIsNone(phase.ms)
+        self.assertIsNone(phase.share_ms(3))
+
+    def test_short_share_is_skipped(self):
+        self.assertEqual(Deadline(MIN_SOLVE_MS * 2).share_ms(4), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+TrafficRecorder on a /vrp route: sampled bodies must still reach the streaming parser.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask, jsonify
+
+from recorder import TrafficRecorder
+from ortools_packages import vrp_stream
+from ortools_packages.vrp_stream import STREAMING_THRESHOLD, load_vrp_request
+
+
+def vrp_body(size):
+    """
+    /vrp body of `size` bytes or slightly more.
+    """
+    lats = []
+    body = json.dumps({'lats': lats})
+    while len(body) < size:
+        lats.extend([10.5] * max(1, (size - len(body)) // 6))
+        body = json.dumps({'lats': lats})
+    return body
+
+
+class TrafficRecorderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'traffic.jsonl')
+        self.app = Flask(__name__)
+        TrafficRecorder(self.path, sample_rate = 1., max_body_bytes = 4 * STREAMING_THRESHOLD).init_app(self.app)
+
+        def vrp():
+            return jsonify({'locations': len(load_vrp_request()['lats'])})
+        self.app.add_url_rule('/vrp', 'vrp', vrp, methods = ['POST'])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def records(self):
+        with open(self.path) as records:
+            return [json.loads(line) for line in records]
+
+    def post(self, body):
+        with self.app.test_client() as client:
+            return client.post('/vrp', data = body, content_type = 'application/json')
+
+    def test_small_body_recorded(self):
+        body = vrp_body(STREAMING_THRESHOLD // 2)
+        response = self.post(body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data(as_text = True))['locations'], len(json.loads(body)['lats']))
+        self.assertEqual(self.records()[0]['body'], body)
+
+    @unittest.skipIf(vrp_stream.ijson is None, 'ijson is not installed')
+    def test_streamed_body_left_to_the_parser(self):
+        body = vrp_body(STREAMING_THRESHOLD)
+        self.assertGreaterEqual(len(body), STREAMING_THRESHOLD)
+        response = self.post(body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data(as_text = True))['locations'], len(json.loads(body)['lats']))
+        record = self.records()[0]
+        self.assertIsNone(record['body'])
+        self.assertEqual(record['content_length'], len(body))
+
+
+if __name__ == '__main__':
+    unittest.main()
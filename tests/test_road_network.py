@@ -0,0 +1,78 @@
+"""
+RoadGraph on synthetic grids: the scipy path (csgraph dijkstra, cKDTree snapping) and
+the fallback without scipy (heap dijkstra, brute force snapping) give the same results.
+"""
+import unittest
+import numpy as np
+
+import road_network
+from road_network import RoadGraph
+
+
+def without_scipy(function, *args):
+    """
+    Call function with the fallback of road_network, as if scipy were missing.
+    """
+    csr_matrix = road_network.csr_matrix
+    road_network.csr_matrix = None
+    try:
+        return function(*args)
+    finally:
+        road_network.csr_matrix = csr_matrix
+
+
+@unittest.skipIf(road_network.csr_matrix is None, 'scipy is not installed')
+class RoadGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.RandomState(0)
+        self.graph = RoadGraph.grid(12, 15, spacing=0.5, speed=30.)
+        self.fallback = without_scipy(RoadGraph.grid, 12, 15, 0.5, 30.)
+        self.assertIsNone(self.fallback.tree)
+
+    def coordinates(self, count):
+        lats = self.rng.uniform(self.graph.lats.min(), self.graph.lats.max(), count)
+        lons = self.rng.uniform(self.graph.lons.min(), self.graph.lons.max(), count)
+        return lats, lons
+
+    def test_same_snapping(self):
+        lats, lons = self.coordinates(200)
+        nodes, offsets = self.graph.snap(lats, lons)
+        fallback_nodes, fallback_offsets = self.fallback.snap(lats, lons)
+        np.testing.assert_array_equal(nodes, fallback_nodes)
+        np.testing.assert_allclose(offsets, fallback_offsets)
+
+    def test_same_shortest_paths(self):
+        sources = self.rng.randint(0, self.graph.num_nodes, 20)
+        targets = self.rng.randint(0, self.graph.num_nodes, 30)
+        for weight in ('length', 'time'):
+            costs = self.graph.shortest(sources, targets, weight)
+            fallback_costs = without_scipy(self.fallback.shortest, sources, targets, weight)
+            np.testing.assert_allclose(costs, fallback_costs)
+
+    def test_grid_distances(self):
+        # Grid neighbours are 0.5 km apart, the shortest path is the Manhattan distance.
+        rows, cols = np.divmod(np.arange(self.graph.num_nodes), 15)
+        costs = self.graph.shortest(np.arange(self.graph.num_nodes), np.arange(self.graph.num_nodes))
+        manhattan = 0.5 * (np.abs(rows[:, None] - rows[None, :]) + np.abs(cols[:, None] - cols[None, :]))
+        np.testing.assert_allclose(costs, manhattan, rtol=1e-2)
+
+    def test_same_matrices(self):
+        lats, lons = self.coordinates(40)
+        distances, times = self.graph.matrices(lats, lons)
+        fallback_distances, fallback_times = without_scipy(self.fallback.matrices, lats, lons)
+        np.testing.assert_allclose(distances, fallback_distances)
+        np.testing.assert_allclose(times, fallback_times)
+
+    def test_unreachable(self):
+        # Two grids side by side, with no edge between them.
+        left = RoadGraph.grid(3, 3)
+        graph = RoadGraph(np.concatenate([left.lats, left.lats]), np.concatenate([left.lons, left.lons + 1.]),
+                          [0, 1, 9, 10], [1, 2, 10, 11], [1., 1., 1., 1.], [30.] * 4)
+        for shortest in (graph.shortest, lambda *args: without_scipy(graph.shortest, *args)):
+            costs = shortest([0, 9], [2, 11])
+            np.testing.assert_allclose(costs, [[2., np.inf], [np.inf, 2.]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+parse_vrp against json.loads on a large generated /vrp body: the same arrays, with a
+lower peak of allocated memory.
+"""
+import io
+import json
+import unittest
+import numpy as np
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import vrp_stream
+from vrp_stream import ARRAY_FIELDS, parse_vrp
+
+NUM_LOCATIONS = 1000
+
+
+def vrp_body(num_locations, rng):
+    """
+    /vrp body with a 0/1 arc matrix and fractional demands, the large fields only.
+    """
+    return json.dumps({
+        'lats': rng.uniform(10, 11, num_locations).tolist(),
+        'lons': rng.uniform(106, 107, num_locations).tolist(),
+        'demands': (rng.randint(0, 5000, num_locations) / 4.).tolist(),
+        'start_times': rng.uniform(6, 12, num_locations).tolist(),
+        'end_times': rng.uniform(12, 20, num_locations).tolist(),
+        'matrix': (rng.uniform(size=(num_locations, num_locations)) > 0.1).astype(int).tolist(),
+        'horizon': 86400
+    }).encode('utf-8')
+
+
+def peak_bytes(parse, body):
+    """
+    (result, peak of the memory allocated while parsing).
+    """
+    tracemalloc.start()
+    try:
+        data = parse(body)
+        return data, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@unittest.skipIf(vrp_stream.ijson is None, 'ijson is not installed')
+class ParseVrpTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.body = vrp_body(NUM_LOCATIONS, np.random.RandomState(0))
+
+    def test_same_arrays(self):
+        expected = json.loads(self.body.decode('utf-8'))
+        data = parse_vrp(io.BytesIO(self.body))
+
+        self.assertEqual(set(data), set(expected))
+        self.assertEqual(data['horizon'], expected['horizon'])
+        for field, dtype in ARRAY_FIELDS.items():
+            self.assertIsInstance(data[field], np.ndarray)
+            self.assertEqual(data[field].dtype, dtype)
+            np.testing.assert_array_equal(data[field], np.asarray(expected[field], dtype=dtype))
+
+    @unittest.skipIf(tracemalloc is None, 'tracemalloc is not available')
+    def test_lower_peak_memory(self):
+        _, json_peak = peak_bytes(lambda body: json.loads(body.decode('utf-8')), self.body)
+        _, stream_peak = peak_bytes(lambda body: parse_vrp(io.BytesIO(body)), self.body)
+        typed = NUM_LOCATIONS * NUM_LOCATIONS * 4 + 5 * NUM_LOCATIONS * 8
+
+        self.assertLess(stream_peak, 0.6 * json_peak)
+        self.assertLess(stream_peak, 2 * typed)
+
+
+if __name__ == '__main__':
+    unittest.main()
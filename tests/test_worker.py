@@ -0,0 +1,144 @@
+"""
+Integration tests of worker.py: worker processes sharing the SQLite queue file of a
+test, pointed to it with JOB_QUEUE_PATH. The workers import the app and need all of
+its dependencies, the tests are skipped when the app can't be imported.
+
+    python -m pytest tests
+"""
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from conftest import FLASK_APP
+from jobqueue import DONE, FAILED, SQLiteJobQueue
+
+MAX_ATTEMPTS = 3
+TIMEOUT = 120.
+
+
+def tsp_payload(n, seed):
+    """
+    Small /tsp job, solved by the exact engine.
+    """
+    return {
+        'matrix': [[0 if i == j else abs(i - j) + (i * j + seed) % 7 for j in range(n)] for i in range(n)],
+        'engine': 'exact'
+    }
+
+
+def worker_env(**variables):
+    """
+    Environment of a worker process, with the module paths of conftest.
+    """
+    paths = [FLASK_APP, os.path.join(FLASK_APP, 'ortools_packages')]
+    if os.environ.get('PYTHONPATH'):
+        paths.append(os.environ['PYTHONPATH'])
+    return dict(os.environ, PYTHONPATH = os.pathsep.join(paths), **variables)
+
+
+class WorkerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        probe = subprocess.Popen([sys.executable, '-c', 'import app'], cwd = FLASK_APP, env = worker_env(),
+                                 stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+        _, error = probe.communicate()
+        if probe.returncode != 0:
+            lines = error.decode('utf-8', 'replace').strip().splitlines()
+            raise unittest.SkipTest('The app can\'t be imported: %s' % (lines[-1] if lines else probe.returncode))
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'jobs.sqlite')
+        self.queue = SQLiteJobQueue(self.path, max_attempts = MAX_ATTEMPTS)
+        self.workers = []
+
+    def tearDown(self):
+        for worker in self.workers:
+            if worker.poll() is None:
+                worker.send_signal(signal.SIGTERM)
+        deadline = time.time() + TIMEOUT
+        for worker in self.workers:
+            while worker.poll() is None and time.time() < deadline:
+                time.sleep(0.1)
+            if worker.poll() is None:
+                worker.kill()
+                worker.wait()
+        shutil.rmtree(self.directory)
+
+    def start_workers(self, count, lease_seconds = 30.):
+        env = worker_env(JOB_QUEUE_PATH = self.path)
+        for _ in range(count):
+            self.workers.append(subprocess.Popen(
+                [sys.executable, 'worker.py', '--lease-seconds', str(lease_seconds), '--poll-interval', '0.1'],
+                cwd = FLASK_APP, env = env))
+
+    def wait(self, job_ids):
+        """
+        Jobs by id once they are all done or failed.
+        """
+        deadline = time.time() + TIMEOUT
+        while True:
+            jobs = dict((job_id, self.queue.get(job_id)) for job_id in job_ids)
+            if all(job['state'] in (DONE, FAILED) for job in jobs.values()):
+                return jobs
+            for worker in self.workers:
+                self.assertIsNone(worker.poll(), 'A worker exited with %s.' % worker.poll())
+            self.assertLess(time.time(), deadline, 'The jobs were not solved in %d seconds.' % TIMEOUT)
+            time.sleep(0.1)
+
+    def test_jobs_claimed_once(self):
+        job_ids = [self.queue.submit('tsp', tsp_payload(6, seed)) for seed in range(40)]
+        self.start_workers(4)
+        jobs = self.wait(job_ids)
+
+        for job in jobs.values():
+            self.assertEqual(job['state'], DONE)
+            self.assertEqual(job['attempts'], 1)
+            self.assertEqual(job['status_code'], 200)
+            self.assertIsNotNone(job['worker'])
+        self.assertIsNone(self.queue.lease('late-worker', 30.))
+
+    def test_crashed_lease_reclaimed(self):
+        job_id = self.queue.submit('tsp', tsp_payload(6, 0))
+        # A worker which leased the job and died: no heartbeat, no result.
+        leased = self.queue.lease('crashed-worker', 1.)
+        self.assertEqual(leased['id'], job_id)
+        self.assertEqual(leased['attempts'], 1)
+        self.start_workers(2)
+        job = self.wait([job_id])[job_id]
+
+        self.assertEqual(job['state'], DONE)
+        self.assertEqual(job['attempts'], 2)
+        self.assertEqual(job['status_code'], 200)
+        self.assertNotEqual(job['worker'], 'crashed-worker')
+        # Its late result is ignored.
+        self.assertFalse(self.queue.complete(job_id, 'crashed-worker', 500, 'late'))
+        self.assertEqual(self.queue.get(job_id)['status_code'], 200)
+
+    def test_lease_retries_exhausted(self):
+        job_id = self.queue.submit('tsp', tsp_payload(6, 0))
+        for attempt in range(MAX_ATTEMPTS):
+            leased = self.queue.lease('crashed-worker-%d' % attempt, 0.01)
+            self.assertEqual(leased['id'], job_id)
+            self.assertEqual(leased['attempts'], attempt + 1)
+            time.sleep(0.05)
+        other_id = self.queue.submit('tsp', tsp_payload(6, 1))
+        self.start_workers(2)
+        jobs = self.wait([job_id, other_id])
+
+        self.assertEqual(jobs[job_id]['state'], FAILED)
+        self.assertEqual(jobs[job_id]['attempts'], MAX_ATTEMPTS)
+        self.assertEqual(jobs[job_id]['error'], 'Lease expired %d times.' % MAX_ATTEMPTS)
+        self.assertIsNone(jobs[job_id]['status_code'])
+        self.assertEqual(jobs[other_id]['state'], DONE)
+        self.assertEqual(jobs[other_id]['attempts'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()